@@ -1,29 +1,56 @@
 """ Pulumi """
 # Call pulumi files that are not constructors
 # ruff: noqa: F401
-import pulumi
-import pulumi_aws as aws
-from stack_config import AZ_ZONE_IDS, PROJECT_NAME, VPC_CIDR
-from vpc import VpcResources
+# First so every import after it is timed - PULUMI_STARTUP_PROFILE=<file>
+# - the imports below are late on purpose, hence `noqa: E402`
+import startup_profile
+
+startup_profile.install_from_env()
+
+import pulumi  # noqa: E402
+import pulumi_aws as aws  # noqa: E402
+import invoke_cache  # noqa: E402
+from stack_config import (  # noqa: E402
+    AZ_ZONE_IDS,
+    INVOKE_CACHE_BYPASS,
+    INVOKE_CACHE_TTL,
+    PROJECT_NAME,
+    VPC_CIDR,
+)
+from vpc import VpcResources  # noqa: E402
 
 """
 IDEA: could create cluster parent component for all resources for easier reference
 in child components
 """
 
+"""
+Startup lookups go through a local TTL cache so repeat previews skip them
+- set `invoke_cache_bypass: true` in stack config to force fresh lookups
+- Output-form so nothing blocks here - only resources that actually need
+  the account id / AZs wait on them
+"""
+startup_cache = invoke_cache.InvokeCache(
+    ttl_seconds=INVOKE_CACHE_TTL, bypass=INVOKE_CACHE_BYPASS
+)
+caller_identity = invoke_cache.get_caller_identity_output(startup_cache)
+
 """
 Get available AZ names by speicific zone ids in config
 - ensures same physical location across multiple AWS accounts
 """
-available_azs = aws.get_availability_zones(
+available_azs = invoke_cache.get_availability_zones_output(
+    startup_cache,
+    account_id=caller_identity["account_id"],
     filters=[
         {"name": "opt-in-status", "values": ["opt-in-not-required"]},
         {"name": "zone-id", "values": AZ_ZONE_IDS},
-    ]
+    ],
 )
 # Use zone_id to ensure same physical location across multiple accounts
-selected_az_names = available_azs.names
-selected_az_zone_ids = available_azs.zone_ids
+# - subnets follow the configured AZ_ZONE_IDS order, the lookup only validates
+selected_az_names = available_azs["names"]
+selected_az_zone_ids = available_azs["zone_ids"]
 
 pulumi.export("selected_azs_names", selected_az_names)
 pulumi.export("selected_azs_zone_ids", selected_az_zone_ids)
@@ -35,7 +62,8 @@ pulumi.export("selected_azs_zone_ids", selected_az_zone_ids)
 EKS_CLUSTER_NAME = f"{PROJECT_NAME}"
 eks_vpc = VpcResources(
     name=PROJECT_NAME,
-    az_zone_ids=selected_az_zone_ids,
+    az_zone_ids=AZ_ZONE_IDS,
+    available_zone_ids=selected_az_zone_ids,
     cluster_name=EKS_CLUSTER_NAME,
     vpc_cidr_block=VPC_CIDR,
 )
@@ -0,0 +1,174 @@
+"""
+On-disk TTL cache for the invokes that block program startup
+- aws.get_caller_identity / aws.get_availability_zones rarely change but
+  every preview waits on them before any resource registers
+- keyed by invoke token, account / profile / region and the invoke args
+- results are Outputs so resources that don't need them register right away
+- invoke functions are injectable so the cache can be driven by fakes
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import pulumi
+import pulumi_aws as aws
+
+DEFAULT_PATH = Path(".pulumi-cache") / "invokes.json"
+DEFAULT_TTL_SECONDS = 3600
+
+AZS_TOKEN = "aws:index/getAvailabilityZones:getAvailabilityZones"
+CALLER_IDENTITY_TOKEN = "aws:index/getCallerIdentity:getCallerIdentity"
+
+
+class InvokeCache:
+    """small json store of invoke results with a TTL per entry"""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_PATH,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        bypass: bool = False,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        # bypass skips reads but still refreshes the stored entry
+        self.bypass = bypass
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str, scope: dict, args: dict) -> str:
+        raw = json.dumps([token, scope, args], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, entries: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so concurrent previews never read half a file
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str) -> dict | None:
+        if self.bypass:
+            return None
+        entry = self._load().get(key)
+        if entry is None or self.clock() - entry["stored_at"] >= self.ttl_seconds:
+            return None
+        return entry["value"]
+
+    def put(self, key: str, value: dict) -> None:
+        now = self.clock()
+        entries = {
+            k: entry
+            for k, entry in self._load().items()
+            if now - entry["stored_at"] < self.ttl_seconds
+        }
+        entries[key] = {"stored_at": now, "value": value}
+        self._save(entries)
+
+    def get_or_call_output(
+        self,
+        token: str,
+        scope: dict,
+        args: dict,
+        call: Callable[[], pulumi.Output[dict]],
+    ) -> pulumi.Output[dict]:
+        """
+        Output-form lookup so resource registration never waits on the cache
+        - hit: already resolved Output of the stored value
+        - miss: the `_output` invoke, stored once it resolves
+        """
+        key = self.key(token, scope, args)
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return pulumi.Output.from_input(value)
+        self.misses += 1
+
+        def store(result: dict) -> dict:
+            self.put(key, result)
+            return result
+
+        return call().apply(store)
+
+
+def credential_fingerprint(aws_config: pulumi.Config) -> str | None:
+    """
+    short hash of explicit / env credentials, None when only a profile is used
+    - env credentials change accounts without touching profile / region
+    - hashed so no key material ends up in the cache file
+    """
+    access_key = aws_config.get("accessKey") or os.environ.get("AWS_ACCESS_KEY_ID")
+    if not access_key:
+        return None
+    token = aws_config.get("token") or os.environ.get("AWS_SESSION_TOKEN") or ""
+    return hashlib.sha256(f"{access_key}:{token}".encode()).hexdigest()[:16]
+
+
+def aws_scope() -> dict:
+    """which credentials / region an invoke ran against"""
+    aws_config = pulumi.Config("aws")
+    return {
+        "profile": aws_config.get("profile") or os.environ.get("AWS_PROFILE"),
+        "region": aws_config.get("region") or os.environ.get("AWS_REGION"),
+        "credentials": credential_fingerprint(aws_config),
+    }
+
+
+def get_caller_identity_output(
+    cache: InvokeCache,
+    scope: dict | None = None,
+    invoke: Callable | None = None,
+) -> pulumi.Output[dict]:
+    """{account_id, arn, user_id} - resolves immediately on a cache hit"""
+    invoke = invoke or aws.get_caller_identity_output
+
+    def call() -> pulumi.Output[dict]:
+        return invoke().apply(
+            lambda result: {
+                "account_id": result.account_id,
+                "arn": result.arn,
+                "user_id": result.user_id,
+            }
+        )
+
+    return cache.get_or_call_output(
+        CALLER_IDENTITY_TOKEN, scope or aws_scope(), {}, call
+    )
+
+
+def get_availability_zones_output(
+    cache: InvokeCache,
+    account_id: pulumi.Input[str],
+    filters: list[dict],
+    scope: dict | None = None,
+    invoke: Callable | None = None,
+) -> pulumi.Output[dict]:
+    """{names, zone_ids} - keyed by account so waits on account_id first"""
+    invoke = invoke or aws.get_availability_zones_output
+    scope = scope or aws_scope()
+
+    def call() -> pulumi.Output[dict]:
+        return invoke(filters=filters).apply(
+            lambda result: {"names": result.names, "zone_ids": result.zone_ids}
+        )
+
+    return pulumi.Output.from_input(account_id).apply(
+        lambda account: cache.get_or_call_output(
+            AZS_TOKEN, {**scope, "account_id": account}, {"filters": filters}, call
+        )
+    )
@@ -1,6 +1,12 @@
 """ Providers """
 # import pulumi
+import functools
+
 import pulumi_aws as aws
 
+
 # Relying mainly on config settings for AWS provider
-aws_provider = aws.Provider("aws-provider")
+# - created on first call so importing this module never registers a provider
+@functools.cache
+def aws_provider() -> aws.Provider:
+    return aws.Provider("aws-provider")
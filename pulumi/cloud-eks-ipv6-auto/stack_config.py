@@ -7,3 +7,17 @@ _config = pulumi.Config()
 AZ_ZONE_IDS = _config.require_object("az_zone_ids")
 PROJECT_NAME = _config.require("project_name")
 VPC_CIDR = _config.require("vpc_cidr")
+
+# `vpc_cidr: ipam` is swapped for a leased block by eph_driver.py (see ../ipam.py)
+if VPC_CIDR == "ipam":
+    raise ValueError(
+        "vpc_cidr `ipam` is only resolved by eph_driver.py, set a CIDR for direct runs"
+    )
+
+# Startup invoke cache (caller identity / AZ lookups)
+# - `invoke_cache_bypass: true` forces fresh lookups and refreshes the cache
+INVOKE_CACHE_BYPASS = _config.get_bool("invoke_cache_bypass") or False
+# - `invoke_cache_ttl: 0` expires entries right away
+INVOKE_CACHE_TTL = _config.get_int("invoke_cache_ttl")
+if INVOKE_CACHE_TTL is None:
+    INVOKE_CACHE_TTL = 3600
@@ -0,0 +1,113 @@
+"""
+Import time breakdown for program startup
+- set PULUMI_STARTUP_PROFILE=<file> and the breakdown is written there
+  when the program exits, e.g.
+      PULUMI_STARTUP_PROFILE=.pulumi-cache/startup.txt pulumi preview
+- imported first in __main__.py so every later import is timed
+- pulumi itself is imported by the language host before __main__.py runs
+  so it never shows up here
+- lazy modules (pulumi_aws.ec2 etc.) are timed when first touched
+"""
+
+import atexit
+import os
+import sys
+import time
+from pathlib import Path
+
+ENV_VAR = "PULUMI_STARTUP_PROFILE"
+
+
+class _TimedLoader:
+    """wraps a module loader and times exec_module"""
+
+    def __init__(self, loader, profile: "ImportProfile"):
+        self.loader = loader
+        self.profile = profile
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profile.exec_module(self.loader, module)
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+
+class ImportProfile:
+    """meta path finder recording self / cumulative import time per module"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # module -> (cumulative s, self s)
+        self.modules: dict[str, tuple[float, float]] = {}
+        # time spent in nested imports for each module being executed
+        self._children: list[float] = []
+        # outermost imports only so nested ones aren't counted twice
+        self.total = 0.0
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def exec_module(self, loader, module) -> None:
+        start = time.perf_counter()
+        self._children.append(0.0)
+        try:
+            loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            else:
+                self.total += elapsed
+            self.modules[module.__name__] = (elapsed, elapsed - children)
+
+    def report(self) -> str:
+        wall = time.perf_counter() - self.started
+        packages: dict[str, float] = {}
+        for name, (_, self_s) in self.modules.items():
+            package = ".".join(name.split(".")[:2])
+            packages[package] = packages.get(package, 0.0) + self_s
+
+        lines = [
+            f"wall since profile install: {wall * 1000:.1f} ms",
+            f"time importing: {self.total * 1000:.1f} ms"
+            f" across {len(self.modules)} modules",
+            "",
+            f"{'self ms':>10}  package",
+        ]
+        for package, self_s in sorted(packages.items(), key=lambda p: -p[1]):
+            lines.append(f"{self_s * 1000:>10.1f}  {package}")
+        lines += ["", f"{'self ms':>10}{'cumulative ms':>15}  module"]
+        for name, (cumulative, self_s) in sorted(
+            self.modules.items(), key=lambda m: -m[1][0]
+        ):
+            lines.append(f"{self_s * 1000:>10.1f}{cumulative * 1000:>15.1f}  {name}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.report())
+
+
+def install(path: Path) -> ImportProfile:
+    """time every import from here on and write the breakdown at exit"""
+    profile = ImportProfile()
+    sys.meta_path.insert(0, profile)
+    atexit.register(profile.write, Path(path))
+    return profile
+
+
+def install_from_env() -> ImportProfile | None:
+    path = os.environ.get(ENV_VAR)
+    return install(Path(path)) if path else None
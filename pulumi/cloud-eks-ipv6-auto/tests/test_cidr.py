@@ -0,0 +1,103 @@
+"""cidr.py against terraform's documented results and ipaddress"""
+
+import ipaddress
+import random
+
+import pytest
+from cidr import cidr_subnet, cidr_subnet_bulk, cidr_subnets
+
+PARENTS = (
+    "10.0.0.0/8",
+    "10.1.2.0/24",
+    "172.16.0.0/12",
+    "2600:1f18:abcd:ab00::/56",
+    "fd00:fd12:3456:7800::/56",
+)
+
+
+# examples from terraform's cidrsubnet / cidrsubnets docs
+@pytest.mark.parametrize(
+    "prefix, newbits, netnum, want",
+    [
+        ("172.16.0.0/12", 4, 2, "172.18.0.0/16"),
+        ("10.1.2.0/24", 4, 15, "10.1.2.240/28"),
+        ("fd00:fd12:3456:7890::/56", 16, 162, "fd00:fd12:3456:7800:a200::/72"),
+    ],
+)
+def test_cidr_subnet_terraform_examples(prefix, newbits, netnum, want):
+    assert cidr_subnet(prefix, newbits, netnum) == want
+
+
+@pytest.mark.parametrize(
+    "prefix, newbits, want",
+    [
+        (
+            "10.1.0.0/16",
+            (4, 4, 8, 4),
+            ["10.1.0.0/20", "10.1.16.0/20", "10.1.32.0/24", "10.1.48.0/20"],
+        ),
+        (
+            "fd00:fd12:3456:7890::/56",
+            (16, 16, 16, 32),
+            [
+                "fd00:fd12:3456:7800::/72",
+                "fd00:fd12:3456:7800:100::/72",
+                "fd00:fd12:3456:7800:200::/72",
+                "fd00:fd12:3456:7800:300::/88",
+            ],
+        ),
+    ],
+)
+def test_cidr_subnets_terraform_examples(prefix, newbits, want):
+    assert cidr_subnets(prefix, *newbits) == want
+
+
+@pytest.mark.parametrize("parent", PARENTS)
+def test_cidr_subnet_matches_materialized_subnets(parent):
+    rng = random.Random(parent)
+    network = ipaddress.ip_network(parent)
+    # small enough to materialize every child
+    for newbits in range(0, min(10, network.max_prefixlen - network.prefixlen) + 1):
+        children = list(network.subnets(prefixlen_diff=newbits))
+        for index in rng.sample(range(len(children)), min(8, len(children))):
+            assert cidr_subnet(parent, newbits, index) == str(children[index])
+        pairs = [(newbits, index) for index in range(min(16, len(children)))]
+        assert cidr_subnet_bulk(parent, pairs) == [str(c) for c in children[:16]]
+
+
+@pytest.mark.parametrize("parent", PARENTS)
+def test_cidr_subnets_contained_and_disjoint(parent):
+    rng = random.Random(parent)
+    network = ipaddress.ip_network(parent)
+    room = min(12, network.max_prefixlen - network.prefixlen)
+    for _ in range(50):
+        newbits = [rng.randint(2, room) for _ in range(rng.randint(1, 3))]
+        try:
+            subnets = [ipaddress.ip_network(cidr) for cidr in cidr_subnets(parent, *newbits)]
+        except ValueError as error:
+            assert "not enough remaining address space" in str(error)
+            continue
+        assert [subnet.prefixlen - network.prefixlen for subnet in subnets] == newbits
+        assert all(subnet.subnet_of(network) for subnet in subnets)
+        for i, subnet in enumerate(subnets):
+            assert not any(subnet.overlaps(other) for other in subnets[i + 1 :])
+
+
+@pytest.mark.parametrize(
+    "call, message",
+    [
+        (lambda: cidr_subnet("10.0.0.0/16", -1, 0), "must not be negative"),
+        (lambda: cidr_subnet("2600::/8", 33, 0), "more than 32 bits"),
+        (lambda: cidr_subnet("10.0.0.0/16", 17, 0), "insufficient address space"),
+        (lambda: cidr_subnet("10.0.0.0/16", 2, 4), "does not accommodate"),
+        (lambda: cidr_subnet("10.0.0.0/16", 2, -1), "does not accommodate"),
+        (lambda: cidr_subnets("10.0.0.0/16", 0), "at least one bit"),
+        (lambda: cidr_subnets("2600::/8", 33), "more than 32 bits"),
+        (lambda: cidr_subnets("10.0.0.0/16", 17), "too long for an IPv4 address"),
+        (lambda: cidr_subnets("10.0.0.0/16", 1, 1, 1), "not enough remaining address space"),
+    ],
+)
+def test_error_paths(call, message):
+    with pytest.raises(ValueError, match=message):
+        call()
+
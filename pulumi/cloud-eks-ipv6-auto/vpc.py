@@ -1,7 +1,6 @@
-import ipaddress
-
 import pulumi
 import pulumi_aws as aws
+from cidr import cidr_subnet_bulk
 
 """
 HELPERS
@@ -10,21 +9,51 @@ HELPERS
 # Allows IPv6 only clients to communicate with IPv4 only services
 NAT64_DNS64_RESERVED_PREFIX = "64:ff9b::/96"
 
-# cidr_subnet function like terraform-aws-module
-def cidr_subnet(prefix, newbits, netnum) -> str:
-    """similar to terraform local with cidr_subnet()"""
-    network = ipaddress.ip_network(prefix)
-    new_prefix_len = network.prefixlen + newbits
-    new_subnet_size = 2 ** (32 - new_prefix_len)
-    start_ip = network.network_address + (netnum * new_subnet_size)
-    return f"{start_ip}/{new_prefix_len}"
-
 
-# Get IPv6 based on index like terraform-aws-module
-def get_ipv6_subnet(base: str, index: int, newbits: int = 8) -> str:
-    network = ipaddress.IPv6Network(base)
-    new_prefix_len = network.prefixlen + newbits
-    return str(list(network.subnets(new_prefix=new_prefix_len))[index])
+def require_zone_id(zone_id: str, available: list) -> str:
+    if zone_id not in available:
+        raise ValueError(
+            f"zone id {zone_id} is not available, found: {', '.join(available)}"
+        )
+    return zone_id
+
+
+# Subnet tiers in allocation order
+# - append new tiers at the end so existing public / private CIDRs don't move
+SUBNET_TIERS = ("public", "private")
+
+
+def build_address_plan(
+    vpc_cidr_block: str,
+    ipv6_cidr_block: str | None,
+    az_zone_ids: list,
+    tiers: tuple = SUBNET_TIERS,
+    ipv4_newbits: int = 3,
+    ipv6_newbits: int = 8,
+) -> dict:
+    """
+    Subnet CIDRs per tier / AZ: {tier: {zone_id: {cidr_block, ipv6_cidr_block}}}
+    - each VPC block is parsed once for the whole plan
+    - netnum is tier index * AZ count + AZ index for both families
+    - ipv6_cidr_block is None until the VPC's amazon provided block is known
+    """
+    netnums = range(len(tiers) * len(az_zone_ids))
+    ipv4 = cidr_subnet_bulk(vpc_cidr_block, [(ipv4_newbits, n) for n in netnums])
+    ipv6 = (
+        cidr_subnet_bulk(ipv6_cidr_block, [(ipv6_newbits, n) for n in netnums])
+        if ipv6_cidr_block
+        else [None] * len(netnums)
+    )
+    plan = {}
+    for tier_idx, tier in enumerate(tiers):
+        plan[tier] = {}
+        for az_idx, zone_id in enumerate(az_zone_ids):
+            netnum = tier_idx * len(az_zone_ids) + az_idx
+            plan[tier][zone_id] = {
+                "cidr_block": ipv4[netnum],
+                "ipv6_cidr_block": ipv6[netnum],
+            }
+    return plan
 
 
 class VpcResources(pulumi.ComponentResource):
@@ -36,6 +65,7 @@ class VpcResources(pulumi.ComponentResource):
         cluster_name: str,
         az_zone_ids: list,
         vpc_cidr_block: str,
+        available_zone_ids: pulumi.Input[list] | None = None,
         opts: pulumi.ResourceOptions = None,
     ):
         super().__init__(t="eph:eks:VpcResources", name=name, props=None, opts=opts)
@@ -59,32 +89,39 @@ class VpcResources(pulumi.ComponentResource):
         self.private_subnets = []
 
         # NOTE: still doing /19's even on two AZs
-        # 3 for /19
-        private_subnet_cidrs = [
-            cidr_subnet(vpc_cidr_block, 3, k + len(az_zone_ids))
-            for k in range(len(az_zone_ids))
-        ]
-        public_subnet_cidrs = [
-            cidr_subnet(vpc_cidr_block, 3, k) for k in range(len(az_zone_ids))
-        ]
-
-        # Calculate the IPv6 subnet allocations (will be Output objects)
-        ipv6_subnet_allocations = []
-        for i in range(len(az_zone_ids) * 2):  # Both public and private subnets
-            ipv6_subnet = self.vpc.ipv6_cidr_block.apply(
-                lambda v6base, idx=i: get_ipv6_subnet(v6base, idx)
+        # IPv4 half of the plan is known up front so previews still show CIDRs
+        ipv4_plan = build_address_plan(vpc_cidr_block, None, az_zone_ids)
+
+        # One apply computes every tier / AZ once the IPv6 block is allocated
+        # - subnets only project their own entry out of it
+        self.address_plan = self.vpc.ipv6_cidr_block.apply(
+            lambda v6base: build_address_plan(vpc_cidr_block, v6base, az_zone_ids)
+        )
+
+        def ipv6_cidr(tier: str, zone_id: str) -> pulumi.Output:
+            return self.address_plan.apply(
+                lambda plan: plan[tier][zone_id]["ipv6_cidr_block"]
+            )
+
+        # az_zone_ids comes from config so subnet names / CIDRs are known up front
+        # - available_zone_ids (e.g. an `_output` AZ lookup) only gates subnets
+        #   so the VPC, gateways and route tables don't wait on the lookup
+        def availability_zone_id(zone_id: str) -> pulumi.Input[str]:
+            if available_zone_ids is None:
+                return zone_id
+            return pulumi.Output.from_input(available_zone_ids).apply(
+                lambda available: require_zone_id(zone_id, available)
             )
-            ipv6_subnet_allocations.append(ipv6_subnet)
 
-        for idx, zone_id in enumerate(az_zone_ids):
+        for zone_id in az_zone_ids:
             # NOT launching karpenter instances in public subnets
             public_subnet = aws.ec2.Subnet(
                 resource_name=f"{name}-public-{zone_id}",
                 assign_ipv6_address_on_creation=True,
-                availability_zone_id=zone_id,
+                availability_zone_id=availability_zone_id(zone_id),
                 enable_dns64=True,
-                cidr_block=public_subnet_cidrs[idx],
-                ipv6_cidr_block=ipv6_subnet_allocations[idx],
+                cidr_block=ipv4_plan["public"][zone_id]["cidr_block"],
+                ipv6_cidr_block=ipv6_cidr("public", zone_id),
                 map_public_ip_on_launch=False,
                 enable_resource_name_dns_a_record_on_launch=False,
                 enable_resource_name_dns_aaaa_record_on_launch=True,
@@ -102,10 +139,10 @@ class VpcResources(pulumi.ComponentResource):
             private_subnet = aws.ec2.Subnet(
                 resource_name=f"{name}-private-{zone_id}",
                 assign_ipv6_address_on_creation=True,
-                availability_zone_id=zone_id,
+                availability_zone_id=availability_zone_id(zone_id),
                 enable_dns64=True,
-                cidr_block=private_subnet_cidrs[idx],
-                ipv6_cidr_block=ipv6_subnet_allocations[idx + len(az_zone_ids)],
+                cidr_block=ipv4_plan["private"][zone_id]["cidr_block"],
+                ipv6_cidr_block=ipv6_cidr("private", zone_id),
                 map_public_ip_on_launch=False,
                 enable_resource_name_dns_a_record_on_launch=False,
                 enable_resource_name_dns_aaaa_record_on_launch=True,
@@ -267,6 +304,7 @@ class VpcResources(pulumi.ComponentResource):
         """
         self.register_outputs(
             {
+                "address_plan": self.address_plan,
                 "egress_only_gw": self.egress_only_igw,
                 "igw": self.igw,
                 "nat_eip": self.nat_eip,
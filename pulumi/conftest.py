@@ -0,0 +1 @@
+"""puts pulumi/ on sys.path so tests/ can import the driver-level modules"""
@@ -0,0 +1,360 @@
+"""
+Preview / up / destroy many ephemeral stacks at once with the Automation API
+- works for either project dir: ipv6-eks-blueprint, cloud-eks-ipv6-auto
+- each stack starts from the project's Pulumi.eph.yaml plus overrides
+  (vpc_cidr, project_name, az_zone_ids, ...)
+- state goes to a local file backend, never Pulumi Cloud
+- --endpoint points the aws provider at LocalStack / moto-server
+- one log per stack in .eph/logs, consolidated report in .eph/report.json
+- --timeline records engine events per stack to .eph/timelines and writes a
+  Chrome trace next to each, see eph_timeline.py
+
+    cd pulumi
+    uv run --project ipv6-eks-blueprint python eph_driver.py preview \\
+        --project ipv6-eks-blueprint --count 3 --endpoint http://localhost:4566
+    uv run --project ipv6-eks-blueprint python eph_driver.py up \\
+        --project ipv6-eks-blueprint --overrides stacks.yaml --workers 2
+
+overrides file is {stack name: {config key: value}}, e.g.
+    eph-a: {vpc_cidr: "10.1.0.0/16", project_name: "eks-ipv6-bp-a"}
+    eph-b: {vpc_cidr: "10.2.0.0/16", az_zone_ids: ["use1-az4", "use1-az6"]}
+    eph-c: {vpc_cidr: "ipam"}  # leased from ipam.py, released on destroy
+
+`vpc_cidr: ipam` is resolved here, once per run: the stack gets its leased
+block as plain config (ipam_path / ipam_pool / ipam_prefixlen tune the
+lease and never reach the stack). A preview that leased a new block hands
+it back afterwards, destroy releases it
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import ipam
+import yaml
+from eph_timeline import DeployTimeline
+from pulumi import automation as auto
+
+ACTIONS = ("preview", "up", "destroy")
+PULUMI_DIR = Path(__file__).parent
+DEFAULT_BACKEND = "file://~/.pulumi-eph"
+DEFAULT_TEMPLATE = "eph"
+OUTPUT_DIR = Path(".eph")
+
+# aws provider services the projects touch, routed to --endpoint
+ENDPOINT_SERVICES = ("ec2", "eks", "events", "iam", "kms", "sqs", "ssm", "sts")
+
+
+@dataclass
+class StackResult:
+    stack: str
+    action: str
+    ok: bool
+    seconds: float
+    # op -> count, e.g. {"create": 59}
+    changes: dict = field(default_factory=dict)
+    error: str | None = None
+
+
+def flatten_config(value, key: str) -> dict:
+    """nested config -> `--path` style keys so objects / lists stay typed"""
+    if isinstance(value, dict):
+        flat = {}
+        for k, v in value.items():
+            flat.update(flatten_config(v, f"{key}.{k}"))
+        return flat
+    if isinstance(value, list):
+        flat = {}
+        for i, v in enumerate(value):
+            flat.update(flatten_config(v, f"{key}[{i}]"))
+        return flat
+    if isinstance(value, bool):
+        return {key: "true" if value else "false"}
+    return {key: str(value)}
+
+
+def template_config(project_dir: Path, template: str) -> dict:
+    settings = yaml.safe_load((project_dir / f"Pulumi.{template}.yaml").read_text())
+    return dict(settings.get("config") or {})
+
+
+def endpoint_config(endpoint: str) -> dict:
+    """aws provider config for LocalStack / moto-server"""
+    return {
+        "aws:accessKey": "test",
+        "aws:secretKey": "test",
+        "aws:skipCredentialsValidation": True,
+        "aws:skipMetadataApiCheck": True,
+        "aws:skipRequestingAccountId": True,
+        "aws:s3UsePathStyle": True,
+        "aws:endpoints": [{service: endpoint for service in ENDPOINT_SERVICES}],
+    }
+
+
+def generated_overrides(base: dict, count: int) -> dict:
+    """
+    eph-1..eph-N with their own project name and an ipam leased vpc_cidr
+    - the registry fails with a clear error once the pool is out of blocks
+    """
+    project_name = base.get("project_name", "eph")
+    return {
+        f"eph-{n}": {"vpc_cidr": "ipam", "project_name": f"{project_name}-{n}"}
+        for n in range(1, count + 1)
+    }
+
+
+def stack_config(base: dict, stack: str, overrides: dict, endpoint: str | None) -> dict:
+    config = {**base, **overrides}
+    tags = config.get("aws:defaultTags", {}).get("tags")
+    if tags is not None:
+        config["aws:defaultTags"] = {"tags": {**tags, "StackName": stack}}
+    if endpoint:
+        config.pop("aws:profile", None)
+        config.update(endpoint_config(endpoint))
+    return config
+
+
+def workspace_env(backend: str, endpoint: str | None) -> dict:
+    env = {
+        "PULUMI_BACKEND_URL": backend,
+        # file backend needs a passphrase provider, empty is fine for eph
+        "PULUMI_CONFIG_PASSPHRASE": os.environ.get("PULUMI_CONFIG_PASSPHRASE", ""),
+    }
+    if endpoint:
+        env.update(AWS_ENDPOINT_URL=endpoint, AWS_REGION="us-east-1")
+    return env
+
+
+def last_line(err: Exception) -> str:
+    lines = str(err).strip().splitlines()
+    return lines[-1] if lines else ""
+
+
+# driver-side ipam settings, stripped from the stack config
+IPAM_KEYS = ("ipam_path", "ipam_pool", "ipam_prefixlen")
+
+
+def lease_vpc_cidr(name: str, action: str, ipam_config: dict) -> tuple[str | None, bool]:
+    """(stack's block, whether this call leased it) - destroy never leases"""
+    with ipam.IpamRegistry(ipam_config.get("ipam_path") or ipam.DEFAULT_PATH) as registry:
+        existing = registry.get(name)
+        if existing or action == "destroy":
+            return existing, False
+        cidr = registry.lease(
+            name,
+            int(ipam_config.get("ipam_prefixlen") or ipam.DEFAULT_PREFIXLEN),
+            ipam_config.get("ipam_pool") or ipam.DEFAULT_POOL,
+        )
+        return cidr, True
+
+
+def release_vpc_cidr(name: str, ipam_config: dict) -> str | None:
+    with ipam.IpamRegistry(ipam_config.get("ipam_path") or ipam.DEFAULT_PATH) as registry:
+        return registry.release(name)
+
+
+def run_stack(
+    project_dir: Path,
+    stack_name: str,
+    action: str,
+    config: dict,
+    env: dict,
+    on_event: Callable | None = None,
+) -> StackResult:
+    start = time.perf_counter()
+    log_path = OUTPUT_DIR / "logs" / f"{stack_name}-{action}.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    config = dict(config)
+    ipam_config = {key: config.pop(key) for key in IPAM_KEYS if key in config}
+    lease_name = f"{project_dir.name}/{stack_name}"
+    uses_ipam = config.get("vpc_cidr") == "ipam"
+    try:
+        with log_path.open("w") as log:
+            leased_now = False
+            if uses_ipam:
+                cidr, leased_now = lease_vpc_cidr(lease_name, action, ipam_config)
+                if cidr:
+                    config["vpc_cidr"] = cidr
+                    log.write(f"ipam: {lease_name} -> {cidr}\n")
+            stack = auto.create_or_select_stack(
+                stack_name,
+                work_dir=str(project_dir),
+                opts=auto.LocalWorkspaceOptions(env_vars=env),
+            )
+            stack.set_all_config(
+                {
+                    key: auto.ConfigValue(value)
+                    for name, raw in config.items()
+                    for key, value in flatten_config(raw, name).items()
+                },
+                path=True,
+            )
+            kwargs = {"on_output": lambda line: log.write(line + "\n")}
+            if on_event is not None:
+                kwargs["on_event"] = on_event
+            if action == "preview":
+                try:
+                    changes = stack.preview(**kwargs).change_summary
+                finally:
+                    # nothing was deployed on a block leased just for this preview
+                    if leased_now:
+                        release_vpc_cidr(lease_name, ipam_config)
+            elif action == "up":
+                changes = stack.up(**kwargs).summary.resource_changes
+            else:
+                changes = stack.destroy(remove=True, **kwargs).summary.resource_changes
+                # set_all_config wrote it, the removed stack doesn't need it
+                (project_dir / f"Pulumi.{stack_name}.yaml").unlink(missing_ok=True)
+                if uses_ipam:
+                    released = release_vpc_cidr(lease_name, ipam_config)
+                    log.write(f"ipam: released {released or 'nothing'} for {lease_name}\n")
+    except Exception as err:  # noqa: BLE001 - one failed stack shouldn't stop the rest
+        return StackResult(
+            stack=stack_name,
+            action=action,
+            ok=False,
+            seconds=round(time.perf_counter() - start, 1),
+            error=f"{type(err).__name__}: {last_line(err)} (see {log_path})",
+        )
+    return StackResult(
+        stack=stack_name,
+        action=action,
+        ok=True,
+        seconds=round(time.perf_counter() - start, 1),
+        # preview keys are OpType enums, up / destroy keys are plain strings
+        changes={
+            getattr(op, "value", op): count for op, count in (changes or {}).items()
+        },
+    )
+
+
+def run_all(
+    project_dir: Path,
+    action: str,
+    overrides: dict,
+    workers: int = 2,
+    backend: str = DEFAULT_BACKEND,
+    endpoint: str | None = None,
+    template: str = DEFAULT_TEMPLATE,
+    on_event: Callable[[str], Callable | None] | None = None,
+) -> list[StackResult]:
+    """
+    action on every stack in overrides with at most `workers` at a time
+    - on_event: stack name -> engine event handler, e.g. a deploy timeline
+    """
+    # set_all_config would rewrite the committed template, destroy delete it
+    if template in overrides:
+        raise ValueError(
+            f"stack {template} is the --template, pick another stack name or template"
+        )
+    base = template_config(project_dir, template)
+    env = workspace_env(backend, endpoint)
+    if backend.startswith("file://"):
+        os.makedirs(os.path.expanduser(backend.removeprefix("file://")), exist_ok=True)
+
+    # install the project's deps once so workers don't race creating the venv
+    auto.LocalWorkspace(work_dir=str(project_dir), env_vars=env).install()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                run_stack,
+                project_dir,
+                stack_name,
+                action,
+                stack_config(base, stack_name, stack_overrides, endpoint),
+                env,
+                on_event(stack_name) if on_event else None,
+            ): stack_name
+            for stack_name, stack_overrides in overrides.items()
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            print(
+                f"{'ok' if result.ok else 'FAILED':<7}{result.stack} {action}"
+                f" {result.seconds}s",
+                flush=True,
+            )
+            results.append(result)
+    return sorted(results, key=lambda r: r.stack)
+
+
+def print_report(results: list[StackResult]) -> None:
+    print(f"\n{'stack':<24}{'action':<9}{'status':<8}{'seconds':>9}  changes")
+    for r in results:
+        changes = ", ".join(f"{op}={n}" for op, n in sorted(r.changes.items()))
+        print(
+            f"{r.stack:<24}{r.action:<9}{'ok' if r.ok else 'FAILED':<8}"
+            f"{r.seconds:>9}  {changes or r.error or ''}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("action", choices=ACTIONS)
+    parser.add_argument(
+        "--project",
+        required=True,
+        choices=("ipv6-eks-blueprint", "cloud-eks-ipv6-auto"),
+    )
+    stacks = parser.add_mutually_exclusive_group(required=True)
+    stacks.add_argument("--count", type=int, help="generate eph-1..eph-N")
+    stacks.add_argument("--overrides", type=Path, help="yaml/json of stack -> config")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--backend", default=DEFAULT_BACKEND)
+    parser.add_argument("--endpoint", help="LocalStack / moto-server url")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE)
+    parser.add_argument("--report", type=Path, default=OUTPUT_DIR / "report.json")
+    parser.add_argument(
+        "--timeline", action="store_true", help="per-resource timeline per stack"
+    )
+    args = parser.parse_args()
+
+    project_dir = PULUMI_DIR / args.project
+    if args.overrides:
+        overrides = yaml.safe_load(args.overrides.read_text())
+    else:
+        overrides = generated_overrides(
+            template_config(project_dir, args.template), args.count
+        )
+
+    timelines: dict[str, DeployTimeline] = {}
+
+    def timeline_handler(stack_name: str) -> Callable:
+        timelines[stack_name] = DeployTimeline(
+            record_path=OUTPUT_DIR / "timelines" / f"{stack_name}-{args.action}.jsonl"
+        )
+        return timelines[stack_name].on_event
+
+    results = run_all(
+        project_dir,
+        args.action,
+        overrides,
+        workers=args.workers,
+        backend=args.backend,
+        endpoint=args.endpoint,
+        template=args.template,
+        on_event=timeline_handler if args.timeline else None,
+    )
+    print_report(results)
+    for stack_name, timeline in sorted(timelines.items()):
+        trace = timeline.record_path.with_suffix(".trace.json")
+        timeline.write_trace(trace)
+        print(f"\n{stack_name} ({trace})\n{timeline.summary(top=5)}", end="")
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    args.report.write_text(
+        json.dumps([asdict(result) for result in results], indent=2)
+    )
+    print(f"wrote {args.report}")
+    sys.exit(0 if all(result.ok for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Per-resource deploy timeline from Automation API engine events
+- DeployTimeline.on_event goes straight into stack.up(on_event=...)
+- start = resourcePreEvent, end = resOutputsEvent / resOpFailedEvent per URN,
+  grouped under the parent component (eph:eks:Vpc, eph:eks:Cluster, ...)
+- live runs record every start / end to a JSONL file so they can be replayed
+- replay also reads raw `pulumi up --event-log` files, their timestamps are
+  whole seconds so short resources show up as 0s
+- writes a Chrome trace (chrome://tracing, ui.perfetto.dev, speedscope) and
+  prints the slowest resources and idle gaps with nothing in flight
+
+    python eph_timeline.py .eph/timelines/eph-1-up.jsonl --trace eph-1.trace.json
+    python eph_timeline.py events.log --top 20 --min-gap 5
+
+tests/test_eph_timeline.py replays the recorded logs in tests/fixtures
+"""
+
+import argparse
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from pulumi.automation import EngineEvent
+
+ROOT = "pulumi:pulumi:Stack"
+
+
+class Span(NamedTuple):
+    urn: str
+    type: str
+    parent: str
+    op: str
+    start: float
+    end: float
+    failed: bool
+    # False for components like eph:eks:Vpc
+    custom: bool
+
+    @property
+    def name(self) -> str:
+        return self.urn.rsplit("::", 1)[-1]
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+def urn_label(urn: str) -> str:
+    """`eph:eks:Vpc eks-ipv6-bp-us-east-1` from a URN"""
+    if not urn:
+        return ROOT
+    # urn:pulumi:<stack>::<project>::<parent types$type>::<name>
+    _, _, types, name = urn.split("::", 3)
+    return f"{types.rsplit('$', 1)[-1]} {name}"
+
+
+class DeployTimeline:
+    """start / end per URN from engine events, live or replayed"""
+
+    def __init__(
+        self, record_path: Path | None = None, clock: Callable[[], float] = time.time
+    ):
+        self.clock = clock
+        self.record_path = Path(record_path) if record_path else None
+        if self.record_path:
+            self.record_path.parent.mkdir(parents=True, exist_ok=True)
+            self.record_path.write_text("")
+        # urn -> {type, parent, op, custom, start, end, failed}
+        self.resources: dict[str, dict] = {}
+        # engine events arrive on a reader thread
+        self._lock = threading.Lock()
+
+    def on_event(self, event: EngineEvent, at: float | None = None) -> None:
+        for kind, step in (
+            ("start", event.resource_pre_event),
+            ("end", event.res_outputs_event),
+            ("failed", event.res_op_failed_event),
+        ):
+            if step is None:
+                continue
+            meta = step.metadata
+            state = meta.new or meta.old
+            self.record(
+                kind,
+                urn=meta.urn,
+                type=meta.type,
+                parent=state.parent if state else "",
+                op=str(getattr(meta.op, "value", meta.op)),
+                at=self.clock() if at is None else at,
+                custom=bool(state.custom) if state else True,
+            )
+
+    def record(
+        self,
+        kind: str,
+        urn: str,
+        type: str,
+        parent: str,
+        op: str,
+        at: float,
+        custom: bool = True,
+    ) -> None:
+        with self._lock:
+            entry = self.resources.setdefault(
+                urn,
+                {
+                    "type": type,
+                    "parent": parent,
+                    "op": op,
+                    "custom": custom,
+                    "start": at,
+                    "end": None,
+                },
+            )
+            if kind == "start":
+                entry.update(op=op, start=at)
+            else:
+                entry.update(end=at, failed=kind == "failed")
+            if self.record_path:
+                line = {"kind": kind, "urn": urn, "type": type, "parent": parent}
+                line.update(op=op, at=at, custom=custom)
+                with self.record_path.open("a") as f:
+                    f.write(json.dumps(line) + "\n")
+
+    @classmethod
+    def replay(cls, path: Path) -> "DeployTimeline":
+        """from a recorded timeline or a raw `--event-log` file"""
+        timeline = cls()
+        for line in Path(path).read_text().splitlines():
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if "kind" in data:
+                timeline.record(**data)
+            else:
+                timeline.on_event(
+                    EngineEvent.from_json(data), at=float(data.get("timestamp", 0))
+                )
+        return timeline
+
+    def spans(self) -> list[Span]:
+        """finished resources in start order, unfinished ones end at the last event"""
+        with self._lock:
+            resources = dict(self.resources)
+        if not resources:
+            return []
+        last = max(r["end"] or r["start"] for r in resources.values())
+        return sorted(
+            (
+                Span(
+                    urn=urn,
+                    type=r["type"],
+                    parent=r["parent"],
+                    op=r["op"],
+                    start=r["start"],
+                    end=r["end"] if r["end"] is not None else last,
+                    failed=r.get("failed", False) or r["end"] is None,
+                    custom=r["custom"],
+                )
+                for urn, r in resources.items()
+                if r["type"] != ROOT
+            ),
+            key=lambda span: (span.start, span.urn),
+        )
+
+    def slowest(self, top: int = 15) -> list[Span]:
+        custom = [span for span in self.spans() if span.custom]
+        return sorted(custom, key=lambda span: -span.seconds)[:top]
+
+    def idle_gaps(self, min_gap: float = 1.0) -> list[tuple[float, float]]:
+        """(start, end) stretches where no custom resource was in flight"""
+        gaps = []
+        busy_until = None
+        for span in self.spans():
+            if not span.custom or span.op == "same":
+                continue
+            # back to back spans aren't a gap, even with min_gap 0
+            if busy_until is not None and span.start - busy_until >= max(min_gap, 1e-9):
+                gaps.append((busy_until, span.start))
+            busy_until = span.end if busy_until is None else max(busy_until, span.end)
+        return gaps
+
+    def chrome_trace(self) -> dict:
+        """
+        one process per parent component, resources packed into rows so
+        overlapping (parallel) ones never share a row
+        """
+        spans = self.spans()
+        if not spans:
+            return {"traceEvents": []}
+        origin = spans[0].start
+        pids: dict[str, int] = {}
+        # pid -> end time per row
+        rows: dict[int, list[float]] = {}
+        events = []
+        for span in spans:
+            group = span.parent if span.custom else span.urn
+            pid = pids.setdefault(group, len(pids) + 1)
+            if not span.custom:
+                tid = 0
+            else:
+                ends = rows.setdefault(pid, [])
+                tid = next(
+                    (i for i, end in enumerate(ends) if end <= span.start), len(ends)
+                )
+                if tid == len(ends):
+                    ends.append(span.end)
+                else:
+                    ends[tid] = span.end
+                tid += 1
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.type,
+                    "ph": "X",
+                    "ts": round((span.start - origin) * 1e6),
+                    "dur": round(span.seconds * 1e6),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"urn": span.urn, "op": span.op, "failed": span.failed},
+                }
+            )
+        events += [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": urn_label(group)}}
+            for group, pid in pids.items()
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.chrome_trace()))
+
+    def summary(self, top: int = 15, min_gap: float = 1.0) -> str:
+        spans = self.spans()
+        if not spans:
+            return "no resource events\n"
+        origin = spans[0].start
+        total = max(span.end for span in spans) - origin
+        lines = [
+            f"{len(spans)} resources over {total:.1f}s",
+            "",
+            f"{'seconds':>9}{'start':>9}  {'op':<8}resource (parent)",
+        ]
+        for span in self.slowest(top):
+            lines.append(
+                f"{span.seconds:>9.1f}{span.start - origin:>9.1f}  {span.op:<8}"
+                f"{span.type} {span.name} ({urn_label(span.parent)})"
+                + (" FAILED" if span.failed else "")
+            )
+        gaps = self.idle_gaps(min_gap)
+        lines += ["", f"idle gaps >= {min_gap}s: {len(gaps)}"]
+        for start, end in gaps:
+            lines.append(
+                f"{end - start:>9.1f}s idle from {start - origin:.1f}s to {end - origin:.1f}s"
+            )
+        return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("events", type=Path, help="recorded timeline or --event-log")
+    parser.add_argument("--trace", type=Path, help="write a Chrome trace json here")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--min-gap", type=float, default=1.0)
+    args = parser.parse_args()
+
+    timeline = DeployTimeline.replay(args.events)
+    print(timeline.summary(args.top, args.min_gap), end="")
+    if args.trace:
+        timeline.write_trace(args.trace)
+        print(f"wrote {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+File-backed IPAM registry so parallel ephemeral stacks get VPC CIDRs that
+never overlap (peering / transit attachments need that)
+- one SQLite database shared by every stack on the machine, next to the
+  eph file backend by default
+- eph_driver.py leases for stacks with `vpc_cidr: ipam` and passes the
+  block in as plain stack config, the programs never open the registry
+- leases are keyed by name (`project/stack`), leasing again returns the
+  same block so every preview / up of a stack sees the same vpc_cidr
+- free space is a buddy free list indexed by (pool, prefixlen, start):
+  allocation takes the smallest free block that fits and splits it,
+  release merges buddies back, each step one B-tree lookup so both stay
+  O(log n) in the number of leases
+- leases never overlap, so the (pool, start) index on them is the interval
+  index: the lease holding an address is the one with the greatest start
+  at or below it
+- every change runs in BEGIN IMMEDIATE, SQLite's write lock, so
+  concurrent stacks queue on the file instead of racing
+
+    cd pulumi
+    python ipam.py list
+    python ipam.py lease ipv6-eks-blueprint/eph-1
+    python ipam.py release ipv6-eks-blueprint/eph-1
+    python ipam.py bench                  # allocation rate as leases grow
+"""
+
+import argparse
+import ipaddress
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_PATH = Path("~/.pulumi-eph") / "ipam.sqlite"
+DEFAULT_POOL = "10.0.0.0/8"
+DEFAULT_PREFIXLEN = 16
+# seconds a writer waits on another process' lock before giving up
+LOCK_TIMEOUT_S = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pools (
+    cidr TEXT PRIMARY KEY,
+    start INTEGER NOT NULL,
+    prefixlen INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS free_blocks (
+    pool TEXT NOT NULL,
+    prefixlen INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    PRIMARY KEY (pool, prefixlen, start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    pool TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    prefixlen INTEGER NOT NULL,
+    leased_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS leases_by_start ON leases (pool, start);
+"""
+
+
+def _cidr(start: int, prefixlen: int) -> str:
+    return f"{ipaddress.IPv4Address(start)}/{prefixlen}"
+
+
+def _size(prefixlen: int) -> int:
+    return 1 << (32 - prefixlen)
+
+
+class IpamRegistry:
+    """IPv4 blocks leased by name out of one or more pools"""
+
+    def __init__(self, path: Path = DEFAULT_PATH):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # autocommit, transactions are explicit below
+        self._db = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT_S, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "IpamRegistry":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _write(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _pool(self, db: sqlite3.Connection, pool: str) -> tuple[str, int, int]:
+        """(cidr, start, prefixlen), registered with one free block on first use"""
+        network = ipaddress.ip_network(pool)
+        if network.version != 4:
+            raise ValueError(f"ipam pools are IPv4, got: {pool}")
+        cidr = str(network)
+        start = int(network.network_address)
+        if db.execute("SELECT 1 FROM pools WHERE cidr = ?", (cidr,)).fetchone() is None:
+            for (other,) in db.execute("SELECT cidr FROM pools"):
+                if network.overlaps(ipaddress.ip_network(other)):
+                    raise ValueError(f"pool {cidr} overlaps pool {other}")
+            db.execute("INSERT INTO pools VALUES (?, ?, ?)", (cidr, start, network.prefixlen))
+            db.execute(
+                "INSERT INTO free_blocks VALUES (?, ?, ?)", (cidr, network.prefixlen, start)
+            )
+        return cidr, start, network.prefixlen
+
+    def lease(
+        self,
+        name: str,
+        prefixlen: int = DEFAULT_PREFIXLEN,
+        pool: str = DEFAULT_POOL,
+        cidr: str | None = None,
+    ) -> str:
+        """
+        CIDR leased to name, allocating the lowest free block on first call
+        - cidr pins a specific block, e.g. to adopt a stack already on 10.0.0.0/16
+        """
+        with self._write() as db:
+            existing = db.execute(
+                "SELECT start, prefixlen FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if existing is not None:
+                leased = _cidr(*existing)
+                wanted = cidr and str(ipaddress.ip_network(cidr))
+                if (wanted or existing[1] != prefixlen) and wanted != leased:
+                    raise ValueError(
+                        f"{name} already leases {leased}, release it before asking for"
+                        f" {cidr or f'a /{prefixlen}'}"
+                    )
+                return leased
+            pool, _, pool_prefixlen = self._pool(db, pool)
+            if cidr is not None:
+                network = ipaddress.ip_network(cidr)
+                prefixlen = network.prefixlen
+                target = int(network.network_address)
+            if not pool_prefixlen <= prefixlen <= 32:
+                raise ValueError(f"can't lease a /{prefixlen} out of {pool}")
+            block = (
+                self._free_block(db, pool, prefixlen)
+                if cidr is None
+                else self._free_block_holding(db, pool, pool_prefixlen, target, prefixlen)
+            )
+            if block is None:
+                raise ValueError(self._no_space(db, pool, prefixlen, cidr))
+            block_prefixlen, start = block
+            db.execute(
+                "DELETE FROM free_blocks WHERE pool = ? AND prefixlen = ? AND start = ?",
+                (pool, block_prefixlen, start),
+            )
+            # split down to the wanted size, the half not taken goes back free
+            while block_prefixlen < prefixlen:
+                block_prefixlen += 1
+                half = _size(block_prefixlen)
+                if cidr is not None and target >= start + half:
+                    db.execute(
+                        "INSERT INTO free_blocks VALUES (?, ?, ?)", (pool, block_prefixlen, start)
+                    )
+                    start += half
+                else:
+                    db.execute(
+                        "INSERT INTO free_blocks VALUES (?, ?, ?)",
+                        (pool, block_prefixlen, start + half),
+                    )
+            db.execute(
+                "INSERT INTO leases VALUES (?, ?, ?, ?, ?)",
+                (name, pool, start, prefixlen, time.time()),
+            )
+            return _cidr(start, prefixlen)
+
+    def _free_block(
+        self, db: sqlite3.Connection, pool: str, prefixlen: int
+    ) -> tuple[int, int] | None:
+        """(prefixlen, start) of the lowest smallest free block a /prefixlen fits in"""
+        (best,) = db.execute(
+            "SELECT MAX(prefixlen) FROM free_blocks WHERE pool = ? AND prefixlen <= ?",
+            (pool, prefixlen),
+        ).fetchone()
+        if best is None:
+            return None
+        (start,) = db.execute(
+            "SELECT MIN(start) FROM free_blocks WHERE pool = ? AND prefixlen = ?",
+            (pool, best),
+        ).fetchone()
+        return best, start
+
+    def _free_block_holding(
+        self, db: sqlite3.Connection, pool: str, pool_prefixlen: int, target: int, prefixlen: int
+    ) -> tuple[int, int] | None:
+        # at most one free block per size can hold target
+        for block_prefixlen in range(pool_prefixlen, prefixlen + 1):
+            start = target & ~(_size(block_prefixlen) - 1)
+            row = db.execute(
+                "SELECT 1 FROM free_blocks WHERE pool = ? AND prefixlen = ? AND start = ?",
+                (pool, block_prefixlen, start),
+            ).fetchone()
+            if row is not None:
+                return block_prefixlen, start
+        return None
+
+    def _no_space(self, db: sqlite3.Connection, pool: str, prefixlen: int, cidr: str | None) -> str:
+        if cidr is None:
+            (count,) = db.execute("SELECT COUNT(*) FROM leases WHERE pool = ?", (pool,)).fetchone()
+            return f"no free /{prefixlen} left in {pool} ({count} leases), release some or add a pool"
+        network = ipaddress.ip_network(cidr)
+        if not network.subnet_of(ipaddress.ip_network(pool)):
+            return f"{cidr} is outside pool {pool}"
+        holder = self.lease_holding(str(network.network_address), pool, db)
+        if holder is None:
+            # a lease starting inside the block
+            row = db.execute(
+                "SELECT name FROM leases WHERE pool = ? AND start BETWEEN ? AND ? LIMIT 1",
+                (pool, int(network.network_address), int(network.broadcast_address)),
+            ).fetchone()
+            holder = row[0] if row else "another lease"
+        return f"{cidr} overlaps the lease of {holder}"
+
+    def get(self, name: str) -> str | None:
+        """CIDR leased to name, None without touching the registry"""
+        row = self._db.execute(
+            "SELECT start, prefixlen FROM leases WHERE name = ?", (name,)
+        ).fetchone()
+        return _cidr(*row) if row else None
+
+    def lease_holding(
+        self, address: str, pool: str = DEFAULT_POOL, db: sqlite3.Connection | None = None
+    ) -> str | None:
+        """name of the lease holding address, None if it's free"""
+        value = int(ipaddress.IPv4Address(address))
+        row = (db or self._db).execute(
+            "SELECT name, start, prefixlen FROM leases WHERE pool = ? AND start <= ?"
+            " ORDER BY start DESC LIMIT 1",
+            (str(ipaddress.ip_network(pool)), value),
+        ).fetchone()
+        if row is None or value >= row[1] + _size(row[2]):
+            return None
+        return row[0]
+
+    def release(self, name: str) -> str | None:
+        """free name's block, merging it with free buddies, None if it had none"""
+        with self._write() as db:
+            row = db.execute(
+                "SELECT pool, start, prefixlen FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            pool, start, prefixlen = row
+            released = _cidr(start, prefixlen)
+            db.execute("DELETE FROM leases WHERE name = ?", (name,))
+            (pool_prefixlen,) = db.execute(
+                "SELECT prefixlen FROM pools WHERE cidr = ?", (pool,)
+            ).fetchone()
+            while prefixlen > pool_prefixlen:
+                buddy = start ^ _size(prefixlen)
+                merged = db.execute(
+                    "DELETE FROM free_blocks WHERE pool = ? AND prefixlen = ? AND start = ?",
+                    (pool, prefixlen, buddy),
+                ).rowcount
+                if not merged:
+                    break
+                start = min(start, buddy)
+                prefixlen -= 1
+            db.execute("INSERT INTO free_blocks VALUES (?, ?, ?)", (pool, prefixlen, start))
+            return released
+
+    def leases(self) -> dict[str, str]:
+        """name -> CIDR in address order"""
+        return {
+            name: _cidr(start, prefixlen)
+            for name, start, prefixlen in self._db.execute(
+                "SELECT name, start, prefixlen FROM leases ORDER BY pool, start"
+            )
+        }
+
+    def free_blocks(self, pool: str = DEFAULT_POOL) -> list[str]:
+        return [
+            _cidr(start, prefixlen)
+            for prefixlen, start in self._db.execute(
+                "SELECT prefixlen, start FROM free_blocks WHERE pool = ? ORDER BY start",
+                (str(ipaddress.ip_network(pool)),),
+            )
+        ]
+
+
+def bench(leases: int = 20_000) -> None:
+    """allocation / release rates as the registry fills, plus overlap checks"""
+    import random
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp, IpamRegistry(Path(tmp) / "ipam.sqlite") as registry:
+        pinned = registry.lease("adopted", cidr="10.0.0.0/16")
+        assert registry.lease("adopted", cidr="10.0.0.0/16") == pinned
+        assert registry.lease_holding("10.0.3.4") == "adopted"
+        try:
+            registry.lease("clash", cidr="10.0.128.0/24")
+        except ValueError as error:
+            assert "adopted" in str(error), error
+        else:
+            raise AssertionError("overlapping pinned lease went through")
+
+        step = leases // 4
+        for first in range(0, leases, step):
+            start = time.perf_counter()
+            for n in range(first, first + step):
+                registry.lease(f"eph-{n}", prefixlen=24)
+            elapsed = time.perf_counter() - start
+            print(f"leases {first:>6}..{first + step:<6}{step / elapsed:>10,.0f} leases/s")
+
+        networks = sorted(ipaddress.ip_network(cidr) for cidr in registry.leases().values())
+        assert all(a.broadcast_address < b.network_address for a, b in zip(networks, networks[1:]))
+
+        names = [f"eph-{n}" for n in range(leases)]
+        random.Random(0).shuffle(names)
+        start = time.perf_counter()
+        for name in names:
+            registry.release(name)
+        elapsed = time.perf_counter() - start
+        print(f"release all{leases / elapsed:>21,.0f} releases/s")
+        registry.release("adopted")
+        # every buddy merged back into the pool
+        assert registry.free_blocks() == [DEFAULT_POOL], registry.free_blocks()[:5]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--pool", default=DEFAULT_POOL)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    lease = commands.add_parser("lease")
+    lease.add_argument("name")
+    lease.add_argument("--prefixlen", type=int, default=DEFAULT_PREFIXLEN)
+    lease.add_argument("--cidr", help="pin a specific block")
+    release = commands.add_parser("release")
+    release.add_argument("name")
+    commands.add_parser("bench")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench()
+        return
+    with IpamRegistry(args.path) as registry:
+        if args.command == "list":
+            for name, cidr in registry.leases().items():
+                print(f"{cidr:<20}{name}")
+        elif args.command == "lease":
+            print(registry.lease(args.name, args.prefixlen, args.pool, args.cidr))
+        else:
+            print(registry.release(args.name) or f"{args.name} has no lease")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,32 @@
 
 # Call pulumi files that are not constructors
 # ruff: noqa: F401
-import pulumi
-import pulumi_aws as aws
-from eks import Cluster
-from stack_config import (
+# First so every import after it is timed - PULUMI_STARTUP_PROFILE=<file>
+# - the imports below are late on purpose, hence `noqa: E402`
+import startup_profile
+
+startup_profile.install_from_env()
+
+import pulumi  # noqa: E402
+import pulumi_aws as aws  # noqa: E402
+import invoke_cache  # noqa: E402
+import layers  # noqa: E402
+from stack_config import (  # noqa: E402
     AZ_ZONE_IDS,
-    CLUSTER_VERSION,
-    EKS_CLUSTER_NAME,
-    SSO_ADMIN_ROLE_NAME,
-    VPC_CIDR,
+    INVOKE_CACHE_BYPASS,
+    INVOKE_CACHE_TTL,
+    LAYER,
+    NETWORK_STACK,
+    PRIVATE_SUBNET_MODE,
 )
-from vpc import Vpc
+
+if LAYER not in layers.LAYERS:
+    raise ValueError(f"layer must be one of {', '.join(layers.LAYERS)}, got: {LAYER}")
+if LAYER == "cluster" and not NETWORK_STACK:
+    raise ValueError(
+        "layer `cluster` needs network_stack,"
+        " e.g. organization/ipv6-eks-blueprint/eph-network"
+    )
 
 """
 IDEA: could create cluster parent component for all resources for easier reference
@@ -20,33 +35,46 @@ in child components
 """
 
 """
-Get available AZ names by speicific zone ids in config
-- ensures same physical location across multiple AWS accounts
+Startup lookups go through a local TTL cache so repeat previews skip them
+- set `invoke_cache_bypass: true` in stack config to force fresh lookups
+- Output-form so nothing blocks here - only resources that actually need
+  the account id / AZs wait on them
 """
-available_azs = aws.get_availability_zones(
-    filters=[
-        {"name": "opt-in-status", "values": ["opt-in-not-required"]},
-        {"name": "zone-id", "values": AZ_ZONE_IDS},
-    ]
+startup_cache = invoke_cache.InvokeCache(
+    ttl_seconds=INVOKE_CACHE_TTL, bypass=INVOKE_CACHE_BYPASS
 )
-# Use zone_id to ensure same physical location across multiple accounts
-selected_az_names = available_azs.names
-selected_az_zone_ids = available_azs.zone_ids
+caller_identity = invoke_cache.get_caller_identity_output(startup_cache)
 
 # SINGLE REGION SETUP FOR NOW - us-east-1
 
-# USE REGION STACK NAME TO AVOID DUPE ARN's FOR FUTURE REGIONS
-eks_vpc = Vpc(
-    name=EKS_CLUSTER_NAME,
-    az_zone_ids=selected_az_zone_ids,
-    cluster_name=EKS_CLUSTER_NAME,
-    vpc_cidr_block=VPC_CIDR,
-)
+if LAYER == "cluster":
+    vpc_id, private_subnet_ids, private_subnet_mode = layers.network_from_stack(
+        NETWORK_STACK
+    )
+else:
+    """
+    Get available AZ names by speicific zone ids in config
+    - ensures same physical location across multiple AWS accounts
+    """
+    available_azs = invoke_cache.get_availability_zones_output(
+        startup_cache,
+        account_id=caller_identity["account_id"],
+        filters=[
+            {"name": "opt-in-status", "values": ["opt-in-not-required"]},
+            {"name": "zone-id", "values": AZ_ZONE_IDS},
+        ],
+    )
+    # Use zone_id to ensure same physical location across multiple accounts
+    # - subnets follow the configured AZ_ZONE_IDS order, the lookup only validates
+    eks_vpc = layers.network(available_zone_ids=available_azs["zone_ids"])
+    vpc_id = eks_vpc.vpc.id
+    private_subnet_ids = [subnet.id for subnet in eks_vpc.private_subnets]
+    private_subnet_mode = PRIVATE_SUBNET_MODE
 
-eks_cluster = Cluster(
-    name=EKS_CLUSTER_NAME,
-    cluster_version=CLUSTER_VERSION,
-    admin_role_name=SSO_ADMIN_ROLE_NAME,
-    private_subnet_ids=[subnet.id for subnet in eks_vpc.private_subnets],
-    vpc_id=eks_vpc.vpc.id,
-)
+if LAYER != "network":
+    eks_cluster = layers.cluster(
+        account_id=caller_identity["account_id"],
+        vpc_id=vpc_id,
+        private_subnet_ids=private_subnet_ids,
+        private_subnet_mode=private_subnet_mode,
+    )
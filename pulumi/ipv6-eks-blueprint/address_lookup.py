@@ -0,0 +1,259 @@
+"""
+IP -> subnet / tier / AZ lookups over the exported address plan
+- `pulumi stack output address_plan --json > plan.json` then
+  AddressIndex.load("plan.json")
+- one Patricia trie per family, nodes kept in flat lists (no node objects)
+- lookup() walks the trie, lookup_codes() takes an iterable of addresses
+  (strings or ints) and returns an array of subnet codes, -1 for no match
+- bulk lookups flatten the trie into one hash per distinct prefix length,
+  longest first - same answer, a plan only has a couple of lengths
+- no dependencies outside the stdlib so flow log / kube event tooling can
+  vendor this file as is
+
+tests/test_address_lookup.py checks the trie and bulk paths against
+ipaddress, `python address_lookup.py` prints lookup rates
+"""
+
+import ipaddress
+import json
+import socket
+from array import array
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+NO_MATCH = -1
+
+
+class PlanSubnet(NamedTuple):
+    tier: str
+    zone_id: str
+    # None for ipv6_only tiers
+    cidr_block: str | None
+    ipv6_cidr_block: str | None
+
+
+class PrefixTrie:
+    """Patricia (path compressed binary) trie mapping prefixes to int values"""
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        # node i: network int, prefix length, child for bit 0 / 1, value
+        self._key = [0]
+        self._length = [0]
+        self._zero = [-1]
+        self._one = [-1]
+        self._value = [NO_MATCH]
+        self._levels: list[tuple[int, dict[int, int]]] | None = None
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._value if value != NO_MATCH)
+
+    def _node(self, key: int, length: int, value: int) -> int:
+        self._key.append(key)
+        self._length.append(length)
+        self._zero.append(-1)
+        self._one.append(-1)
+        self._value.append(value)
+        return len(self._key) - 1
+
+    def _bit(self, key: int, position: int) -> int:
+        return (key >> (self.bits - 1 - position)) & 1
+
+    def _mask(self, length: int) -> int:
+        return ((1 << length) - 1) << (self.bits - length)
+
+    def _children(self, bit: int) -> list[int]:
+        return self._one if bit else self._zero
+
+    def insert(self, network: int, length: int, value: int) -> None:
+        self._levels = None
+        key = network & self._mask(length)
+        node = 0
+        while True:
+            if self._length[node] == length:
+                self._value[node] = value
+                return
+            children = self._children(self._bit(key, self._length[node]))
+            child = children[node]
+            if child == -1:
+                children[node] = self._node(key, length, value)
+                return
+            child_length = self._length[child]
+            limit = min(child_length, length)
+            diff = self._key[child] ^ key
+            common = min(self.bits - diff.bit_length(), limit) if diff else limit
+            if common == child_length:
+                node = child
+                continue
+            if common == length:
+                # new prefix sits above the child
+                split = self._node(key, length, value)
+            else:
+                split = self._node(key & self._mask(common), common, NO_MATCH)
+                self._children(self._bit(key, common))[split] = self._node(
+                    key, length, value
+                )
+            self._children(self._bit(self._key[child], common))[split] = child
+            children[node] = split
+            return
+
+    def lookup(self, address: int) -> int:
+        """value of the longest prefix holding address, NO_MATCH if none"""
+        best = self._value[0]
+        node = 0
+        bits = self.bits
+        while self._length[node] < bits:
+            bit = (address >> (bits - 1 - self._length[node])) & 1
+            child = (self._one if bit else self._zero)[node]
+            if child == -1:
+                break
+            if (address ^ self._key[child]) >> (bits - self._length[child]):
+                break
+            node = child
+            if self._value[node] != NO_MATCH:
+                best = self._value[node]
+        return best
+
+    def levels(self) -> list[tuple[int, dict[int, int]]]:
+        """(shift, {address >> shift: value}) per prefix length, longest first"""
+        if self._levels is None:
+            by_length: dict[int, dict[int, int]] = {}
+            for key, length, value in zip(self._key, self._length, self._value):
+                if value != NO_MATCH:
+                    by_length.setdefault(length, {})[key >> (self.bits - length)] = value
+            self._levels = [
+                (self.bits - length, by_length[length])
+                for length in sorted(by_length, reverse=True)
+            ]
+        return self._levels
+
+    def lookup_many(self, addresses: Iterable[int]) -> array:
+        levels = self.levels()
+        if len(levels) == 1:
+            shift, table = levels[0]
+            return array("i", [table.get(a >> shift, NO_MATCH) for a in addresses])
+        out = array("i")
+        for a in addresses:
+            for shift, table in levels:
+                value = table.get(a >> shift)
+                if value is not None:
+                    break
+            else:
+                value = NO_MATCH
+            out.append(value)
+        return out
+
+
+def address_int(address: str) -> tuple[int, int]:
+    """(family bits, int) without going through ipaddress"""
+    if ":" in address:
+        return 128, int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+    return 32, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+
+
+class AddressIndex:
+    """subnet codes for addresses from an address plan"""
+
+    def __init__(self, plan: dict):
+        # code -> subnet, codes follow the plan's tier / AZ order
+        self.subnets: list[PlanSubnet] = []
+        self.v4 = PrefixTrie(32)
+        self.v6 = PrefixTrie(128)
+        for tier, zones in plan.items():
+            for zone_id, cidrs in zones.items():
+                code = len(self.subnets)
+                self.subnets.append(
+                    PlanSubnet(
+                        tier, zone_id, cidrs.get("cidr_block"), cidrs.get("ipv6_cidr_block")
+                    )
+                )
+                for cidr in (cidrs.get("cidr_block"), cidrs.get("ipv6_cidr_block")):
+                    if not cidr:
+                        # ipv6_only tiers have no IPv4, IPv6 is unknown until
+                        # the VPC block is allocated
+                        continue
+                    network = ipaddress.ip_network(cidr)
+                    trie = self.v4 if network.version == 4 else self.v6
+                    trie.insert(int(network.network_address), network.prefixlen, code)
+
+    @classmethod
+    def load(cls, path: Path) -> "AddressIndex":
+        """from `pulumi stack output address_plan --json`"""
+        return cls(json.loads(Path(path).read_text()))
+
+    def code(self, address: str | int, version: int | None = None) -> int:
+        if isinstance(address, str):
+            bits, value = address_int(address)
+            trie = self.v6 if bits == 128 else self.v4
+        else:
+            value = address
+            trie = self.v6 if (version or (6 if address >= 1 << 32 else 4)) == 6 else self.v4
+        return trie.lookup(value)
+
+    def lookup(self, address: str | int, version: int | None = None) -> PlanSubnet | None:
+        code = self.code(address, version)
+        return self.subnets[code] if code != NO_MATCH else None
+
+    def lookup_codes(self, addresses: Iterable[str | int], version: int | None = None) -> array:
+        """
+        subnet code per address, NO_MATCH (-1) for addresses outside the plan
+        - ints need version (4 / 6) since small IPv6 ints look like IPv4
+        - strings can mix families
+        """
+        if version == 4:
+            return self.v4.lookup_many(addresses)
+        if version == 6:
+            return self.v6.lookup_many(addresses)
+        out = array("i")
+        v4_levels = self.v4.levels()
+        v6_levels = self.v6.levels()
+        for address in addresses:
+            bits, value = address_int(address) if isinstance(address, str) else (
+                128 if address >= 1 << 32 else 32,
+                address,
+            )
+            for shift, table in v6_levels if bits == 128 else v4_levels:
+                code = table.get(value >> shift)
+                if code is not None:
+                    break
+            else:
+                code = NO_MATCH
+            out.append(code)
+        return out
+
+    def decode(self, codes: Iterable[int]) -> list[tuple[str, str] | None]:
+        """codes -> (tier, zone id)"""
+        return [
+            (self.subnets[code].tier, self.subnets[code].zone_id) if code != NO_MATCH else None
+            for code in codes
+        ]
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    from vpc import build_address_plan
+
+    zone_ids = [f"use1-az{n}" for n in range(1, 7)]
+    plan = build_address_plan("10.0.0.0/16", "2600:1f18:1234:ab00::/56", zone_ids, ipv4_newbits=4)
+    index = AddressIndex(plan)
+
+    # random addresses inside and around the VPC blocks
+    rng = random.Random(0)
+    v6_base = int(ipaddress.ip_address("2600:1f18:1234:ab00::"))
+    v4_base = int(ipaddress.ip_address("10.0.0.0"))
+    v6 = [v6_base + rng.getrandbits(68) for _ in range(200_000)]
+    v4 = [v4_base + rng.getrandbits(17) for _ in range(200_000)]
+
+    strings = [str(ipaddress.IPv6Address(a)) for a in v6[:100_000]]
+    for label, run, count in (
+        ("trie lookup, int", lambda: [index.v6.lookup(a) for a in v6], len(v6)),
+        ("bulk ints, IPv6", lambda: index.lookup_codes(v6, version=6), len(v6)),
+        ("bulk ints, IPv4", lambda: index.lookup_codes(v4, version=4), len(v4)),
+        ("bulk strings, IPv6", lambda: index.lookup_codes(strings), len(strings)),
+    ):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<22}{count / elapsed / 1e6:>8.2f}M lookups/s")
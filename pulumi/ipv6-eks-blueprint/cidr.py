@@ -0,0 +1,133 @@
+"""
+CIDR helpers
+- child prefixes computed with integer math, the VPC address plan goes
+  through cidr_subnet_bulk
+- never materializes `network.subnets()` so cost stays flat as newbits grows
+- works for both IPv4 and IPv6 parents
+
+tests/test_cidr.py checks the terraform doc examples, `python cidr.py`
+runs micro-benchmarks against list materialization
+"""
+
+import ipaddress
+
+"""
+TERRAFORM COMPATIBLE
+- same results and error messages as terraform's cidrsubnet() / cidrsubnets()
+- host bits on the prefix are masked off like terraform does, not rejected
+"""
+
+# terraform caps a single extension at 32 bits for 32-bit platform portability
+MAX_NEWBITS = 32
+
+
+def _family(network) -> str:
+    return "IPv4" if network.version == 4 else "IPv6"
+
+
+def cidr_subnet_bulk(prefix: str, pairs: list[tuple[int, int]]) -> list[str]:
+    """cidrsubnet() for many (newbits, netnum) pairs - parses prefix once"""
+    network = ipaddress.ip_network(prefix, strict=False)
+    address = type(network.network_address)
+    base = int(network.network_address)
+    subnets = []
+    for newbits, netnum in pairs:
+        if newbits < 0:
+            raise ValueError(f"newbits must not be negative, got {newbits}")
+        if newbits > MAX_NEWBITS:
+            raise ValueError(
+                f"may not extend prefix by more than {MAX_NEWBITS} bits"
+            )
+        new_prefixlen = network.prefixlen + newbits
+        if new_prefixlen > network.max_prefixlen:
+            raise ValueError(
+                "insufficient address space to extend prefix of "
+                f"{network.prefixlen} by {newbits}"
+            )
+        if not 0 <= netnum < 1 << newbits:
+            raise ValueError(
+                f"prefix extension of {newbits} does not accommodate a subnet "
+                f"numbered {netnum}"
+            )
+        start = base + (netnum << (network.max_prefixlen - new_prefixlen))
+        subnets.append(f"{address(start)}/{new_prefixlen}")
+    return subnets
+
+
+# cidr_subnet function like terraform-aws-module
+def cidr_subnet(prefix: str, newbits: int, netnum: int) -> str:
+    """terraform cidrsubnet() for IPv4 or IPv6"""
+    return cidr_subnet_bulk(prefix, [(newbits, netnum)])[0]
+
+
+def cidr_subnets(prefix: str, *newbits: int) -> list[str]:
+    """
+    terraform cidrsubnets() - consecutive, non-overlapping subnets
+    - each one is aligned to its own size, so mixed sizes can leave gaps
+    """
+    network = ipaddress.ip_network(prefix, strict=False)
+    address = type(network.network_address)
+    width = network.max_prefixlen
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    # start from the same sized block just before the prefix, wrapping at zero
+    before = (first - 1) % (1 << width)
+    current = (before & ~((1 << (width - network.prefixlen)) - 1), network.prefixlen)
+    subnets = []
+    for bits in newbits:
+        if bits < 1:
+            raise ValueError("must extend prefix by at least one bit")
+        if bits > MAX_NEWBITS:
+            raise ValueError(
+                f"may not extend prefix by more than {MAX_NEWBITS} bits"
+            )
+        prefixlen = network.prefixlen + bits
+        if prefixlen > width:
+            raise ValueError(
+                f"would extend prefix to {prefixlen} bits, which is too long "
+                f"for an {_family(network)} address"
+            )
+        # last address of the current subnet, widened to the new size, plus one
+        current_start, current_len = current
+        current_last = current_start | ((1 << (width - current_len)) - 1)
+        host_mask = (1 << (width - prefixlen)) - 1
+        next_start = (current_last | host_mask) + 1
+        if next_start >= 1 << width or not first <= next_start <= last:
+            raise ValueError(
+                "not enough remaining address space for a subnet with a prefix "
+                f"of {prefixlen} bits after {address(current_start)}/{current_len}"
+            )
+        current = (next_start, prefixlen)
+        subnets.append(f"{address(next_start)}/{prefixlen}")
+    return subnets
+
+
+if __name__ == "__main__":
+    import timeit
+
+    def _materialized(prefix: str, newbits: int, index: int) -> str:
+        network = ipaddress.ip_network(prefix)
+        return str(list(network.subnets(prefixlen_diff=newbits))[index])
+
+    print(f"{'parent':<24}{'newbits':>8}{'list() us':>14}{'cidr_subnet() us':>20}")
+    for parent, newbits_range in (
+        ("2600:1f18:abcd:ab00::/56", (4, 8, 12, 16, 20, 24, 32)),
+        ("2600:1f18:abcd::/48", (8, 16)),
+        ("10.0.0.0/8", (4, 8, 12, 16)),
+    ):
+        for newbits in newbits_range:
+            runs = 200
+            fast = timeit.timeit(
+                lambda parent=parent, newbits=newbits: cidr_subnet(parent, newbits, 3),
+                number=runs,
+            )
+            slow = "skipped"
+            # materializing 2**20 networks takes seconds and hundreds of MB
+            if newbits <= 16:
+                slow_runs = max(1, runs >> max(0, newbits - 8))
+                slow_time = timeit.timeit(
+                    lambda parent=parent, newbits=newbits: _materialized(parent, newbits, 3),
+                    number=slow_runs,
+                )
+                slow = f"{slow_time / slow_runs * 1e6:.1f}"
+            print(f"{parent:<24}{newbits:>8}{slow:>14}{fast / runs * 1e6:>20.1f}")
@@ -4,9 +4,763 @@ EKS Cluster Setup
 """
 
 import json
+from dataclasses import dataclass, field
 
 import pulumi
 import pulumi_aws as aws
+import yaml
+from instance_catalog import arch_of, select_instance_types
+from performance import PERFORMANCE_PROFILES
+from user_data import (
+    BottlerocketSettings,
+    data_volume_mapping,
+    nodeadm_user_data,
+    root_volume_mapping,
+)
+
+# Addons Cluster can manage on top of vpc-cni
+OPTIONAL_ADDONS = ("coredns", "kube-proxy")
+
+
+@dataclass(frozen=True)
+class VpcCniConfig:
+    """
+    vpc-cni addon settings that drive pod startup latency under bursts
+    - IPv6 clusters hand each node a /80 prefix so prefix delegation is always
+      on, the cluster is created with ip_family ipv6
+    - warm / minimum targets are how many prefixes / IPs ipamd keeps attached
+      ahead of scheduling, None leaves the EKS default
+    """
+
+    warm_prefix_target: int | None = 1
+    warm_ip_target: int | None = None
+    minimum_ip_target: int | None = None
+    enable_network_policy: bool = False
+
+    def __post_init__(self):
+        for field_name in ("warm_prefix_target", "warm_ip_target", "minimum_ip_target"):
+            value = getattr(self, field_name)
+            if value is not None and (not isinstance(value, int) or value < 0):
+                raise ValueError(f"{field_name} must be an int >= 0, got: {value!r}")
+        if not any((self.warm_prefix_target, self.warm_ip_target, self.minimum_ip_target)):
+            raise ValueError(
+                "set at least one of warm_prefix_target, warm_ip_target, minimum_ip_target"
+            )
+
+    def configuration_values(self) -> str:
+        """addon configuration_values JSON - env values are strings in the schema"""
+        env = {"ENABLE_PREFIX_DELEGATION": "true"}
+        for key, value in (
+            ("WARM_PREFIX_TARGET", self.warm_prefix_target),
+            ("WARM_IP_TARGET", self.warm_ip_target),
+            ("MINIMUM_IP_TARGET", self.minimum_ip_target),
+        ):
+            if value is not None:
+                env[key] = str(value)
+        return json.dumps(
+            {
+                "enableNetworkPolicy": str(self.enable_network_policy).lower(),
+                "env": env,
+            },
+            sort_keys=True,
+        )
+
+
+CAPACITY_TYPES = ("ON_DEMAND", "SPOT")
+
+
+def split_scaling(
+    min_size: int, desired_size: int, max_size: int, az_count: int
+) -> list[tuple[int, int, int]]:
+    """
+    Spread a node group's total min / desired / max over per-AZ groups
+    - remainders go to the first AZs, e.g. desired 5 over 3 AZs -> 2, 2, 1
+    - every AZ can scale to at least 1 node
+    """
+
+    def spread(total: int) -> list[int]:
+        base, extra = divmod(total, az_count)
+        return [base + (1 if n < extra else 0) for n in range(az_count)]
+
+    return [
+        (low, want, max(high, want, 1))
+        for low, want, high in zip(spread(min_size), spread(desired_size), spread(max_size))
+    ]
+
+
+# arch -> managed node group AMI type when the profile doesn't set one
+ARM_AMI_TYPE = "AL2023_ARM_64_STANDARD"
+# kubelet config goes through nodeadm so performance profiles pin AL2023
+X86_AMI_TYPE = "AL2023_x86_64_STANDARD"
+BOTTLEROCKET_AMI_TYPES = {"x86_64": "BOTTLEROCKET_x86_64", "arm64": "BOTTLEROCKET_ARM_64"}
+
+
+@dataclass(frozen=True)
+class NodeGroupProfile:
+    """
+    One managed node group
+    - instance_types wins, otherwise picked from instance_catalog using
+      arch / min_vcpu / min_memory_gib / max_price / min_network_gbps
+    - default is the original `initial` m5.large group so names don't move
+    - x86_64 leaves ami_type to EKS like before, arm64 needs AL2023 ARM
+    - per_az: one node group per private subnet, sizes are totals split
+      across the AZs with split_scaling
+    - SPOT wants more instance types to draw from, raise max_types
+    - bottlerocket: BottlerocketSettings (or its dict form) switches the
+      launch template to Bottlerocket with TOML user data, see user_data.py
+    - data_volume_snapshot_id: snapshot of a Bottlerocket data volume with
+      images already pulled, nodes skip the cold pulls on boot
+    - performance_profile: general / latency / throughput from performance.py,
+      gp3 volume + kubelet config, instance types are checked against it
+    """
+
+    name: str = "initial"
+    instance_types: tuple | None = ("m5.large",)
+    arch: str = "x86_64"
+    min_vcpu: int = 2
+    min_memory_gib: float = 0
+    max_price: float | None = None
+    min_network_gbps: float = 0
+    max_types: int = 4
+    ami_type: str | None = None
+    desired_size: int = 1
+    min_size: int = 1
+    max_size: int = 2
+    labels: dict = field(default_factory=dict)
+    capacity_type: str = "ON_DEMAND"
+    per_az: bool = False
+    bottlerocket: BottlerocketSettings | None = None
+    data_volume_snapshot_id: str | None = None
+    data_volume_size_gib: int = 20
+    performance_profile: str | None = None
+
+    def __post_init__(self):
+        if isinstance(self.bottlerocket, dict):
+            # stack config objects come in as dicts
+            object.__setattr__(self, "bottlerocket", BottlerocketSettings(**self.bottlerocket))
+        if self.data_volume_snapshot_id and self.bottlerocket is None:
+            raise ValueError(
+                f"node group {self.name}: data_volume_snapshot_id needs bottlerocket settings"
+            )
+        if (
+            self.bottlerocket is not None
+            and self.ami_type
+            and not self.ami_type.startswith("BOTTLEROCKET_")
+        ):
+            raise ValueError(
+                f"node group {self.name}: bottlerocket settings need a BOTTLEROCKET_* ami_type,"
+                f" got: {self.ami_type}"
+            )
+        if self.capacity_type not in CAPACITY_TYPES:
+            raise ValueError(
+                f"node group {self.name}: capacity_type must be one of"
+                f" {', '.join(CAPACITY_TYPES)}, got: {self.capacity_type}"
+            )
+        if not self.min_size <= self.desired_size <= self.max_size:
+            raise ValueError(
+                f"node group {self.name}: need min_size <= desired_size <= max_size,"
+                f" got {self.min_size} / {self.desired_size} / {self.max_size}"
+            )
+        if self.instance_types and arch_of(list(self.instance_types)) != self.arch:
+            raise ValueError(
+                f"node group {self.name}: instance_types aren't {self.arch}"
+            )
+        if self.performance_profile is not None:
+            if self.performance_profile not in PERFORMANCE_PROFILES:
+                raise ValueError(
+                    f"node group {self.name}: performance_profile must be one of"
+                    f" {', '.join(PERFORMANCE_PROFILES)}, got: {self.performance_profile}"
+                )
+            if self.ami_type and not self.ami_type.startswith(("AL2023_", "BOTTLEROCKET_")):
+                raise ValueError(
+                    f"node group {self.name}: performance profiles need an AL2023 or"
+                    f" Bottlerocket ami_type, got: {self.ami_type}"
+                )
+            try:
+                self.performance().check_instance_types(self.resolved_instance_types())
+            except ValueError as err:
+                raise ValueError(f"node group {self.name}: {err}") from None
+
+    def performance(self):
+        return PERFORMANCE_PROFILES.get(self.performance_profile)
+
+    def resolved_instance_types(self) -> list[str]:
+        if self.instance_types:
+            return list(self.instance_types)
+        performance = self.performance()
+        return select_instance_types(
+            arch=self.arch,
+            min_vcpu=max(self.min_vcpu, performance.min_vcpu if performance else 0),
+            min_memory_gib=self.min_memory_gib,
+            max_price=self.max_price,
+            min_network_gbps=self.min_network_gbps,
+            max_types=self.max_types,
+            min_baseline_network_gbps=(
+                performance.min_baseline_network_gbps if performance else 0
+            ),
+            min_ebs_mbps=performance.min_ebs_mbps if performance else 0,
+            min_ebs_iops=performance.min_ebs_iops if performance else 0,
+        )
+
+    def user_data(self) -> str | None:
+        """base64 launch template user data, None leaves it all to EKS"""
+        kubelet_config = self.performance().kubelet_config() if self.performance() else {}
+        if self.bottlerocket is not None:
+            return self.bottlerocket.with_kubelet_config(kubelet_config).user_data()
+        if kubelet_config:
+            return nodeadm_user_data(kubelet_config)
+        return None
+
+    def block_device_mappings(self) -> list | None:
+        """gp3 volumes from the performance profile / Bottlerocket data volume"""
+        performance = self.performance()
+        if self.bottlerocket is not None:
+            # images and pod storage live on the data volume, not the OS one
+            if performance is None:
+                return [data_volume_mapping(self.data_volume_snapshot_id, self.data_volume_size_gib)]
+            return [
+                data_volume_mapping(
+                    self.data_volume_snapshot_id,
+                    max(self.data_volume_size_gib, performance.volume_size_gib),
+                    iops=performance.volume_iops,
+                    throughput=performance.volume_throughput_mibps,
+                )
+            ]
+        if performance is not None:
+            return [
+                root_volume_mapping(
+                    performance.volume_size_gib,
+                    iops=performance.volume_iops,
+                    throughput=performance.volume_throughput_mibps,
+                )
+            ]
+        return None
+
+    def resolved_ami_type(self) -> str | None:
+        if self.ami_type:
+            return self.ami_type
+        if self.bottlerocket is not None:
+            return BOTTLEROCKET_AMI_TYPES[self.arch]
+        if self.arch == "x86_64":
+            return X86_AMI_TYPE if self.performance_profile else None
+        return ARM_AMI_TYPE
+
+
+# Karpenter NodePool requirement operators / consolidation policies (karpenter.sh/v1)
+KARPENTER_OPERATORS = ("In", "NotIn", "Exists", "DoesNotExist", "Gt", "Lt")
+KARPENTER_CONSOLIDATION_POLICIES = ("WhenEmpty", "WhenEmptyOrUnderutilized")
+
+# ARM t4g pool from terraform eks_ipv4_karpenter_mng/karpenter.tf
+DEFAULT_KARPENTER_REQUIREMENTS = (
+    {"key": "karpenter.k8s.aws/instance-family", "operator": "In", "values": ["t4g"]},
+    {"key": "karpenter.k8s.aws/instance-cpu", "operator": "In", "values": ["4"]},
+    {"key": "karpenter.k8s.aws/instance-hypervisor", "operator": "In", "values": ["nitro"]},
+    {"key": "karpenter.k8s.aws/instance-generation", "operator": "Gt", "values": ["2"]},
+    {"key": "kubernetes.io/arch", "operator": "In", "values": ["arm64"]},
+)
+
+
+@dataclass(frozen=True)
+class KarpenterNodePool:
+    """
+    One karpenter.sh/v1 NodePool on the `default` EC2NodeClass
+    - requirements are NodePool requirement dicts: {key, operator, values}
+    - cpu_limit caps the pool's total vCPU, the main cost guard
+    """
+
+    name: str = "default"
+    requirements: tuple = DEFAULT_KARPENTER_REQUIREMENTS
+    cpu_limit: int = 4
+    consolidation_policy: str = "WhenEmpty"
+    consolidate_after: str = "3600s"
+
+    def __post_init__(self):
+        if self.consolidation_policy not in KARPENTER_CONSOLIDATION_POLICIES:
+            raise ValueError(
+                f"node pool {self.name}: consolidation_policy must be one of"
+                f" {', '.join(KARPENTER_CONSOLIDATION_POLICIES)},"
+                f" got: {self.consolidation_policy}"
+            )
+        for requirement in self.requirements:
+            if requirement.get("operator") not in KARPENTER_OPERATORS:
+                raise ValueError(
+                    f"node pool {self.name}: requirement operator must be one of"
+                    f" {', '.join(KARPENTER_OPERATORS)}, got: {requirement}"
+                )
+            if "key" not in requirement:
+                raise ValueError(f"node pool {self.name}: requirement has no key: {requirement}")
+
+    def manifest(self) -> dict:
+        return {
+            "apiVersion": "karpenter.sh/v1",
+            "kind": "NodePool",
+            "metadata": {"name": self.name},
+            "spec": {
+                "template": {
+                    "spec": {
+                        "nodeClassRef": {
+                            "group": "karpenter.k8s.aws",
+                            "kind": "EC2NodeClass",
+                            "name": "default",
+                        },
+                        "requirements": [dict(r) for r in self.requirements],
+                    }
+                },
+                "limits": {"cpu": self.cpu_limit},
+                "disruption": {
+                    "consolidationPolicy": self.consolidation_policy,
+                    "consolidateAfter": self.consolidate_after,
+                },
+            },
+        }
+
+
+class Karpenter(pulumi.ComponentResource):
+    """
+    AWS side of Karpenter - port of terraform eks_ipv4_karpenter_mng/karpenter.tf
+    - IRSA controller role, interruption SQS queue + EventBridge rules
+    - nodes reuse the cluster's node_iam_role / node_sg, the managed node
+      group already created the role's EC2_LINUX access entry
+    - subnets found through the `karpenter.sh/discovery` tags Vpc sets
+    - no kubernetes provider in this project so the helm values and the
+      EC2NodeClass / NodePool manifests are rendered as outputs:
+        helm upgrade --install karpenter oci://public.ecr.aws/karpenter/karpenter \\
+          --version <chart_version> -n karpenter --create-namespace -f values.yaml
+        kubectl apply -f manifests.yaml
+    """
+
+    def __init__(
+        self,
+        name: str,
+        account_id: pulumi.Input[str],
+        cluster: aws.eks.Cluster,
+        node_iam_role: aws.iam.Role,
+        node_sg: aws.ec2.SecurityGroup,
+        node_pools: list,
+        ami_alias: str = "bottlerocket@latest",
+        chart_version: str = "1.3.3",
+        namespace: str = "karpenter",
+        service_account: str = "karpenter",
+        ipv6_only_subnets: pulumi.Input[bool] = False,
+        opts: pulumi.ResourceOptions = None,
+    ):
+        if len({pool.name for pool in node_pools}) != len(node_pools):
+            raise ValueError("karpenter node pool names must be unique")
+        super().__init__(t="eph:eks:Karpenter", name=name, props=None, opts=opts)
+
+        self.chart_version = chart_version
+        region = aws.get_region_output().name
+
+        """
+        IRSA
+        # module.eks.aws_iam_openid_connect_provider.oidc_provider[0]:
+        - no thumbprint needed, AWS trusts the EKS OIDC root CA directly
+        """
+
+        issuer = cluster.identities[0].oidcs[0].issuer
+        issuer_host = issuer.apply(lambda url: url.removeprefix("https://"))
+
+        self.oidc_provider = aws.iam.OpenIdConnectProvider(
+            resource_name=f"{name}-oidc",
+            client_id_lists=["sts.amazonaws.com"],
+            url=issuer,
+            tags={"Name": f"{name}-oidc"},
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        """
+        INTERRUPTION QUEUE
+        # module.karpenter.aws_sqs_queue.this[0]:
+        # module.karpenter.aws_sqs_queue_policy.this[0]:
+        # module.karpenter.aws_cloudwatch_event_rule.this["*"]:
+        # module.karpenter.aws_cloudwatch_event_target.this["*"]:
+        """
+
+        self.queue = aws.sqs.Queue(
+            resource_name=f"{name}-karpenter",
+            message_retention_seconds=300,
+            sqs_managed_sse_enabled=True,
+            tags={"Name": f"{name}-karpenter"},
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        aws.sqs.QueuePolicy(
+            resource_name=f"{name}-karpenter",
+            queue_url=self.queue.url,
+            policy=self.queue.arn.apply(
+                lambda queue_arn: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Sid": "SqsWrite",
+                                "Effect": "Allow",
+                                "Principal": {
+                                    "Service": ["events.amazonaws.com", "sqs.amazonaws.com"]
+                                },
+                                "Action": "sqs:SendMessage",
+                                "Resource": queue_arn,
+                            },
+                            {
+                                "Sid": "DenyHTTP",
+                                "Effect": "Deny",
+                                "Principal": "*",
+                                "Action": "sqs:*",
+                                "Resource": queue_arn,
+                                "Condition": {"Bool": {"aws:SecureTransport": "false"}},
+                            },
+                        ],
+                    }
+                )
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        interruption_events = {
+            "health": {"source": ["aws.health"], "detail-type": ["AWS Health Event"]},
+            "spot-interrupt": {
+                "source": ["aws.ec2"],
+                "detail-type": ["EC2 Spot Instance Interruption Warning"],
+            },
+            "rebalance": {
+                "source": ["aws.ec2"],
+                "detail-type": ["EC2 Instance Rebalance Recommendation"],
+            },
+            "instance-state-change": {
+                "source": ["aws.ec2"],
+                "detail-type": ["EC2 Instance State-change Notification"],
+            },
+        }
+        for event_name, event_pattern in interruption_events.items():
+            rule = aws.cloudwatch.EventRule(
+                resource_name=f"{name}-karpenter-{event_name}",
+                name_prefix=f"{name[:20]}-{event_name[:10]}-",
+                description=f"Karpenter interruption handling: {event_name}",
+                event_pattern=json.dumps(event_pattern),
+                tags={"Name": f"{name}-karpenter-{event_name}"},
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+            aws.cloudwatch.EventTarget(
+                resource_name=f"{name}-karpenter-{event_name}",
+                arn=self.queue.arn,
+                rule=rule.name,
+                target_id="KarpenterInterruptionQueueTarget",
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+
+        """
+        CONTROLLER IAM ROLE
+        # module.karpenter.aws_iam_role.controller[0]:
+        # module.karpenter.aws_iam_role_policy.controller[0]: (enable_v1_permissions)
+        - instance profiles are created by the EC2NodeClass, hence the iam:*InstanceProfile
+        """
+
+        self.controller_role = aws.iam.Role(
+            resource_name=f"{name}-karpenter-controller",
+            name_prefix=f"{name[:24]}-karpenter-",
+            assume_role_policy=pulumi.Output.all(
+                self.oidc_provider.arn, issuer_host
+            ).apply(
+                lambda args: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Effect": "Allow",
+                                "Principal": {"Federated": args[0]},
+                                "Action": "sts:AssumeRoleWithWebIdentity",
+                                "Condition": {
+                                    "StringEquals": {
+                                        f"{args[1]}:aud": "sts.amazonaws.com",
+                                        f"{args[1]}:sub": (
+                                            f"system:serviceaccount:{namespace}:{service_account}"
+                                        ),
+                                    }
+                                },
+                            }
+                        ],
+                    }
+                )
+            ),
+            description="Karpenter controller (IRSA)",
+            tags={"Name": f"{name}-karpenter-controller"},
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        aws.iam.RolePolicy(
+            resource_name=f"{name}-karpenter-controller",
+            name="karpenter-controller",
+            role=self.controller_role.id,
+            policy=pulumi.Output.all(
+                region, account_id, self.queue.arn, node_iam_role.arn, cluster.arn
+            ).apply(
+                lambda args: json.dumps(
+                    karpenter_controller_policy(name, *args)
+                )
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        """
+        RENDERED KUBERNETES CONFIG
+        # helm_release.karpenter
+        # kubectl_manifest.karpenter_default_ec2_node_class
+        # kubectl_manifest.karpenter_default_node_pool
+        """
+
+        self.helm_values = pulumi.Output.all(
+            cluster.name, cluster.endpoint, self.queue.name, self.controller_role.arn
+        ).apply(
+            lambda args: yaml.safe_dump(
+                {
+                    "replicas": 1,
+                    "settings": {
+                        "clusterName": args[0],
+                        "clusterEndpoint": args[1],
+                        "interruptionQueue": args[2],
+                    },
+                    "serviceAccount": {
+                        "name": service_account,
+                        "annotations": {"eks.amazonaws.com/role-arn": args[3]},
+                    },
+                    "tolerations": [
+                        {"key": "CriticalAddonsOnly", "operator": "Exists"},
+                        {
+                            "key": "karpenter.sh/controller",
+                            "operator": "Exists",
+                            "effect": "NoSchedule",
+                        },
+                    ],
+                    "webhook": {"enabled": False},
+                },
+                sort_keys=False,
+            )
+        )
+
+        ec2_node_class = pulumi.Output.all(
+            node_iam_role.name, node_sg.id, ipv6_only_subnets
+        ).apply(
+            lambda args: {
+                "apiVersion": "karpenter.k8s.aws/v1",
+                "kind": "EC2NodeClass",
+                "metadata": {"name": "default"},
+                "spec": {
+                    "amiSelectorTerms": [{"alias": ami_alias}],
+                    "role": args[0],
+                    "subnetSelectorTerms": [
+                        {"tags": {"karpenter.sh/discovery": name}}
+                    ],
+                    # node_sg has no discovery tag, select it by id
+                    "securityGroupSelectorTerms": [{"id": args[1]}],
+                    "tags": {"karpenter.sh/discovery": name},
+                    **(
+                        {
+                            "metadataOptions": {
+                                "httpEndpoint": "enabled",
+                                "httpProtocolIPv6": "enabled",
+                                "httpPutResponseHopLimit": 2,
+                                "httpTokens": "required",
+                            }
+                        }
+                        if args[2]
+                        else {}
+                    ),
+                },
+            }
+        )
+        self.manifests = ec2_node_class.apply(
+            lambda node_class: yaml.safe_dump_all(
+                [node_class, *(pool.manifest() for pool in node_pools)],
+                sort_keys=False,
+            )
+        )
+
+        self.register_outputs(
+            {
+                "chart_version": chart_version,
+                "controller_role_arn": self.controller_role.arn,
+                "helm_values": self.helm_values,
+                "manifests": self.manifests,
+                "oidc_provider_arn": self.oidc_provider.arn,
+                "queue_name": self.queue.name,
+            }
+        )
+
+
+def karpenter_controller_policy(
+    cluster_name: str,
+    region: str,
+    account_id: str,
+    queue_arn: str,
+    node_role_arn: str,
+    cluster_arn: str,
+) -> dict:
+    """trimmed karpenter v1 controller policy, writes scoped to this cluster's tag"""
+    cluster_tag = f"aws:ResourceTag/kubernetes.io/cluster/{cluster_name}"
+    request_tag = f"aws:RequestTag/kubernetes.io/cluster/{cluster_name}"
+    return {
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Sid": "AllowScopedEC2InstanceAccessActions",
+                "Effect": "Allow",
+                "Action": ["ec2:RunInstances", "ec2:CreateFleet"],
+                "Resource": [
+                    f"arn:aws:ec2:{region}::image/*",
+                    f"arn:aws:ec2:{region}::snapshot/*",
+                    f"arn:aws:ec2:{region}:*:security-group/*",
+                    f"arn:aws:ec2:{region}:*:subnet/*",
+                    f"arn:aws:ec2:{region}:*:capacity-reservation/*",
+                    f"arn:aws:ec2:{region}:*:launch-template/*",
+                ],
+            },
+            {
+                "Sid": "AllowScopedEC2InstanceActionsWithTags",
+                "Effect": "Allow",
+                "Action": [
+                    "ec2:RunInstances",
+                    "ec2:CreateFleet",
+                    "ec2:CreateLaunchTemplate",
+                ],
+                "Resource": [
+                    f"arn:aws:ec2:{region}:*:fleet/*",
+                    f"arn:aws:ec2:{region}:*:instance/*",
+                    f"arn:aws:ec2:{region}:*:volume/*",
+                    f"arn:aws:ec2:{region}:*:network-interface/*",
+                    f"arn:aws:ec2:{region}:*:launch-template/*",
+                    f"arn:aws:ec2:{region}:*:spot-instances-request/*",
+                ],
+                "Condition": {
+                    "StringEquals": {request_tag: "owned"},
+                    "StringLike": {"aws:RequestTag/karpenter.sh/nodepool": "*"},
+                },
+            },
+            {
+                "Sid": "AllowScopedResourceCreationTagging",
+                "Effect": "Allow",
+                "Action": "ec2:CreateTags",
+                "Resource": [
+                    f"arn:aws:ec2:{region}:*:fleet/*",
+                    f"arn:aws:ec2:{region}:*:instance/*",
+                    f"arn:aws:ec2:{region}:*:volume/*",
+                    f"arn:aws:ec2:{region}:*:network-interface/*",
+                    f"arn:aws:ec2:{region}:*:launch-template/*",
+                    f"arn:aws:ec2:{region}:*:spot-instances-request/*",
+                ],
+                "Condition": {
+                    "StringEquals": {
+                        request_tag: "owned",
+                        "ec2:CreateAction": [
+                            "RunInstances",
+                            "CreateFleet",
+                            "CreateLaunchTemplate",
+                        ],
+                    },
+                    "StringLike": {"aws:RequestTag/karpenter.sh/nodepool": "*"},
+                },
+            },
+            {
+                "Sid": "AllowScopedResourceTagging",
+                "Effect": "Allow",
+                "Action": "ec2:CreateTags",
+                "Resource": f"arn:aws:ec2:{region}:*:instance/*",
+                "Condition": {
+                    "StringEquals": {cluster_tag: "owned"},
+                    "StringLike": {"aws:ResourceTag/karpenter.sh/nodepool": "*"},
+                },
+            },
+            {
+                "Sid": "AllowScopedDeletion",
+                "Effect": "Allow",
+                "Action": ["ec2:TerminateInstances", "ec2:DeleteLaunchTemplate"],
+                "Resource": [
+                    f"arn:aws:ec2:{region}:*:instance/*",
+                    f"arn:aws:ec2:{region}:*:launch-template/*",
+                ],
+                "Condition": {
+                    "StringEquals": {cluster_tag: "owned"},
+                    "StringLike": {"aws:ResourceTag/karpenter.sh/nodepool": "*"},
+                },
+            },
+            {
+                "Sid": "AllowRegionalReadActions",
+                "Effect": "Allow",
+                "Action": [
+                    "ec2:DescribeCapacityReservations",
+                    "ec2:DescribeImages",
+                    "ec2:DescribeInstances",
+                    "ec2:DescribeInstanceTypeOfferings",
+                    "ec2:DescribeInstanceTypes",
+                    "ec2:DescribeLaunchTemplates",
+                    "ec2:DescribeSecurityGroups",
+                    "ec2:DescribeSpotPriceHistory",
+                    "ec2:DescribeSubnets",
+                ],
+                "Resource": "*",
+                "Condition": {"StringEquals": {"aws:RequestedRegion": region}},
+            },
+            {
+                "Sid": "AllowSSMReadActions",
+                "Effect": "Allow",
+                "Action": "ssm:GetParameter",
+                "Resource": f"arn:aws:ssm:{region}::parameter/aws/service/*",
+            },
+            {
+                "Sid": "AllowPricingReadActions",
+                "Effect": "Allow",
+                "Action": "pricing:GetProducts",
+                "Resource": "*",
+            },
+            {
+                "Sid": "AllowInterruptionQueueActions",
+                "Effect": "Allow",
+                "Action": [
+                    "sqs:DeleteMessage",
+                    "sqs:GetQueueUrl",
+                    "sqs:ReceiveMessage",
+                ],
+                "Resource": queue_arn,
+            },
+            {
+                "Sid": "AllowPassingInstanceRole",
+                "Effect": "Allow",
+                "Action": "iam:PassRole",
+                "Resource": node_role_arn,
+                "Condition": {"StringEquals": {"iam:PassedToService": "ec2.amazonaws.com"}},
+            },
+            {
+                "Sid": "AllowScopedInstanceProfileActions",
+                "Effect": "Allow",
+                "Action": [
+                    "iam:AddRoleToInstanceProfile",
+                    "iam:CreateInstanceProfile",
+                    "iam:DeleteInstanceProfile",
+                    "iam:RemoveRoleFromInstanceProfile",
+                    "iam:TagInstanceProfile",
+                ],
+                "Resource": f"arn:aws:iam::{account_id}:instance-profile/*",
+                "Condition": {
+                    "StringEquals": {"aws:RequestedRegion": region},
+                    "StringLikeIfExists": {
+                        "aws:ResourceTag/karpenter.k8s.aws/ec2nodeclass": "*",
+                        "aws:RequestTag/karpenter.k8s.aws/ec2nodeclass": "*",
+                    },
+                },
+            },
+            {
+                "Sid": "AllowInstanceProfileReadActions",
+                "Effect": "Allow",
+                "Action": "iam:GetInstanceProfile",
+                "Resource": f"arn:aws:iam::{account_id}:instance-profile/*",
+            },
+            {
+                "Sid": "AllowAPIServerEndpointDiscovery",
+                "Effect": "Allow",
+                "Action": "eks:DescribeCluster",
+                "Resource": cluster_arn,
+            },
+        ],
+    }
 
 
 class Cluster(pulumi.ComponentResource):
@@ -17,15 +771,47 @@ class Cluster(pulumi.ComponentResource):
         cluster_version: str | None,
         private_subnet_ids: list[str],
         vpc_id: str,
+        account_id: pulumi.Input[str] | None = None,
+        vpc_cni: VpcCniConfig | None = None,
+        addons: list | None = None,
+        node_group_profiles: list | None = None,
+        private_subnet_zone_ids: list | None = None,
+        karpenter_node_pools: list | None = None,
+        ipv6_only_subnets: pulumi.Input[bool] = False,
         opts: pulumi.ResourceOptions = None,
     ):
+        for addon in addons or []:
+            if addon not in OPTIONAL_ADDONS:
+                raise ValueError(
+                    f"addon must be one of {', '.join(OPTIONAL_ADDONS)}, got: {addon}"
+                )
+        vpc_cni = vpc_cni or VpcCniConfig()
+        node_group_profiles = node_group_profiles or [NodeGroupProfile()]
+        if len({profile.name for profile in node_group_profiles}) != len(
+            node_group_profiles
+        ):
+            raise ValueError("node group profile names must be unique")
+        # names per-AZ node groups, same order as private_subnet_ids
+        subnet_zone_ids = private_subnet_zone_ids or [
+            f"az{n}" for n in range(1, len(private_subnet_ids) + 1)
+        ]
+        if len(subnet_zone_ids) != len(private_subnet_ids):
+            raise ValueError("private_subnet_zone_ids must line up with private_subnet_ids")
         super().__init__(t="eph:eks:Cluster", name=name, props=None, opts=opts)
 
         # TODO: I wonder if there is a way to do this on the provider
-        self.current = aws.get_caller_identity()
-        sso_admin_role_arn = f"arn:aws:iam::{self.current.account_id}:role/aws-reserved/sso.amazonaws.com/{admin_role_name}"
-        sso_admin_assume_role_arn = (
-            f"arn:aws:sts::{self.current.account_id}:assumed-role/{admin_role_name}"
+        # - pass account_id in (e.g. from invoke_cache) to skip the lookup
+        # - Output-form so SGs / IAM / KMS register without waiting on it
+        if account_id is None:
+            account_id = aws.get_caller_identity_output().account_id
+        self.account_id = pulumi.Output.from_input(account_id)
+        sso_admin_role_arn = pulumi.Output.concat(
+            "arn:aws:iam::",
+            self.account_id,
+            f":role/aws-reserved/sso.amazonaws.com/{admin_role_name}",
+        )
+        sso_admin_assume_role_arn = pulumi.Output.concat(
+            "arn:aws:sts::", self.account_id, f":assumed-role/{admin_role_name}"
         )
 
         """
@@ -439,7 +1225,9 @@ class Cluster(pulumi.ComponentResource):
                             "Sid": "Enable IAM User Permissions",
                             "Effect": "Allow",
                             "Principal": {
-                                "AWS": f"arn:aws:iam::{self.current.account_id}:root",
+                                "AWS": pulumi.Output.concat(
+                                    "arn:aws:iam::", self.account_id, ":root"
+                                ),
                             },
                             "Action": "kms:*",
                             "Resource": "*",
@@ -722,7 +1510,9 @@ class Cluster(pulumi.ComponentResource):
             principal_arn=sso_admin_role_arn,
             type="STANDARD",
             tags={"Name": f"{name}-admin-sso"},
-            user_name=f"{sso_admin_assume_role_arn}/{{{{SessionName}}}}",  # escape double brackets
+            user_name=pulumi.Output.concat(
+                sso_admin_assume_role_arn, "/{{SessionName}}"
+            ),
             opts=pulumi.ResourceOptions(
                 parent=self, ignore_changes=["tags", "tagsAll"]
             ),
@@ -740,14 +1530,38 @@ class Cluster(pulumi.ComponentResource):
         )
 
         """
-        EKS ADD ONS - DONE
+        EKS ADD ONS
         NOTE: these three are auto installed on any new EKS cluster bc bootstrapping is turned on
-        NOTE: the config values are all null and not custom so no work to do
+        - bootstrap_self_managed_addons stays True, flipping it replaces the cluster
+        - aws.eks.Addon adopts the bootstrapped ones with OVERWRITE
+        - vpc-cni always managed so warm pool / network policy settings apply,
+          coredns / kube-proxy only when listed in `addons`
+        - versions resolve to the newest build for the cluster's k8s version
         # module.eks.aws_eks_addon.this["coredns"]:
         # module.eks.aws_eks_addon.this["kube-proxy"]:
         # module.eks.aws_eks_addon.this["vpc-cni"]:
         """
 
+        def addon_version(addon_name: str) -> pulumi.Output[str]:
+            return aws.eks.get_addon_version_output(
+                addon_name=addon_name,
+                kubernetes_version=self.cluster.version,
+                most_recent=True,
+            ).version
+
+        self.addons = {}
+        self.addons["vpc-cni"] = aws.eks.Addon(
+            resource_name=f"{name}-vpc-cni",
+            addon_name="vpc-cni",
+            addon_version=addon_version("vpc-cni"),
+            cluster_name=self.cluster.name,
+            configuration_values=vpc_cni.configuration_values(),
+            resolve_conflicts_on_create="OVERWRITE",
+            resolve_conflicts_on_update="OVERWRITE",
+            tags={"Name": f"{name}-vpc-cni"},
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
         """
         IRSA - NOT USED
         REQUIRES EKS cluster oidc identity issuer url already existing
@@ -780,88 +1594,180 @@ class Cluster(pulumi.ComponentResource):
         # module.eks.module.eks_managed_node_group["initial"].module.user_data.null_resource.validate_cluster_service_cidr:
         """
 
-        launch_template = aws.ec2.LaunchTemplate(
-            resource_name=f"{name}-initial-node-group-lt",
-            name_prefix=f"{name}-initial-",
-            disable_api_stop=False,
-            disable_api_termination=False,
-            description="Custom launch template for initial EKS managed node group",
-            metadata_options={
-                "http_endpoint": "enabled",
-                "http_put_response_hop_limit": 2,
-                "http_tokens": "required",
-            },
-            monitoring={
-                "enabled": True,
-            },
-            vpc_security_group_ids=[self.node_sg.id],
-            update_default_version=True,
-            tag_specifications=[
-                {"resource_type": "instance", "tags": {"Name": f"{name}-initial"}},
-                {
-                    "resource_type": "network-interface",
-                    "tags": {"Name": f"{name}-initial"},
+        self.node_groups = {}
+        for profile in node_group_profiles:
+            group = f"{name}-{profile.name}"
+            launch_template = aws.ec2.LaunchTemplate(
+                resource_name=f"{group}-node-group-lt",
+                name_prefix=f"{group}-",
+                disable_api_stop=False,
+                disable_api_termination=False,
+                description=f"Custom launch template for {profile.name} EKS managed node group",
+                metadata_options={
+                    "http_endpoint": "enabled",
+                    "http_put_response_hop_limit": 2,
+                    # IPv6-only nodes have no route to 169.254.169.254
+                    "http_protocol_ipv6": pulumi.Output.from_input(ipv6_only_subnets).apply(
+                        lambda ipv6_only: "enabled" if ipv6_only else None
+                    ),
+                    "http_tokens": "required",
                 },
-                {"resource_type": "volume", "tags": {"Name": f"{name}-initial"}},
-            ],
-            tags={"Name": f"{name}-initial-node-group-lt"},
-            opts=pulumi.ResourceOptions(
-                parent=self,
-                depends_on=[
-                    node_group_cni_ipv6_role_policy,
-                    node_group_eks_worker_node_role_policy,
-                    node_group_eks_ecr_ro_role_policy,
-                    node_group_ssm_role_policy,
+                monitoring={
+                    "enabled": True,
+                },
+                vpc_security_group_ids=[self.node_sg.id],
+                # EKS still adds its own bootstrap / cluster settings to these
+                user_data=profile.user_data(),
+                block_device_mappings=profile.block_device_mappings(),
+                update_default_version=True,
+                tag_specifications=[
+                    {"resource_type": "instance", "tags": {"Name": group}},
+                    {
+                        "resource_type": "network-interface",
+                        "tags": {"Name": group},
+                    },
+                    {"resource_type": "volume", "tags": {"Name": group}},
                 ],
-            ),
-        )
+                tags={"Name": f"{group}-node-group-lt"},
+                opts=pulumi.ResourceOptions(
+                    parent=self,
+                    depends_on=[
+                        node_group_cni_ipv6_role_policy,
+                        node_group_eks_worker_node_role_policy,
+                        node_group_eks_ecr_ro_role_policy,
+                        node_group_ssm_role_policy,
+                    ],
+                ),
+            )
 
-        self.node_group = aws.eks.NodeGroup(
-            resource_name=f"{name}-initial-node-group",
-            cluster_name=self.cluster.name,
-            instance_types=["m5.large"],
-            launch_template={
-                "id": launch_template.id,
-                "version": launch_template.default_version,
-            },
-            node_group_name_prefix=f"{name}-initial-",
-            node_role_arn=self.node_iam_role.arn,
-            subnet_ids=private_subnet_ids,
-            scaling_config={
-                "desired_size": 1,
-                "max_size": 2,
-                "min_size": 1,
-            },
-            update_config={
-                "max_unavailable": 1,
-            },
-            tags={"Name": f"{name}-initial-node-group"},
-            opts=pulumi.ResourceOptions(
-                parent=self,
-                depends_on=[
-                    node_group_cni_ipv6_role_policy,
-                    node_group_eks_worker_node_role_policy,
-                    node_group_eks_ecr_ro_role_policy,
-                ],
-            ),
-        )
+            # (node_groups key, resource name prefix, subnets, (min, desired, max))
+            if profile.per_az:
+                placements = [
+                    (f"{profile.name}-{zone_id}", f"{group}-{zone_id}", [subnet_id], sizes)
+                    for zone_id, subnet_id, sizes in zip(
+                        subnet_zone_ids,
+                        private_subnet_ids,
+                        split_scaling(
+                            profile.min_size,
+                            profile.desired_size,
+                            profile.max_size,
+                            len(private_subnet_ids),
+                        ),
+                    )
+                ]
+            else:
+                placements = [
+                    (
+                        profile.name,
+                        group,
+                        private_subnet_ids,
+                        (profile.min_size, profile.desired_size, profile.max_size),
+                    )
+                ]
+
+            for key, group_name, subnet_ids, (min_size, desired_size, max_size) in placements:
+                self.node_groups[key] = aws.eks.NodeGroup(
+                    resource_name=f"{group_name}-node-group",
+                    ami_type=profile.resolved_ami_type(),
+                    capacity_type=profile.capacity_type,
+                    cluster_name=self.cluster.name,
+                    instance_types=profile.resolved_instance_types(),
+                    labels=profile.labels or None,
+                    launch_template={
+                        "id": launch_template.id,
+                        "version": launch_template.default_version,
+                    },
+                    node_group_name_prefix=f"{group_name}-",
+                    node_role_arn=self.node_iam_role.arn,
+                    subnet_ids=subnet_ids,
+                    scaling_config={
+                        "desired_size": desired_size,
+                        "max_size": max_size,
+                        "min_size": min_size,
+                    },
+                    update_config={
+                        "max_unavailable": 1,
+                    },
+                    tags={"Name": f"{group_name}-node-group"},
+                    opts=pulumi.ResourceOptions(
+                        parent=self,
+                        depends_on=[
+                            node_group_cni_ipv6_role_policy,
+                            node_group_eks_worker_node_role_policy,
+                            node_group_eks_ecr_ro_role_policy,
+                            # like terraform-aws-eks before_compute - nodes join with
+                            # the tuned vpc-cni instead of rolling it afterwards
+                            self.addons["vpc-cni"],
+                        ],
+                    ),
+                )
+
+        self.node_group = next(iter(self.node_groups.values()))
+        # for cluster-autoscaler / scaling tooling
+        self.node_group_names = {
+            key: node_group.node_group_name for key, node_group in self.node_groups.items()
+        }
+        self.node_group_arns = {
+            key: node_group.arn for key, node_group in self.node_groups.items()
+        }
+
+        # coredns needs nodes to schedule on or the addon sits DEGRADED
+        for addon_name in addons or []:
+            self.addons[addon_name] = aws.eks.Addon(
+                resource_name=f"{name}-{addon_name}",
+                addon_name=addon_name,
+                addon_version=addon_version(addon_name),
+                cluster_name=self.cluster.name,
+                resolve_conflicts_on_create="OVERWRITE",
+                resolve_conflicts_on_update="OVERWRITE",
+                tags={"Name": f"{name}-{addon_name}"},
+                opts=pulumi.ResourceOptions(
+                    parent=self, depends_on=list(self.node_groups.values())
+                ),
+            )
+
+        # opt-in, the managed node groups above still run karpenter itself
+        self.karpenter = None
+        if karpenter_node_pools:
+            self.karpenter = Karpenter(
+                name=name,
+                # the Cluster's (invoke_cache) account id, no second lookup
+                account_id=self.account_id,
+                cluster=self.cluster,
+                node_iam_role=self.node_iam_role,
+                node_sg=self.node_sg,
+                node_pools=karpenter_node_pools,
+                ipv6_only_subnets=ipv6_only_subnets,
+                opts=pulumi.ResourceOptions(parent=self),
+            )
 
         """
         By registering the outputs on which the component depends, we ensure
         that the Pulumi CLI will wait for all the outputs to be created before
         considering the component itself to have been created.
-        - explicitly setting objects as outputs
-        NOTE: didn't set all of the resources on register outputs since everything is in one file and not used elsewhere
+        - ids / ARNs / names only, whole resources here would copy their state
+          into this component's checkpoint entry on every save
+        - the resources themselves stay on self for __main__.py
         """
         self.register_outputs(
-            # TODO: add in lots of other self items
             {
-                "cluster": self.cluster,
-                "cluster_iam_role": self.cluster_iam_role,
-                "cluster_sg": self.cluster_sg,
-                "kms_key": self.kms_key,
-                "kms_key_alias": self.kms_key_alias,
-                "node_iam_role": self.node_iam_role,
-                "node_sg": self.node_sg,
+                "addon_versions": {
+                    addon_name: addon.addon_version
+                    for addon_name, addon in self.addons.items()
+                },
+                "cluster_arn": self.cluster.arn,
+                "cluster_endpoint": self.cluster.endpoint,
+                "cluster_iam_role_arn": self.cluster_iam_role.arn,
+                "cluster_name": self.cluster.name,
+                "cluster_sg_id": self.cluster_sg.id,
+                "cluster_version": self.cluster.version,
+                "karpenter_queue_name": self.karpenter.queue.name if self.karpenter else None,
+                "kms_key_alias": self.kms_key_alias.name,
+                "kms_key_arn": self.kms_key.arn,
+                "node_group_arns": self.node_group_arns,
+                "node_group_names": self.node_group_names,
+                "node_iam_role_arn": self.node_iam_role.arn,
+                "node_sg_id": self.node_sg.id,
+                "oidc_issuer": self.cluster.identities[0].oidcs[0].issuer,
             }
         )
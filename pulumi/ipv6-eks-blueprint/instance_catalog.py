@@ -0,0 +1,163 @@
+"""
+Offline EC2 instance catalog + selector for node group instance_types
+- bundled so previews never call the pricing / describe-instance-types APIs
+- prices are us-east-1 on-demand Linux $/hour, refresh by hand now and then
+- network_gbps is the "up to" burst figure AWS lists for these sizes, the
+  baseline_* fields are what a size sustains once its burst credits are
+  gone - check sustained requirements (performance.py) against those
+- selector diversifies across families so spot / capacity shortages in one
+  family don't block scale-out
+"""
+
+from typing import NamedTuple
+
+ARCHES = ("x86_64", "arm64")
+
+
+class InstanceType(NamedTuple):
+    name: str
+    family: str
+    arch: str
+    vcpu: int
+    memory_gib: float
+    network_gbps: float
+    baseline_network_gbps: float
+    # EBS baseline bandwidth (Mbps) / IOPS
+    ebs_baseline_mbps: int
+    ebs_baseline_iops: int
+    price: float
+    burstable: bool = False
+
+
+# family -> (arch, GiB per vCPU, network Gbps, baselines, $/hour for .large)
+# - .xlarge / .2xlarge / .4xlarge double vCPU, memory and price each step
+_FAMILIES = {
+    # general purpose
+    "m5": ("x86_64", 4, 10, "nitro5", 0.096),
+    "m6i": ("x86_64", 4, 12.5, "nitro6", 0.096),
+    "m6a": ("x86_64", 4, 12.5, "nitro6", 0.0864),
+    "m7i": ("x86_64", 4, 12.5, "nitro6", 0.1008),
+    "m7a": ("x86_64", 4, 12.5, "nitro6", 0.11592),
+    "m6g": ("arm64", 4, 10, "graviton2", 0.077),
+    "m7g": ("arm64", 4, 12.5, "graviton3", 0.0816),
+    # compute optimized
+    "c5": ("x86_64", 2, 10, "nitro5", 0.085),
+    "c6i": ("x86_64", 2, 12.5, "nitro6", 0.085),
+    "c7i": ("x86_64", 2, 12.5, "nitro6", 0.08925),
+    "c6g": ("arm64", 2, 10, "graviton2", 0.068),
+    "c7g": ("arm64", 2, 12.5, "graviton3", 0.0725),
+    # memory optimized
+    "r5": ("x86_64", 8, 10, "nitro5", 0.126),
+    "r6i": ("x86_64", 8, 12.5, "nitro6", 0.126),
+    "r6g": ("arm64", 8, 10, "graviton2", 0.1008),
+    "r7g": ("arm64", 8, 12.5, "graviton3", 0.1071),
+}
+_SIZES = (("large", 2), ("xlarge", 4), ("2xlarge", 8), ("4xlarge", 16))
+# generation -> (network Gbps, EBS Mbps, EBS IOPS) baseline per _SIZES entry
+# - the same within a generation, whatever the memory ratio
+_BASELINES = {
+    "nitro5": ((0.75, 650, 3600), (1.25, 1150, 6000), (2.5, 2300, 12000), (5, 4750, 18750)),
+    "nitro6": (
+        (0.781, 650, 3600),
+        (1.562, 1250, 6000),
+        (3.125, 2500, 12000),
+        (6.25, 5000, 20000),
+    ),
+    "graviton2": ((0.75, 630, 3600), (1.25, 1188, 6000), (2.5, 2375, 12000), (5, 4750, 20000)),
+    "graviton3": (
+        (0.937, 630, 3600),
+        (1.876, 1250, 6000),
+        (3.75, 2500, 12000),
+        (7.5, 5000, 20000),
+    ),
+}
+
+# burstable sizes don't follow the ratios above
+_BURSTABLE = (
+    InstanceType("t3.medium", "t3", "x86_64", 2, 4, 5, 0.256, 347, 2000, 0.0416, True),
+    InstanceType("t3.large", "t3", "x86_64", 2, 8, 5, 0.512, 695, 4000, 0.0832, True),
+    InstanceType("t3.xlarge", "t3", "x86_64", 4, 16, 5, 1.024, 695, 4000, 0.1664, True),
+    InstanceType("t4g.medium", "t4g", "arm64", 2, 4, 5, 0.256, 347, 2000, 0.0336, True),
+    InstanceType("t4g.large", "t4g", "arm64", 2, 8, 5, 0.512, 695, 4000, 0.0672, True),
+    InstanceType("t4g.xlarge", "t4g", "arm64", 4, 16, 5, 1.024, 695, 4000, 0.1344, True),
+)
+
+CATALOG: tuple[InstanceType, ...] = _BURSTABLE + tuple(
+    InstanceType(
+        name=f"{family}.{size}",
+        family=family,
+        arch=arch,
+        vcpu=vcpu,
+        memory_gib=gib_per_vcpu * vcpu,
+        network_gbps=network_gbps,
+        baseline_network_gbps=baseline[0],
+        ebs_baseline_mbps=baseline[1],
+        ebs_baseline_iops=baseline[2],
+        price=round(large_price * vcpu / 2, 5),
+    )
+    for family, (arch, gib_per_vcpu, network_gbps, generation, large_price) in _FAMILIES.items()
+    for (size, vcpu), baseline in zip(_SIZES, _BASELINES[generation])
+)
+BY_NAME = {instance.name: instance for instance in CATALOG}
+
+
+def select_instance_types(
+    arch: str = "x86_64",
+    min_vcpu: int = 2,
+    max_vcpu: int | None = None,
+    min_memory_gib: float = 0,
+    max_price: float | None = None,
+    min_network_gbps: float = 0,
+    burstable: bool = False,
+    max_types: int = 4,
+    min_baseline_network_gbps: float = 0,
+    min_ebs_mbps: float = 0,
+    min_ebs_iops: int = 0,
+) -> list[str]:
+    """
+    Cheapest matching size per family, cheapest families first
+    - at most one type per family so the list is actually diversified
+    - all picks share an arch since a node group has a single AMI type
+    """
+    if arch not in ARCHES:
+        raise ValueError(f"arch must be one of {', '.join(ARCHES)}, got: {arch}")
+    matches = [
+        instance
+        for instance in CATALOG
+        if instance.arch == arch
+        and instance.vcpu >= min_vcpu
+        and (max_vcpu is None or instance.vcpu <= max_vcpu)
+        and instance.memory_gib >= min_memory_gib
+        and (max_price is None or instance.price <= max_price)
+        and instance.network_gbps >= min_network_gbps
+        and instance.baseline_network_gbps >= min_baseline_network_gbps
+        and instance.ebs_baseline_mbps >= min_ebs_mbps
+        and instance.ebs_baseline_iops >= min_ebs_iops
+        and (burstable or not instance.burstable)
+    ]
+    cheapest_per_family: dict[str, InstanceType] = {}
+    for instance in sorted(matches, key=lambda i: (i.price, i.name)):
+        cheapest_per_family.setdefault(instance.family, instance)
+    if not cheapest_per_family:
+        raise ValueError(
+            f"no {arch} instance types match: min_vcpu={min_vcpu}, max_vcpu={max_vcpu},"
+            f" min_memory_gib={min_memory_gib}, max_price={max_price},"
+            f" min_network_gbps={min_network_gbps}, burstable={burstable},"
+            f" min_baseline_network_gbps={min_baseline_network_gbps},"
+            f" min_ebs_mbps={min_ebs_mbps:g}, min_ebs_iops={min_ebs_iops}"
+        )
+    return [instance.name for instance in cheapest_per_family.values()][:max_types]
+
+
+def arch_of(instance_types: list[str]) -> str:
+    """single arch of a list of catalog instance types"""
+    arches = {BY_NAME[name].arch for name in instance_types if name in BY_NAME}
+    if len(arches) > 1:
+        raise ValueError(f"instance types mix architectures: {', '.join(instance_types)}")
+    return arches.pop() if arches else "x86_64"
+
+
+if __name__ == "__main__":
+    for arch in ARCHES:
+        print(arch, select_instance_types(arch=arch))
+    print("arm64 4+ vCPU <= $0.20", select_instance_types("arm64", 4, max_price=0.2))
@@ -0,0 +1,150 @@
+"""
+Network / cluster layers of the program
+- `layer: all` (default) builds both in one stack like before
+- `layer: network` builds only the Vpc and exports what the cluster needs
+- `layer: cluster` builds only the Cluster from a network stack's outputs
+  through a StackReference, so node group tweaks never evaluate, diff or
+  refresh the 30+ VPC resources
+- both stacks need the same az_zone_ids / project_name config, subnets are
+  matched up by zone id
+- the cluster layer takes private_subnet_mode from the network stack, its
+  own config value only applies to `layer: all`
+"""
+
+import pulumi
+from eks import Cluster, KarpenterNodePool, NodeGroupProfile, VpcCniConfig
+from stack_config import (
+    AZ_ZONE_IDS,
+    CLUSTER_VERSION,
+    EKS_ADDONS,
+    EKS_CLUSTER_NAME,
+    IPV4_AZ_SLOTS,
+    IPV4_TIER_WEIGHTS,
+    KARPENTER_NODE_POOLS,
+    NAT_MODE,
+    NODE_GROUP_PROFILES,
+    PRIVATE_SUBNET_MODE,
+    SSO_ADMIN_ROLE_NAME,
+    VPC_CIDR,
+    VPC_CNI,
+    VPC_ENDPOINTS,
+)
+from vpc import Vpc
+
+LAYERS = ("all", "network", "cluster")
+
+
+def network(available_zone_ids: pulumi.Input[list]) -> Vpc:
+    """the Vpc plus the stack outputs a `cluster` layer reads"""
+    # USE REGION STACK NAME TO AVOID DUPE ARN's FOR FUTURE REGIONS
+    eks_vpc = Vpc(
+        name=EKS_CLUSTER_NAME,
+        az_zone_ids=AZ_ZONE_IDS,
+        available_zone_ids=available_zone_ids,
+        cluster_name=EKS_CLUSTER_NAME,
+        endpoints=VPC_ENDPOINTS,
+        ipv4_az_slots=IPV4_AZ_SLOTS,
+        ipv4_tier_weights=IPV4_TIER_WEIGHTS,
+        nat_mode=NAT_MODE,
+        private_subnet_mode=PRIVATE_SUBNET_MODE,
+        vpc_cidr_block=VPC_CIDR,
+    )
+
+    pulumi.export("vpc_id", eks_vpc.vpc.id)
+    pulumi.export("vpc_ipv6_cidr_block", eks_vpc.vpc.ipv6_cidr_block)
+    # zone id -> id so the cluster layer can line subnets up with its config
+    pulumi.export(
+        "private_subnet_ids",
+        {zone_id: subnet.id for zone_id, subnet in zip(AZ_ZONE_IDS, eks_vpc.private_subnets)},
+    )
+    pulumi.export(
+        "public_subnet_ids",
+        {zone_id: subnet.id for zone_id, subnet in zip(AZ_ZONE_IDS, eks_vpc.public_subnets)},
+    )
+    # {tier: {zone_id: {cidr_block, ipv6_cidr_block}}} for address_lookup.py
+    pulumi.export("address_plan", eks_vpc.address_plan)
+    # zone id -> id like Vpc's own outputs, single NAT AZs share one table
+    pulumi.export(
+        "private_route_table_ids",
+        {
+            zone_id: (
+                eks_vpc.private_route_tables[index]
+                if NAT_MODE == "per_az"
+                else eks_vpc.private_route_table
+            ).id
+            for index, zone_id in enumerate(AZ_ZONE_IDS)
+        },
+    )
+    pulumi.export("private_subnet_mode", PRIVATE_SUBNET_MODE)
+    return eks_vpc
+
+
+def network_from_stack(
+    stack_name: str,
+) -> tuple[pulumi.Output, list[pulumi.Output], pulumi.Output]:
+    """
+    (vpc id, private subnet ids in AZ_ZONE_IDS order, private subnet mode)
+    from a `network` stack
+    """
+    network_stack = pulumi.StackReference(stack_name)
+    subnet_ids = network_stack.require_output("private_subnet_ids")
+
+    def subnet_id(zone_id: str) -> pulumi.Output:
+        def pick(ids: dict) -> str:
+            if zone_id not in ids:
+                raise ValueError(
+                    f"network stack {stack_name} has no private subnet in {zone_id},"
+                    f" it has: {', '.join(ids)}"
+                )
+            return ids[zone_id]
+
+        return subnet_ids.apply(pick)
+
+    # network stacks from before the export only built Vpc's default
+    private_subnet_mode = network_stack.get_output("private_subnet_mode").apply(
+        lambda mode: mode or "dual_stack"
+    )
+    # one Output per AZ so Cluster still knows the AZ count up front
+    return (
+        network_stack.require_output("vpc_id"),
+        [subnet_id(zone_id) for zone_id in AZ_ZONE_IDS],
+        private_subnet_mode,
+    )
+
+
+def cluster(
+    account_id: pulumi.Input[str],
+    vpc_id: pulumi.Input[str],
+    private_subnet_ids: list,
+    private_subnet_mode: pulumi.Input[str],
+) -> Cluster:
+    eks_cluster = Cluster(
+        name=EKS_CLUSTER_NAME,
+        account_id=account_id,
+        addons=EKS_ADDONS,
+        cluster_version=CLUSTER_VERSION,
+        admin_role_name=SSO_ADMIN_ROLE_NAME,
+        ipv6_only_subnets=pulumi.Output.from_input(private_subnet_mode).apply(
+            lambda mode: mode == "ipv6_only"
+        ),
+        karpenter_node_pools=[
+            KarpenterNodePool(**node_pool) for node_pool in KARPENTER_NODE_POOLS or []
+        ],
+        node_group_profiles=[
+            NodeGroupProfile(**profile) for profile in NODE_GROUP_PROFILES or []
+        ],
+        private_subnet_ids=private_subnet_ids,
+        private_subnet_zone_ids=AZ_ZONE_IDS,
+        vpc_cni=VpcCniConfig(**VPC_CNI) if VPC_CNI else None,
+        vpc_id=vpc_id,
+    )
+
+    # Node groups for cluster-autoscaler / scaling tooling
+    pulumi.export("node_group_names", eks_cluster.node_group_names)
+    pulumi.export("node_group_arns", eks_cluster.node_group_arns)
+
+    # Karpenter chart values / EC2NodeClass + NodePool manifests to apply, see README
+    if eks_cluster.karpenter:
+        pulumi.export("karpenter_helm_values", eks_cluster.karpenter.helm_values)
+        pulumi.export("karpenter_manifests", eks_cluster.karpenter.manifests)
+    return eks_cluster
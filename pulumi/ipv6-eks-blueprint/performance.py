@@ -0,0 +1,173 @@
+"""
+Named node performance profiles: gp3 volume + kubelet settings together
+- general: AMI defaults made explicit, gp3 baseline instead of whatever
+  the AMI snapshot carries
+- latency: static CPU manager + single-numa-node topology so Guaranteed
+  pods get exclusive cores, needs reserved CPU and non-burstable types
+- throughput: fast gp3 for image / emptyDir heavy pods and more pods per
+  node, needs 5 Gbps+ baseline network, in practice .4xlarge and up
+- instance types are checked against instance_catalog's baseline (not
+  "up to" burst) network / EBS figures: gp3 iops / throughput above the
+  free 3000 / 125 is only worth paying for when the instance's EBS
+  baseline sustains it
+"""
+
+from dataclasses import dataclass, field
+
+from instance_catalog import BY_NAME
+
+CPU_MANAGER_POLICIES = ("none", "static")
+TOPOLOGY_MANAGER_POLICIES = ("none", "best-effort", "restricted", "single-numa-node")
+
+# gp3 limits
+GP3_IOPS = (3000, 16000)
+GP3_THROUGHPUT_MIBPS = (125, 1000)
+GP3_MAX_IOPS_PER_GIB = 500
+GP3_MAX_MIBPS_PER_IOPS = 0.25
+# EBS bandwidth is quoted in Mbps
+MBPS_PER_MIBPS = 8 * 1.048576
+
+
+@dataclass(frozen=True)
+class PerformanceProfile:
+    name: str
+    volume_size_gib: int
+    volume_iops: int
+    volume_throughput_mibps: int
+    max_pods: int | None = None
+    # kubelet kubeReserved, e.g. {"cpu": "500m", "memory": "1Gi"}
+    kube_reserved: dict = field(default_factory=dict)
+    cpu_manager_policy: str = "none"
+    topology_manager_policy: str = "none"
+    # instance type requirements
+    min_vcpu: int = 2
+    min_baseline_network_gbps: float = 0
+    allow_burstable: bool = True
+
+    def __post_init__(self):
+        if self.cpu_manager_policy not in CPU_MANAGER_POLICIES:
+            raise ValueError(
+                f"{self.name}: cpu_manager_policy must be one of"
+                f" {', '.join(CPU_MANAGER_POLICIES)}, got: {self.cpu_manager_policy}"
+            )
+        if self.topology_manager_policy not in TOPOLOGY_MANAGER_POLICIES:
+            raise ValueError(
+                f"{self.name}: topology_manager_policy must be one of"
+                f" {', '.join(TOPOLOGY_MANAGER_POLICIES)}, got: {self.topology_manager_policy}"
+            )
+        # static CPU manager refuses to start without reserved CPU
+        if self.cpu_manager_policy == "static" and "cpu" not in self.kube_reserved:
+            raise ValueError(f"{self.name}: static cpu_manager_policy needs kube_reserved cpu")
+        if not GP3_IOPS[0] <= self.volume_iops <= GP3_IOPS[1]:
+            raise ValueError(f"{self.name}: gp3 iops must be in {GP3_IOPS}, got: {self.volume_iops}")
+        if not GP3_THROUGHPUT_MIBPS[0] <= self.volume_throughput_mibps <= GP3_THROUGHPUT_MIBPS[1]:
+            raise ValueError(
+                f"{self.name}: gp3 throughput must be in {GP3_THROUGHPUT_MIBPS},"
+                f" got: {self.volume_throughput_mibps}"
+            )
+        if self.volume_iops > self.volume_size_gib * GP3_MAX_IOPS_PER_GIB:
+            raise ValueError(
+                f"{self.name}: gp3 allows {GP3_MAX_IOPS_PER_GIB} iops per GiB,"
+                f" {self.volume_size_gib} GiB can't do {self.volume_iops}"
+            )
+        if self.volume_throughput_mibps > self.volume_iops * GP3_MAX_MIBPS_PER_IOPS:
+            raise ValueError(
+                f"{self.name}: gp3 allows {GP3_MAX_MIBPS_PER_IOPS} MiB/s per iops,"
+                f" {self.volume_iops} iops can't do {self.volume_throughput_mibps} MiB/s"
+            )
+
+    @property
+    def min_ebs_mbps(self) -> float:
+        """EBS baseline bandwidth the provisioned gp3 throughput needs, 0 at the gp3 baseline"""
+        if self.volume_throughput_mibps <= GP3_THROUGHPUT_MIBPS[0]:
+            return 0
+        return self.volume_throughput_mibps * MBPS_PER_MIBPS
+
+    @property
+    def min_ebs_iops(self) -> int:
+        """EBS baseline iops the provisioned gp3 iops need, 0 at the gp3 baseline"""
+        return self.volume_iops if self.volume_iops > GP3_IOPS[0] else 0
+
+    def check_instance_types(self, instance_types: list[str]) -> None:
+        """ValueError naming every type that can't run this profile"""
+        problems = []
+        for name in instance_types:
+            instance = BY_NAME.get(name)
+            if instance is None:
+                problems.append(f"{name} isn't in instance_catalog")
+                continue
+            if instance.vcpu < self.min_vcpu:
+                problems.append(f"{name} has {instance.vcpu} vCPU, needs {self.min_vcpu}")
+            if instance.baseline_network_gbps < self.min_baseline_network_gbps:
+                problems.append(
+                    f"{name} has {instance.baseline_network_gbps} Gbps baseline,"
+                    f" needs {self.min_baseline_network_gbps}"
+                )
+            if instance.ebs_baseline_mbps < self.min_ebs_mbps:
+                problems.append(
+                    f"{name} has {instance.ebs_baseline_mbps} Mbps EBS baseline,"
+                    f" {self.volume_throughput_mibps} MiB/s gp3 needs {self.min_ebs_mbps:.0f}"
+                )
+            if instance.ebs_baseline_iops < self.min_ebs_iops:
+                problems.append(
+                    f"{name} has {instance.ebs_baseline_iops} EBS baseline iops,"
+                    f" needs {self.min_ebs_iops}"
+                )
+            if instance.burstable and not self.allow_burstable:
+                problems.append(f"{name} is burstable")
+        if problems:
+            raise ValueError(
+                f"instance types don't support the {self.name} profile: {'; '.join(problems)}"
+            )
+
+    def kubelet_config(self) -> dict:
+        """KubeletConfiguration fields, unset ones left to the AMI"""
+        config = {}
+        if self.max_pods is not None:
+            config["maxPods"] = self.max_pods
+        if self.kube_reserved:
+            config["kubeReserved"] = dict(self.kube_reserved)
+        if self.cpu_manager_policy != "none":
+            config["cpuManagerPolicy"] = self.cpu_manager_policy
+        if self.topology_manager_policy != "none":
+            config["topologyManagerPolicy"] = self.topology_manager_policy
+        return config
+
+
+PERFORMANCE_PROFILES = {
+    profile.name: profile
+    for profile in (
+        PerformanceProfile(
+            name="general",
+            volume_size_gib=50,
+            volume_iops=3000,
+            volume_throughput_mibps=125,
+        ),
+        PerformanceProfile(
+            name="latency",
+            volume_size_gib=50,
+            volume_iops=6000,
+            # gp3 baseline throughput, .xlarge EBS can't sustain more
+            volume_throughput_mibps=125,
+            kube_reserved={"cpu": "500m", "memory": "1Gi"},
+            cpu_manager_policy="static",
+            topology_manager_policy="single-numa-node",
+            min_vcpu=4,
+            allow_burstable=False,
+        ),
+        PerformanceProfile(
+            name="throughput",
+            volume_size_gib=100,
+            volume_iops=16000,
+            # ~4200 Mbps, inside every .4xlarge's EBS baseline
+            volume_throughput_mibps=500,
+            # prefix delegation hands out far more than the ENI based default
+            max_pods=110,
+            kube_reserved={"cpu": "250m", "memory": "1Gi"},
+            topology_manager_policy="best-effort",
+            min_vcpu=4,
+            min_baseline_network_gbps=5,
+            allow_burstable=False,
+        ),
+    )
+}
@@ -11,6 +11,32 @@ PROJECT_NAME = _config.require("project_name")
 REGION = _config.require("region")
 VPC_CIDR = _config.require("vpc_cidr")
 
+# `vpc_cidr: ipam` is swapped for a leased block by eph_driver.py (see ../ipam.py)
+# - the program itself never opens the registry
+if VPC_CIDR == "ipam":
+    raise ValueError(
+        "vpc_cidr `ipam` is only resolved by eph_driver.py, set a CIDR for direct runs"
+    )
+
+# Program layer, see layers.py
+# - "all" (default) VPC + cluster in one stack, "network" VPC only,
+#   "cluster" cluster only on top of `network_stack`
+# - network_stack is the full StackReference name, e.g.
+#   organization/ipv6-eks-blueprint/eph-network on a file backend
+LAYER = _config.get("layer") or "all"
+NETWORK_STACK = _config.get("network_stack")
+# "single" (default, cheapest) or "per_az" NAT gateways
+NAT_MODE = _config.get("nat_mode") or "single"
+# VPC endpoint services, e.g. ["s3", "ecr.api", "ecr.dkr", "sts"] - none by default
+VPC_ENDPOINTS = _config.get_object("vpc_endpoints")
+# weighted IPv4 subnet sizing, see subnet_sizing.py
+# - e.g. {public: 1, private: 4, database: 1}, unset keeps the /19 per subnet split
+# - ipv4_az_slots reserves AZ slots for growth, keep it fixed once deployed
+IPV4_TIER_WEIGHTS = _config.get_object("ipv4_tier_weights")
+IPV4_AZ_SLOTS = _config.get_int("ipv4_az_slots")
+# "dual_stack" (default) or "ipv6_only" private subnets
+PRIVATE_SUBNET_MODE = _config.get("private_subnet_mode") or "dual_stack"
+
 STACK_NAME = pulumi.get_stack()
 STACK_REGION_NAME = f"{PROJECT_NAME}-{REGION}"
 
@@ -19,3 +45,25 @@ STACK_REGION_NAME = f"{PROJECT_NAME}-{REGION}"
 EKS_CLUSTER_NAME = f"{STACK_REGION_NAME}"
 
 SSO_ADMIN_ROLE_NAME = _config.require('sso_admin_role_name')
+
+# EKS addons
+# - `vpc_cni` object maps onto eks.VpcCniConfig, e.g. {warm_prefix_target: 2}
+# - `eks_addons` optional extras managed as aws.eks.Addon: coredns, kube-proxy
+VPC_CNI = _config.get_object("vpc_cni")
+EKS_ADDONS = _config.get_object("eks_addons")
+
+# Managed node groups, each object maps onto eks.NodeGroupProfile
+# - unset keeps the single `initial` m5.large group
+NODE_GROUP_PROFILES = _config.get_object("node_group_profiles")
+
+# Karpenter, each object maps onto eks.KarpenterNodePool
+# - unset skips the karpenter IAM / interruption queue entirely
+KARPENTER_NODE_POOLS = _config.get_object("karpenter_node_pools")
+
+# Startup invoke cache (caller identity / AZ lookups)
+# - `invoke_cache_bypass: true` forces fresh lookups and refreshes the cache
+INVOKE_CACHE_BYPASS = _config.get_bool("invoke_cache_bypass") or False
+# - `invoke_cache_ttl: 0` expires entries right away
+INVOKE_CACHE_TTL = _config.get_int("invoke_cache_ttl")
+if INVOKE_CACHE_TTL is None:
+    INVOKE_CACHE_TTL = 3600
@@ -0,0 +1,204 @@
+"""
+IPv4 subnet sizing from the VPC block, AZ count and weighted tiers
+- every tier gets one power of two block per AZ slot, sized by weight:
+  proportional first, then blocks are doubled (most under-served tier
+  first) while the plan still fits, so little of the VPC is left idle
+- a tier never gets bigger blocks than a heavier tier
+- blocks are laid out largest first so each is aligned to its own size
+- az_slots above the AZ count reserve growth slots: the extra AZ blocks
+  are planned and left empty, adding an AZ later takes one without
+  moving any existing subnet (keep az_slots fixed once deployed)
+- tiers Vpc doesn't create yet (intra, database, ...) can be listed to
+  hold their space in the plan
+- anything that can't fit raises ValueError with the whole report, so a
+  bad config stops the program before any resource is registered
+
+Run `python subnet_sizing.py` to print plans for a /16 at 2, 3 and 6 AZs,
+tests/test_subnet_sizing.py checks the layout guarantees above
+"""
+
+import ipaddress
+from dataclasses import dataclass
+
+# smallest / largest subnet AWS allows
+AWS_MIN_SUBNET_PREFIXLEN = 28
+AWS_MAX_SUBNET_PREFIXLEN = 16
+
+
+@dataclass(frozen=True)
+class TierSpec:
+    name: str
+    weight: float
+    # smallest block the tier accepts, /28 is the AWS floor
+    max_prefixlen: int = AWS_MIN_SUBNET_PREFIXLEN
+
+    def __post_init__(self):
+        if self.weight <= 0:
+            raise ValueError(f"{self.name}: tier weight must be positive, got: {self.weight}")
+        if not AWS_MAX_SUBNET_PREFIXLEN <= self.max_prefixlen <= AWS_MIN_SUBNET_PREFIXLEN:
+            raise ValueError(
+                f"{self.name}: max_prefixlen must be in /{AWS_MAX_SUBNET_PREFIXLEN}"
+                f"../{AWS_MIN_SUBNET_PREFIXLEN}, got: /{self.max_prefixlen}"
+            )
+
+
+def tier_specs(tiers: dict) -> list[TierSpec]:
+    """{tier: weight} or {tier: {weight, max_prefixlen}} in config order"""
+    specs = []
+    for name, value in tiers.items():
+        if isinstance(value, dict):
+            specs.append(TierSpec(name=name, **value))
+        else:
+            specs.append(TierSpec(name=name, weight=value))
+    if not specs:
+        raise ValueError("need at least one IPv4 tier")
+    return specs
+
+
+@dataclass(frozen=True)
+class Ipv4Plan:
+    vpc_cidr_block: str
+    az_count: int
+    az_slots: int
+    tiers: tuple[TierSpec, ...]
+    # tier -> prefix length of its per AZ blocks
+    prefixlens: dict
+    # tier -> CIDR per AZ slot, growth slots after the AZs in use
+    blocks: dict
+
+    @property
+    def capacity(self) -> int:
+        return ipaddress.ip_network(self.vpc_cidr_block).num_addresses
+
+    @property
+    def allocated(self) -> int:
+        return sum(self.az_slots << (32 - length) for length in self.prefixlens.values())
+
+    def report(self) -> str:
+        return _report(
+            self.vpc_cidr_block, self.az_count, self.az_slots, self.tiers, self.prefixlens
+        )
+
+
+def _report(
+    vpc_cidr_block: str,
+    az_count: int,
+    az_slots: int,
+    tiers: tuple[TierSpec, ...],
+    prefixlens: dict,
+    problem: str = "",
+) -> str:
+    capacity = ipaddress.ip_network(vpc_cidr_block).num_addresses
+    total_weight = sum(tier.weight for tier in tiers)
+    lines = [
+        f"IPv4 plan for {vpc_cidr_block} ({capacity} addresses),"
+        f" {az_count} AZs in {az_slots} slots",
+        f"  {'tier':<12}{'weight':>8}{'want':>8}{'min':>6}{'block':>7}{'addresses':>11}",
+    ]
+    used = 0
+    for tier in tiers:
+        want = capacity * tier.weight / total_weight / az_slots
+        length = prefixlens.get(tier.name)
+        size = az_slots << (32 - length) if length is not None else 0
+        used += size
+        lines.append(
+            f"  {tier.name:<12}{tier.weight:>8g}{want:>8.0f}{'/' + str(tier.max_prefixlen):>6}"
+            f"{'/' + str(length) if length is not None else '-':>7}{size:>11}"
+        )
+    lines.append(f"  {'total':<41}{used:>11} of {capacity}")
+    if problem:
+        lines.append(f"  {problem}")
+    return "\n".join(lines)
+
+
+def _prefixlen(size: int) -> int:
+    return 33 - size.bit_length()
+
+
+def plan_ipv4(
+    vpc_cidr_block: str,
+    az_count: int,
+    tiers: dict,
+    az_slots: int | None = None,
+) -> Ipv4Plan:
+    """largest aligned per AZ block for every tier, ValueError when it can't fit"""
+    network = ipaddress.ip_network(vpc_cidr_block)
+    if network.version != 4:
+        raise ValueError(f"vpc_cidr_block must be IPv4, got: {vpc_cidr_block}")
+    specs = tuple(tier_specs(tiers))
+    az_slots = az_count if az_slots is None else az_slots
+    if az_count < 1 or az_slots < az_count:
+        raise ValueError(f"need 1 <= az_count <= az_slots, got {az_count} / {az_slots}")
+
+    capacity = network.num_addresses
+    total_weight = sum(tier.weight for tier in specs)
+    # per AZ block size in addresses, the proportional share rounded down to
+    # a power of two, never below the tier's floor / above the VPC
+    sizes = {}
+    for tier in specs:
+        share = int(capacity * tier.weight / total_weight / az_slots)
+        floor = 1 << (32 - tier.max_prefixlen)
+        sizes[tier.name] = min(max(1 << (share.bit_length() - 1) if share else 0, floor), capacity)
+
+    def lengths() -> dict:
+        return {name: _prefixlen(size) for name, size in sizes.items()}
+
+    used = sum(az_slots * size for size in sizes.values())
+    if used > capacity:
+        raise ValueError(
+            _report(
+                vpc_cidr_block,
+                az_count,
+                az_slots,
+                specs,
+                lengths(),
+                f"needs {used} addresses - use a larger vpc_cidr, fewer az_slots /"
+                " tiers or smaller tier minimums",
+            )
+        )
+
+    # double the most under-served tier while it fits
+    # - a tier never outgrows a heavier one, leftovers stay unallocated
+    largest = 1 << (32 - AWS_MAX_SUBNET_PREFIXLEN)
+    while True:
+        for tier in sorted(specs, key=lambda tier: sizes[tier.name] / tier.weight):
+            size = sizes[tier.name]
+            heavier = [sizes[t.name] for t in specs if t.weight > tier.weight]
+            if (
+                size * 2 <= min(heavier, default=largest)
+                and size * 2 <= largest
+                and used + az_slots * size <= capacity
+            ):
+                used += az_slots * size
+                sizes[tier.name] = size * 2
+                break
+        else:
+            break
+
+    # largest first keeps every block aligned, ties in tier / slot order
+    order = {tier.name: index for index, tier in enumerate(specs)}
+    blocks = {tier.name: [None] * az_slots for tier in specs}
+    offset = int(network.network_address)
+    for name in sorted(sizes, key=lambda name: (-sizes[name], order[name])):
+        for slot in range(az_slots):
+            blocks[name][slot] = f"{ipaddress.IPv4Address(offset)}/{_prefixlen(sizes[name])}"
+            offset += sizes[name]
+    return Ipv4Plan(
+        vpc_cidr_block=vpc_cidr_block,
+        az_count=az_count,
+        az_slots=az_slots,
+        tiers=specs,
+        prefixlens=lengths(),
+        blocks=blocks,
+    )
+
+
+if __name__ == "__main__":
+    weights = {"public": 1, "private": 4, "intra": 1, "database": 1}
+    for az_count in (2, 3, 6):
+        print(plan_ipv4("10.0.0.0/16", az_count, weights, az_slots=az_count + 1).report())
+        print()
+    try:
+        plan_ipv4("10.0.0.0/24", 6, {"public": 1, "private": {"weight": 4, "max_prefixlen": 24}})
+    except ValueError as error:
+        print(error)
@@ -0,0 +1,197 @@
+"""address_lookup tries and bulk lookups against ipaddress"""
+
+import ipaddress
+import json
+import random
+
+import pytest
+
+from address_lookup import NO_MATCH, AddressIndex, PlanSubnet, PrefixTrie
+from vpc import build_address_plan
+
+ZONE_IDS = [f"use1-az{n}" for n in range(1, 7)]
+VPC_CIDR = "10.0.0.0/16"
+VPC_IPV6_CIDR = "2600:1f18:1234:ab00::/56"
+
+
+def ip(address: str) -> int:
+    return int(ipaddress.ip_address(address))
+
+
+def brute_force(prefixes: list, bits: int, address: int) -> int:
+    """longest prefix holding address, later inserts win on the same prefix"""
+    best, best_length = NO_MATCH, -1
+    for network, length, value in prefixes:
+        if address >> (bits - length) == network >> (bits - length) and length >= best_length:
+            best, best_length = value, length
+    return best
+
+
+def test_patricia_split():
+    trie = PrefixTrie(32)
+    trie.insert(ip("10.0.0.0"), 24, 1)
+    # diverges from 10.0.0.0/24 at bit 23, needs a valueless /23 split node
+    trie.insert(ip("10.0.1.0"), 24, 2)
+    assert len(trie) == 2
+    assert trie.lookup(ip("10.0.0.9")) == 1
+    assert trie.lookup(ip("10.0.1.9")) == 2
+    # inside the split node's /23 but neither child
+    assert trie.lookup(ip("10.0.2.9")) == NO_MATCH
+    assert trie.lookup_many([ip("10.0.0.9"), ip("10.0.1.9"), ip("10.0.2.9")]).tolist() == [
+        1,
+        2,
+        NO_MATCH,
+    ]
+
+
+def test_insert_above_child():
+    trie = PrefixTrie(32)
+    trie.insert(ip("10.0.0.0"), 24, 1)
+    trie.insert(ip("10.0.0.0"), 16, 2)
+    trie.insert(ip("10.0.64.0"), 18, 3)
+    assert trie.lookup(ip("10.0.0.9")) == 1
+    assert trie.lookup(ip("10.0.5.9")) == 2
+    assert trie.lookup(ip("10.0.64.9")) == 3
+    assert trie.lookup(ip("10.1.0.9")) == NO_MATCH
+    # same prefix again replaces the value
+    trie.insert(ip("10.0.0.0"), 16, 4)
+    assert trie.lookup(ip("10.0.5.9")) == 4
+    assert len(trie) == 3
+
+
+def test_default_route_and_host_bits():
+    trie = PrefixTrie(128)
+    trie.insert(0, 0, 7)
+    # host bits below the prefix length are masked off
+    trie.insert(ip("2600:1f18::1"), 32, 8)
+    assert trie.lookup(ip("::1")) == 7
+    assert trie.lookup(ip("2600:1f18:ffff::")) == 8
+    assert trie.lookup_many([ip("::1"), ip("2600:1f18:ffff::")]).tolist() == [7, 8]
+
+
+@pytest.mark.parametrize("bits", [32, 128])
+def test_random_prefixes_match_brute_force(bits):
+    rng = random.Random(bits)
+    trie = PrefixTrie(bits)
+    prefixes = []
+    # few distinct top bits so prefixes nest and split each other a lot
+    for value in range(300):
+        length = rng.randint(0, bits)
+        network = (rng.getrandbits(8) << (bits - 8)) | rng.getrandbits(bits - 8)
+        network &= ((1 << length) - 1) << (bits - length)
+        trie.insert(network, length, value)
+        prefixes.append((network, length, value))
+        if value in (10, 100):
+            # bulk levels are rebuilt after later inserts
+            trie.lookup_many([0])
+    addresses = [network | rng.getrandbits(bits - length) for network, length, _ in prefixes]
+    addresses += [rng.getrandbits(bits) for _ in range(300)]
+    want = [brute_force(prefixes, bits, address) for address in addresses]
+    assert [trie.lookup(address) for address in addresses] == want
+    assert trie.lookup_many(addresses).tolist() == want
+
+
+@pytest.fixture(scope="module")
+def index():
+    return AddressIndex(
+        build_address_plan(VPC_CIDR, VPC_IPV6_CIDR, ZONE_IDS, ipv4_newbits=4)
+    )
+
+
+@pytest.mark.parametrize("version", [4, 6])
+def test_trie_bulk_and_ipaddress_agree(index, version):
+    rng = random.Random(version)
+    networks = [
+        (ipaddress.ip_network(cidr), code)
+        for code, subnet in enumerate(index.subnets)
+        for cidr in (subnet.cidr_block, subnet.ipv6_cidr_block)
+        if cidr
+    ]
+    # inside and around the VPC blocks
+    if version == 6:
+        base, spread, to_ip = ip("2600:1f18:1234:ab00::"), 68, ipaddress.IPv6Address
+    else:
+        base, spread, to_ip = ip("10.0.0.0"), 17, ipaddress.IPv4Address
+    addresses = [base + rng.getrandbits(spread) for _ in range(2000)]
+    bulk = index.lookup_codes(addresses, version=version)
+    for address, bulk_code in zip(addresses, bulk):
+        want = next(
+            (code for network, code in networks if to_ip(address) in network), NO_MATCH
+        )
+        assert index.code(address, version) == want == bulk_code, to_ip(address)
+
+
+def test_lookup_codes_mixed_strings(index):
+    addresses = [
+        "10.0.0.1",
+        "2600:1f18:1234:ab00::1",
+        "192.168.0.1",
+        "2600:1f18:1234:ab06::1",
+        "::1",
+        "10.0.96.1",
+    ]
+    codes = index.lookup_codes(addresses)
+    assert codes.tolist() == [index.code(address) for address in addresses]
+    assert index.decode(codes) == [
+        ("public", "use1-az1"),
+        ("public", "use1-az1"),
+        None,
+        ("private", "use1-az1"),
+        None,
+        ("private", "use1-az1"),
+    ]
+    assert index.lookup("10.0.0.1") == index.subnets[0]
+    assert index.lookup("192.168.0.1") is None
+
+
+def test_int_version_heuristic():
+    # ::/120 and 0.0.0.0/24 cover the same small ints
+    index = AddressIndex(
+        {
+            "v4": {"z": {"cidr_block": "0.0.0.0/24", "ipv6_cidr_block": None}},
+            "v6": {"z": {"cidr_block": None, "ipv6_cidr_block": "::/120"}},
+            "high": {"z": {"cidr_block": None, "ipv6_cidr_block": "::1:0:0/96"}},
+        }
+    )
+    # below 2**32 an int is taken as IPv4 unless version says otherwise
+    assert index.code(5) == 0
+    assert index.code(5, version=6) == 1
+    assert index.lookup_codes([5]).tolist() == [0]
+    assert index.lookup_codes([5], version=6).tolist() == [1]
+    # from 2**32 up it can only be IPv6
+    assert index.code(1 << 32) == 2
+    assert index.lookup_codes([1 << 32, 5]).tolist() == [2, 0]
+
+
+def test_ipv6_only_tiers():
+    plan = build_address_plan(
+        VPC_CIDR, VPC_IPV6_CIDR, ZONE_IDS[:2], ipv6_only_tiers=("private",)
+    )
+    index = AddressIndex(plan)
+    private = [subnet for subnet in index.subnets if subnet.tier == "private"]
+    assert private and all(subnet.cidr_block is None for subnet in private)
+    assert len(index.v4) == 2 and len(index.v6) == 4
+    # the private tier's IPv4 netnums stay reserved, nothing answers there
+    reserved = ipaddress.ip_network(
+        build_address_plan(VPC_CIDR, None, ZONE_IDS[:2])["private"]["use1-az1"]["cidr_block"]
+    )
+    assert index.lookup(str(reserved.network_address + 1)) is None
+    ipv6 = ipaddress.ip_network(private[0].ipv6_cidr_block)
+    assert index.lookup(str(ipv6.network_address + 1)) == private[0]
+
+
+def test_plan_before_the_ipv6_block_is_known():
+    index = AddressIndex(build_address_plan(VPC_CIDR, None, ZONE_IDS[:2]))
+    assert len(index.v6) == 0
+    assert index.lookup("2600:1f18:1234:ab00::1") is None
+    assert index.lookup("10.0.0.1") == PlanSubnet("public", "use1-az1", "10.0.0.0/19", None)
+
+
+def test_load(tmp_path):
+    plan = build_address_plan(VPC_CIDR, VPC_IPV6_CIDR, ZONE_IDS[:3])
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(plan))
+    index = AddressIndex.load(path)
+    assert [(subnet.tier, subnet.zone_id) for subnet in index.subnets] == [
+        (tier, zone_id) for tier, zones in plan.items() for zone_id in zones
+    ]
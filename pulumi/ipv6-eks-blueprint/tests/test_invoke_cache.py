@@ -0,0 +1,154 @@
+"""invoke_cache keys, TTL and the Output helpers under pulumi mocks"""
+
+import json
+from types import SimpleNamespace
+from typing import Callable
+
+import invoke_cache
+import pulumi
+from invoke_cache import InvokeCache
+
+
+def test_env_credentials_change_the_scope(monkeypatch):
+    for name in ("AWS_PROFILE", "AWS_ACCESS_KEY_ID", "AWS_SESSION_TOKEN"):
+        monkeypatch.delenv(name, raising=False)
+    assert invoke_cache.aws_scope()["credentials"] is None
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAEXAMPLEONE")
+    first = invoke_cache.aws_scope()
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "session")
+    with_token = invoke_cache.aws_scope()
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAEXAMPLETWO")
+    second = invoke_cache.aws_scope()
+
+    keys = {
+        InvokeCache.key(invoke_cache.CALLER_IDENTITY_TOKEN, scope, {})
+        for scope in (first, with_token, second)
+    }
+    assert len(keys) == 3
+    # only a hash goes into the scope
+    assert "AKIAEXAMPLETWO" not in str(second)
+
+
+def test_ttl(tmp_path):
+    now = [1000.0]
+    cache = InvokeCache(path=tmp_path / "invokes.json", ttl_seconds=60, clock=lambda: now[0])
+    cache.put("key", {"account_id": "111111111111"})
+    assert cache.get("key") == {"account_id": "111111111111"}
+    now[0] += 60
+    assert cache.get("key") is None
+
+
+def test_zero_ttl_never_hits(tmp_path):
+    cache = InvokeCache(path=tmp_path / "invokes.json", ttl_seconds=0, clock=lambda: 1000.0)
+    cache.put("key", {"account_id": "111111111111"})
+    assert cache.get("key") is None
+
+
+class NoInvokes(pulumi.runtime.Mocks):
+    """the helpers get fake invokes passed in, nothing should reach these"""
+
+    def new_resource(self, args):
+        raise AssertionError(f"unexpected resource {args.typ}")
+
+    def call(self, args):
+        raise AssertionError(f"unexpected invoke {args.token}")
+
+
+class FakeInvoke:
+    """stands in for aws.get_*_output, counts calls"""
+
+    def __init__(self, **result):
+        self.result = SimpleNamespace(**result)
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        return pulumi.Output.from_input(self.result)
+
+
+def resolve(make_output: Callable[[], pulumi.Output]):
+    """value of the Output make_output builds, evaluated under pulumi mocks"""
+    values = []
+    pulumi.runtime.set_mocks(NoInvokes(), project="invoke-cache", stack="test")
+    pulumi.runtime.test(lambda: make_output().apply(values.append))()
+    return values[0]
+
+
+SCOPE = {"profile": "eph", "region": "us-east-1", "credentials": None}
+IDENTITY = {
+    "account_id": "111111111111",
+    "arn": "arn:aws:sts::111111111111:assumed-role/eph/session",
+    "user_id": "AROAEXAMPLE:session",
+}
+FILTERS = [{"name": "zone-id", "values": ["use1-az1", "use1-az2"]}]
+AZS = {"names": ["us-east-1a", "us-east-1b"], "zone_ids": ["use1-az1", "use1-az2"]}
+
+
+def test_caller_identity_miss_hit_bypass(tmp_path):
+    path = tmp_path / "invokes.json"
+    fake = FakeInvoke(**IDENTITY)
+
+    def lookup(cache: InvokeCache) -> dict:
+        return resolve(lambda: invoke_cache.get_caller_identity_output(cache, SCOPE, fake))
+
+    # miss: calls the invoke and stores what it resolved to
+    miss = InvokeCache(path)
+    assert lookup(miss) == IDENTITY
+    assert (len(fake.calls), miss.hits, miss.misses) == (1, 0, 1)
+    stored = [entry["value"] for entry in json.loads(path.read_text()).values()]
+    assert stored == [IDENTITY]
+
+    # hit: a fresh cache on the same file answers without calling
+    hit = InvokeCache(path)
+    assert lookup(hit) == IDENTITY
+    assert (len(fake.calls), hit.hits, hit.misses) == (1, 1, 0)
+
+    # bypass and a zero TTL both call again, same result
+    assert lookup(InvokeCache(path, bypass=True)) == IDENTITY
+    assert len(fake.calls) == 2
+    assert lookup(InvokeCache(path, ttl_seconds=0)) == IDENTITY
+    assert len(fake.calls) == 3
+    # and a normal cache still hits the refreshed entry
+    assert lookup(InvokeCache(path)) == IDENTITY
+    assert len(fake.calls) == 3
+
+
+def test_availability_zones_keyed_by_account(tmp_path):
+    path = tmp_path / "invokes.json"
+    fake = FakeInvoke(**AZS)
+
+    def lookup(cache: InvokeCache, account_id) -> dict:
+        return resolve(
+            lambda: invoke_cache.get_availability_zones_output(
+                cache, account_id, FILTERS, SCOPE, fake
+            )
+        )
+
+    assert lookup(InvokeCache(path), "111111111111") == AZS
+    assert fake.calls == [{"filters": FILTERS}]
+    # account_id can be an Output, e.g. from get_caller_identity_output
+    assert lookup(InvokeCache(path), pulumi.Output.from_input("111111111111")) == AZS
+    assert len(fake.calls) == 1
+    # another account is another entry
+    assert lookup(InvokeCache(path), "222222222222") == AZS
+    assert len(fake.calls) == 2
+    assert lookup(InvokeCache(path, bypass=True), "111111111111") == AZS
+    assert len(fake.calls) == 3
+
+
+def test_get_or_call_output(tmp_path):
+    path = tmp_path / "invokes.json"
+    calls = []
+
+    def call() -> pulumi.Output:
+        calls.append(1)
+        return pulumi.Output.from_input({"value": len(calls)})
+
+    def lookup(cache: InvokeCache) -> dict:
+        return resolve(lambda: cache.get_or_call_output("token", SCOPE, {"a": 1}, call))
+
+    assert lookup(InvokeCache(path)) == {"value": 1}
+    assert lookup(InvokeCache(path)) == {"value": 1}
+    assert lookup(InvokeCache(path, ttl_seconds=0)) == {"value": 2}
+    assert len(calls) == 2
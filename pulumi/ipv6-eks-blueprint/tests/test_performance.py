@@ -0,0 +1,43 @@
+"""performance profiles against instance_catalog baselines"""
+
+import pytest
+
+from eks import NodeGroupProfile
+from instance_catalog import ARCHES, BY_NAME
+from performance import PERFORMANCE_PROFILES, PerformanceProfile
+
+
+@pytest.mark.parametrize("arch", ARCHES)
+@pytest.mark.parametrize("profile", PERFORMANCE_PROFILES)
+def test_selected_types_sustain_the_profile(profile, arch):
+    node_group = NodeGroupProfile(
+        name="n", instance_types=None, arch=arch, performance_profile=profile
+    )
+    instance_types = node_group.resolved_instance_types()
+    assert instance_types
+    PERFORMANCE_PROFILES[profile].check_instance_types(instance_types)
+
+
+@pytest.mark.parametrize("name", ["m6i.xlarge", "m7i.xlarge", "c7g.xlarge", "r7g.xlarge"])
+def test_burst_figures_dont_pass_throughput(name):
+    # 12.5 Gbps "up to", a fraction of that sustained
+    assert BY_NAME[name].network_gbps == 12.5
+    with pytest.raises(ValueError, match="baseline"):
+        PERFORMANCE_PROFILES["throughput"].check_instance_types([name])
+
+
+def test_gp3_baseline_needs_nothing_from_ebs():
+    general = PERFORMANCE_PROFILES["general"]
+    assert (general.min_ebs_mbps, general.min_ebs_iops) == (0, 0)
+    general.check_instance_types(["t3.medium"])
+
+
+def test_provisioned_gp3_is_checked_against_ebs_baseline():
+    profile = PerformanceProfile(
+        name="disk", volume_size_gib=50, volume_iops=8000, volume_throughput_mibps=250
+    )
+    with pytest.raises(ValueError) as error:
+        profile.check_instance_types(["m6i.xlarge"])
+    assert "EBS baseline iops" in str(error.value)
+    assert "Mbps EBS baseline" in str(error.value)
+    profile.check_instance_types(["m6i.2xlarge"])
@@ -0,0 +1,31 @@
+"""Vpc routing for every layout, see tools/routes.py"""
+
+import pytest
+
+from tools.mocks import AZ_ZONE_IDS
+from tools.routes import LOCAL, check_layout, evaluator
+from vpc import NAT_MODES, PRIVATE_SUBNET_MODES
+
+
+@pytest.mark.parametrize("private_subnet_mode", PRIVATE_SUBNET_MODES)
+@pytest.mark.parametrize("nat_mode", NAT_MODES)
+@pytest.mark.parametrize("az_count", [2, 3, 6])
+def test_layout(az_count, nat_mode, private_subnet_mode):
+    assert check_layout(az_count, nat_mode, private_subnet_mode) == []
+
+
+def test_lookup():
+    routes = evaluator(3, nat_mode="per_az")
+    subnet = "eks-ipv6-bp-us-east-1-private-use1-az2"
+
+    hop = routes.lookup(subnet, "64:ff9b::8.8.8.8")
+    assert hop.reachable
+    assert (hop.target_type, hop.target_zone_id) == ("nat", AZ_ZONE_IDS[1])
+    assert routes.lookup(subnet, "10.0.0.1").target_type == LOCAL
+    # subnet ids work as well as names
+    assert routes.lookup(routes.subnet_id(subnet), "2606:4700:4700::1111") == routes.lookup(
+        subnet, "2606:4700:4700::1111"
+    )
+
+    with pytest.raises(ValueError, match="unknown subnet"):
+        routes.lookup("nope", "1.1.1.1")
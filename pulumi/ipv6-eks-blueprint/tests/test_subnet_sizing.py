@@ -0,0 +1,82 @@
+"""plan_ipv4 layout guarantees"""
+
+import ipaddress
+
+import pytest
+
+from subnet_sizing import AWS_MIN_SUBNET_PREFIXLEN, TierSpec, plan_ipv4, tier_specs
+
+WEIGHTS = {"public": 1, "private": 4, "intra": 1, "database": 1}
+
+
+def networks(plan):
+    return [ipaddress.ip_network(cidr) for cidrs in plan.blocks.values() for cidr in cidrs]
+
+
+@pytest.mark.parametrize("vpc_cidr", ["10.0.0.0/16", "10.128.0.0/20", "172.16.4.0/22"])
+@pytest.mark.parametrize("az_count", [1, 2, 3, 6])
+def test_blocks_aligned_contained_and_disjoint(vpc_cidr, az_count):
+    vpc = ipaddress.ip_network(vpc_cidr)
+    plan = plan_ipv4(vpc_cidr, az_count, WEIGHTS, az_slots=az_count + 1)
+    blocks = networks(plan)
+
+    assert len(blocks) == len(WEIGHTS) * (az_count + 1)
+    # ip_network(strict) would already reject a misaligned block
+    assert all(int(n.network_address) % n.num_addresses == 0 for n in blocks)
+    assert all(n.subnet_of(vpc) for n in blocks)
+    assert not any(a.overlaps(b) for i, a in enumerate(blocks) for b in blocks[i + 1 :])
+    assert sum(n.num_addresses for n in blocks) == plan.allocated <= plan.capacity
+
+
+def test_heavier_tier_never_gets_smaller_blocks():
+    plan = plan_ipv4("10.0.0.0/16", 3, WEIGHTS)
+    assert plan.prefixlens["private"] <= plan.prefixlens["public"]
+    # equal weights, equal blocks
+    assert len({plan.prefixlens[tier] for tier in ("public", "intra", "database")}) == 1
+
+
+def test_growth_slot_keeps_existing_blocks():
+    two = plan_ipv4("10.0.0.0/16", 2, WEIGHTS, az_slots=3)
+    three = plan_ipv4("10.0.0.0/16", 3, WEIGHTS, az_slots=3)
+    # the third AZ takes its reserved slot, the first two don't move
+    assert two.blocks == three.blocks
+    assert two.report().splitlines()[1:] == three.report().splitlines()[1:]
+
+
+def test_tier_floor():
+    plan = plan_ipv4(
+        "10.0.0.0/16", 2, {"public": 1, "private": 1000, "tiny": {"weight": 1, "max_prefixlen": 24}}
+    )
+    assert plan.prefixlens["tiny"] <= 24
+
+
+def test_overflow_reports_the_plan():
+    with pytest.raises(ValueError) as error:
+        plan_ipv4("10.0.0.0/24", 6, {"public": 1, "private": {"weight": 4, "max_prefixlen": 24}})
+    report = str(error.value)
+    assert report.startswith("IPv4 plan for 10.0.0.0/24")
+    assert "use a larger vpc_cidr" in report
+
+
+@pytest.mark.parametrize(
+    "args, match",
+    [
+        (("fd00::/56", 2, WEIGHTS), "must be IPv4"),
+        (("10.0.0.0/16", 0, WEIGHTS), "az_count"),
+        (("10.0.0.0/16", 3, WEIGHTS, 2), "az_count"),
+        (("10.0.0.0/16", 2, {}), "at least one IPv4 tier"),
+        (("10.0.0.0/16", 2, {"public": 0}), "must be positive"),
+        (("10.0.0.0/16", 2, {"public": {"weight": 1, "max_prefixlen": 29}}), "max_prefixlen"),
+    ],
+)
+def test_invalid(args, match):
+    with pytest.raises(ValueError, match=match):
+        plan_ipv4(*args)
+
+
+def test_tier_specs_keep_config_order():
+    specs = tier_specs({"private": 4, "public": {"weight": 1, "max_prefixlen": 26}})
+    assert specs == [
+        TierSpec("private", 4, AWS_MIN_SUBNET_PREFIXLEN),
+        TierSpec("public", 1, 26),
+    ]
@@ -0,0 +1,4 @@
+"""
+Offline tooling for this project - run from the project dir, e.g.
+`uv run python -m tools.bench`
+"""
@@ -0,0 +1,112 @@
+"""
+Program evaluation benchmark for Vpc + Cluster under pulumi mocks
+- stand-in for `pulumi preview` cost without an AWS account or engine
+- each scenario runs in its own process so peak RSS isn't shared
+- records wall time, registered resources, Outputs created and peak RSS
+
+    python -m tools.bench                               # .bench/vpc_cluster.json
+    python -m tools.bench --output .bench/main.json     # save a baseline
+    python -m tools.bench --baseline .bench/main.json   # compare against it
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+AZ_COUNTS = (2, 3, 6, 12)
+METRICS = ("wall_s", "resources", "outputs_created", "peak_rss_kb")
+DEFAULT_OUTPUT = Path(".bench") / "vpc_cluster.json"
+
+
+def ipv4_newbits_for(az_count: int, tiers: int = 2) -> int:
+    """smallest /19-or-smaller split that fits every tier in every AZ"""
+    return max(3, (tiers * az_count - 1).bit_length())
+
+
+def run_scenario(az_count: int) -> dict:
+    # imported up front so module import time isn't counted as evaluation
+    import eks  # noqa: F401
+    import vpc  # noqa: F401
+    from tools.mocks import OutputCounter, blueprint, run_program
+
+    with OutputCounter() as outputs:
+        start = time.perf_counter()
+        monitor = run_program(
+            lambda: blueprint(az_count, ipv4_newbits=ipv4_newbits_for(az_count))
+        )
+        wall = time.perf_counter() - start
+    return {
+        "az_count": az_count,
+        "wall_s": round(wall, 4),
+        "resources": len(monitor.registrations),
+        "outputs_created": outputs.created,
+        # kilobytes on linux
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_all(az_counts: list[int], repeat: int) -> list[dict]:
+    results = []
+    for az_count in az_counts:
+        runs = []
+        for _ in range(repeat):
+            proc = subprocess.run(
+                [sys.executable, "-m", "tools.bench", "--scenario", str(az_count)],
+                capture_output=True,
+                check=True,
+                text=True,
+            )
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        # best wall time, worst memory
+        best = min(runs, key=lambda run: run["wall_s"])
+        best["peak_rss_kb"] = max(run["peak_rss_kb"] for run in runs)
+        results.append(best)
+    return results
+
+
+def print_results(results: list[dict], baseline: list[dict] | None) -> None:
+    previous = {run["az_count"]: run for run in baseline or []}
+    print(f"{'azs':>4}" + "".join(f"{metric:>22}" for metric in METRICS))
+    for run in results:
+        row = f"{run['az_count']:>4}"
+        for metric in METRICS:
+            cell = f"{run[metric]}"
+            before = previous.get(run["az_count"], {}).get(metric)
+            if before:
+                cell += f" ({(run[metric] - before) / before:+.0%})"
+            row += f"{cell:>22}"
+        print(row)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--azs", type=int, nargs="+", default=list(AZ_COUNTS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, help="earlier --output to diff")
+    parser.add_argument("--scenario", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario)))
+        return
+
+    results = run_all(args.azs, args.repeat)
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else None
+    print_results(results, baseline)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results},
+            indent=2,
+        )
+    )
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Critical path of the Vpc + Cluster resource DAG from a mocks run
+- edges are each registration's dependencies (inputs + depends_on)
+- explicit edges are depends_on entries no input already implies
+- durations are rough per-type create times, override with --durations
+- reports the slowest chain and how much each explicit edge adds to it
+
+    python -m tools.critical_path
+    python -m tools.critical_path --azs 3 --durations my_durations.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from tools.mocks import Registration, blueprint, run_program
+
+# Seconds to create, rough numbers from `pulumi up` logs in us-east-1
+DURATIONS_S = {
+    "aws:cloudwatch/eventRule:EventRule": 1,
+    "aws:cloudwatch/eventTarget:EventTarget": 1,
+    "aws:ec2/defaultNetworkAcl:DefaultNetworkAcl": 3,
+    "aws:ec2/defaultRouteTable:DefaultRouteTable": 2,
+    "aws:ec2/defaultSecurityGroup:DefaultSecurityGroup": 3,
+    "aws:ec2/egressOnlyInternetGateway:EgressOnlyInternetGateway": 2,
+    "aws:ec2/eip:Eip": 2,
+    "aws:ec2/internetGateway:InternetGateway": 2,
+    "aws:ec2/launchTemplate:LaunchTemplate": 3,
+    "aws:ec2/natGateway:NatGateway": 100,
+    "aws:ec2/route:Route": 2,
+    "aws:ec2/routeTable:RouteTable": 2,
+    "aws:ec2/routeTableAssociation:RouteTableAssociation": 1,
+    "aws:ec2/securityGroup:SecurityGroup": 3,
+    "aws:ec2/subnet:Subnet": 5,
+    "aws:ec2/vpc:Vpc": 12,
+    "aws:ec2/vpcEndpoint:VpcEndpoint": 90,
+    "aws:eks/accessEntry:AccessEntry": 2,
+    "aws:eks/accessPolicyAssociation:AccessPolicyAssociation": 2,
+    "aws:eks/addon:Addon": 60,
+    "aws:eks/cluster:Cluster": 600,
+    "aws:eks/nodeGroup:NodeGroup": 180,
+    "aws:iam/openIdConnectProvider:OpenIdConnectProvider": 1,
+    "aws:iam/role:Role": 2,
+    "aws:iam/rolePolicy:RolePolicy": 1,
+    "aws:iam/rolePolicyAttachment:RolePolicyAttachment": 1,
+    "aws:kms/alias:Alias": 1,
+    "aws:kms/key:Key": 10,
+    "aws:sqs/queue:Queue": 25,
+    "aws:sqs/queuePolicy:QueuePolicy": 25,
+    "aws:vpc/securityGroupEgressRule:SecurityGroupEgressRule": 1,
+    "aws:vpc/securityGroupIngressRule:SecurityGroupIngressRule": 1,
+}
+DEFAULT_DURATION_S = 5
+
+
+class ResourceGraph:
+    """resource DAG with per-node durations, components take no time"""
+
+    def __init__(self, registrations: list[Registration], durations: dict):
+        self.nodes = {r.urn: r for r in registrations}
+        self.durations = {
+            r.urn: durations.get(r.type, DEFAULT_DURATION_S) if r.custom else 0
+            for r in registrations
+        }
+        self.deps = {
+            r.urn: {dep for dep in r.dependencies if dep in self.nodes}
+            for r in registrations
+        }
+        self.explicit = {}
+        for r in registrations:
+            implied = {dep for deps in r.property_dependencies.values() for dep in deps}
+            explicit = self.deps[r.urn] - implied
+            if explicit:
+                self.explicit[r.urn] = explicit
+
+    def label(self, urn: str) -> str:
+        node = self.nodes[urn]
+        return f"{node.type.split(':')[-1]} {node.name}"
+
+    def finish_times(self, without: tuple[str, set] | None = None) -> dict:
+        """
+        earliest finish per node with unlimited parallelism
+        - without: (urn, deps) edges to leave out of the graph
+        """
+        finish = {}
+
+        def visit(urn: str) -> float:
+            if urn not in finish:
+                deps = self.deps[urn]
+                if without and without[0] == urn:
+                    deps = deps - without[1]
+                finish[urn] = self.durations[urn] + max(
+                    (visit(dep) for dep in deps), default=0
+                )
+            return finish[urn]
+
+        for urn in self.nodes:
+            visit(urn)
+        return finish
+
+    def critical_path(self, finish: dict) -> list[str]:
+        urn = max(finish, key=finish.get)
+        path = [urn]
+        while self.deps[urn]:
+            urn = max(self.deps[urn], key=finish.get)
+            path.append(urn)
+        return path[::-1]
+
+    def saving(self, urn: str, deps: set) -> float:
+        total = max(self.finish_times().values())
+        return total - max(self.finish_times(without=(urn, deps)).values())
+
+    def edge_savings(self) -> list[dict]:
+        """
+        wall-clock saved by dropping each explicit edge on its own
+        - parallel edges of equal length hide each other here, see
+          resource_savings for dropping them together
+        """
+        savings = [
+            {
+                "resource": self.label(urn),
+                "depends_on": self.label(dep),
+                "saving_s": self.saving(urn, {dep}),
+            }
+            for urn, deps in self.explicit.items()
+            for dep in deps
+        ]
+        return sorted(savings, key=lambda s: (-s["saving_s"], s["resource"]))
+
+    def resource_savings(self) -> list[dict]:
+        """wall-clock saved by dropping all of a resource's explicit edges"""
+        savings = [
+            {
+                "resource": self.label(urn),
+                "explicit_edges": len(deps),
+                "saving_s": self.saving(urn, deps),
+            }
+            for urn, deps in self.explicit.items()
+        ]
+        return sorted(savings, key=lambda s: (-s["saving_s"], s["resource"]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--azs", type=int, default=2)
+    parser.add_argument(
+        "--durations", type=Path, help="json of {resource type: seconds} overrides"
+    )
+    parser.add_argument("--all", action="store_true", help="list zero-saving edges too")
+    args = parser.parse_args()
+
+    durations = dict(DURATIONS_S)
+    if args.durations:
+        durations.update(json.loads(args.durations.read_text()))
+
+    monitor = run_program(lambda: blueprint(args.azs))
+    graph = ResourceGraph(monitor.registrations, durations)
+    finish = graph.finish_times()
+
+    print(f"critical path {max(finish.values())}s")
+    for urn in graph.critical_path(finish):
+        print(f"{finish[urn]:>8}s  +{graph.durations[urn]:<5} {graph.label(urn)}")
+
+    print(f"\n{'saving s':>9}{'edges':>7}  resource (all depends_on dropped)")
+    for resource in graph.resource_savings():
+        print(
+            f"{resource['saving_s']:>9}{resource['explicit_edges']:>7}"
+            f"  {resource['resource']}"
+        )
+
+    edges = graph.edge_savings()
+    print(f"\nexplicit depends_on edges: {len(edges)}")
+    print(f"{'saving s':>9}  resource -> depends_on")
+    for edge in edges:
+        if edge["saving_s"] or args.all:
+            print(f"{edge['saving_s']:>9}  {edge['resource']} -> {edge['depends_on']}")
+
+
+if __name__ == "__main__":
+    main()
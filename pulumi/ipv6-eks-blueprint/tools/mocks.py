@@ -0,0 +1,207 @@
+"""
+Pulumi mocks for evaluating Vpc / Cluster offline - no AWS account needed
+- fake ids plus the computed outputs the components read back
+- RecordingMonitor keeps every registration (urn, parent, dependencies)
+  for the other tools in here
+"""
+
+import time
+from typing import Callable, NamedTuple
+
+import pulumi
+from google.protobuf import json_format
+from pulumi.runtime.mocks import MockMonitor
+
+PROJECT = "ipv6-eks-blueprint"
+STACK = "mocks"
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+CLUSTER_NAME = "eks-ipv6-bp-us-east-1"
+VPC_CIDR = "10.0.0.0/16"
+VPC_IPV6_CIDR = "2600:1f18:1234:ab00::/56"
+
+# Fake zone ids past use1-az6 so benchmarks can go wider than us-east-1
+AZ_ZONE_IDS = [f"use1-az{n}" for n in range(1, 13)]
+AZ_NAMES = {
+    zone_id: f"{REGION}{chr(ord('a') + n)}" for n, zone_id in enumerate(AZ_ZONE_IDS)
+}
+
+
+class AwsMocks(pulumi.runtime.Mocks):
+    """fills in the computed outputs used across vpc.py / eks.py"""
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        state = dict(args.inputs)
+        service = args.typ.split(":")[1].split("/")[0]
+        state.setdefault(
+            "arn", f"arn:aws:{service}:{REGION}:{ACCOUNT_ID}:{args.name}"
+        )
+        state.setdefault("name", state.get("namePrefix", "") + args.name)
+        if args.typ == "aws:ec2/vpc:Vpc":
+            state.update(
+                ipv6CidrBlock=VPC_IPV6_CIDR,
+                defaultNetworkAclId=f"{args.name}-acl",
+                defaultRouteTableId=f"{args.name}-rtb",
+                defaultSecurityGroupId=f"{args.name}-sg",
+            )
+        elif args.typ == "aws:ec2/launchTemplate:LaunchTemplate":
+            state.update(defaultVersion=1, latestVersion=1)
+        elif args.typ == "aws:eks/cluster:Cluster":
+            state.setdefault("version", "1.32")
+            state.update(
+                endpoint=f"https://{args.name}.gr7.{REGION}.eks.amazonaws.com",
+                certificateAuthority={"data": "bW9jaw=="},
+                identities=[
+                    {"oidcs": [{"issuer": f"https://oidc.eks.{REGION}.amazonaws.com/id/MOCK"}]}
+                ],
+            )
+        return f"{args.name}-id", state
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            wanted = AZ_ZONE_IDS
+            for f in args.args.get("filters") or []:
+                if f["name"] == "zone-id":
+                    wanted = [z for z in AZ_ZONE_IDS if z in f["values"]]
+            return {
+                "id": REGION,
+                "names": [AZ_NAMES[z] for z in wanted],
+                "zoneIds": wanted,
+            }
+        if args.token == "aws:index/getCallerIdentity:getCallerIdentity":
+            return {
+                "id": ACCOUNT_ID,
+                "accountId": ACCOUNT_ID,
+                "arn": f"arn:aws:sts::{ACCOUNT_ID}:assumed-role/mock/session",
+                "userId": "MOCK:session",
+            }
+        if args.token == "aws:eks/getAddonVersion:getAddonVersion":
+            return {
+                "id": args.args["addonName"],
+                "addonName": args.args["addonName"],
+                "kubernetesVersion": args.args["kubernetesVersion"],
+                "version": f"v1.0.0-eksbuild.{args.args['kubernetesVersion']}",
+            }
+        if args.token == "aws:index/getRegion:getRegion":
+            return {"id": REGION, "name": REGION, "description": "mock"}
+        return {}
+
+
+class Registration(NamedTuple):
+    urn: str
+    type: str
+    name: str
+    parent: str
+    custom: bool
+    dependencies: tuple
+    property_dependencies: dict
+    registered_at: float
+
+
+class RecordingMonitor(MockMonitor):
+    """MockMonitor that keeps every RegisterResource request"""
+
+    def __init__(self, mocks: pulumi.runtime.Mocks):
+        super().__init__(mocks)
+        self.registrations: list[Registration] = []
+        # urn -> serialized size of the component's register_outputs
+        self.output_sizes: dict[str, int] = {}
+        # urn -> serialized size of a custom resource's mocked state
+        self.state_sizes: dict[str, int] = {}
+        # urn -> (id, mocked state as plain json) for custom resources
+        self.states: dict[str, tuple[str, dict]] = {}
+
+    def RegisterResource(self, request):
+        response = super().RegisterResource(request)
+        if request.custom:
+            self.state_sizes[response.urn] = response.object.ByteSize()
+            self.states[response.urn] = (
+                response.id,
+                json_format.MessageToDict(response.object),
+            )
+        if request.type != "pulumi:pulumi:Stack":
+            self.registrations.append(
+                Registration(
+                    urn=response.urn,
+                    type=request.type,
+                    name=request.name,
+                    parent=request.parent,
+                    custom=bool(request.custom),
+                    dependencies=tuple(request.dependencies),
+                    property_dependencies={
+                        key: tuple(deps.urns)
+                        for key, deps in request.propertyDependencies.items()
+                    },
+                    registered_at=time.perf_counter(),
+                )
+            )
+        return response
+
+    def RegisterResourceOutputs(self, request):
+        self.output_sizes[request.urn] = request.outputs.ByteSize()
+        return super().RegisterResourceOutputs(request)
+
+
+class OutputCounter:
+    """counts Output objects created while active"""
+
+    def __init__(self):
+        self.created = 0
+        self._init = None
+
+    def __enter__(self):
+        self._init = pulumi.Output.__init__
+        counter = self
+
+        def counting_init(output, *args, **kwargs):
+            counter.created += 1
+            counter._init(output, *args, **kwargs)
+
+        pulumi.Output.__init__ = counting_init
+        return self
+
+    def __exit__(self, *exc):
+        pulumi.Output.__init__ = self._init
+
+
+def run_program(
+    program: Callable[[], object],
+    mocks: pulumi.runtime.Mocks | None = None,
+    preview: bool = False,
+) -> RecordingMonitor:
+    """evaluate program under mocks and wait for every registration to settle"""
+    monitor = RecordingMonitor(mocks or AwsMocks())
+    pulumi.runtime.set_mocks(
+        monitor.mocks, project=PROJECT, stack=STACK, preview=preview, monitor=monitor
+    )
+    # return value is dropped - the test wrapper waits on outstanding RPCs anyway
+    pulumi.runtime.test(lambda: program() and None)()
+    return monitor
+
+
+def blueprint(az_count: int = 2, cluster_args: dict | None = None, **vpc_args):
+    """same Vpc / Cluster wiring as __main__.py without stack config"""
+    # deferred so importing tools.mocks doesn't pull in pulumi_aws
+    from eks import Cluster
+    from vpc import Vpc
+
+    vpc = Vpc(
+        name=CLUSTER_NAME,
+        az_zone_ids=AZ_ZONE_IDS[:az_count],
+        cluster_name=CLUSTER_NAME,
+        vpc_cidr_block=VPC_CIDR,
+        **vpc_args,
+    )
+    cluster = Cluster(
+        name=CLUSTER_NAME,
+        cluster_version="1.32",
+        admin_role_name="AWSReservedSSO_AdministratorAccess_mock",
+        private_subnet_ids=[subnet.id for subnet in vpc.private_subnets],
+        private_subnet_zone_ids=AZ_ZONE_IDS[:az_count],
+        vpc_id=vpc.vpc.id,
+        **{
+            "ipv6_only_subnets": vpc_args.get("private_subnet_mode") == "ipv6_only",
+            **(cluster_args or {}),
+        },
+    )
+    return vpc, cluster
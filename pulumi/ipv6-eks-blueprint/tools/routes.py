@@ -0,0 +1,327 @@
+"""
+Offline route table reachability for Vpc from a mocks run
+- subnets, route tables, Routes, RouteTableAssociations, the default route
+  table and default NACL come from the mocked resource state
+- "from subnet X to D": longest-prefix match in the subnet's route table
+  (associated or the VPC main one) plus the VPC's implicit local routes,
+  then the NACL egress rule that applies
+- NAT gateway targets carry the AZ of their public subnet so cross-AZ NAT
+  shows up without deploying anything
+- gateway endpoint (prefix list) routes aren't modelled, their CIDRs only
+  exist in AWS
+
+    python -m tools.routes                       # check every layout, 2 / 3 / 6 AZs
+    (tests/test_routes.py runs the same checks under pytest)
+    python -m tools.routes --lookup eks-ipv6-bp-us-east-1-private-use1-az2 64:ff9b::8.8.8.8
+"""
+
+import argparse
+import ipaddress
+import sys
+import time
+from typing import NamedTuple
+
+from tools.bench import ipv4_newbits_for
+from tools.mocks import AZ_ZONE_IDS, blueprint, run_program
+from vpc import NAT_MODES, PRIVATE_SUBNET_MODES
+
+# route argument -> target kind, first one set on a Route wins
+TARGET_KEYS = (
+    ("natGatewayId", "nat"),
+    ("egressOnlyGatewayId", "egress_only_igw"),
+    ("gatewayId", "igw"),
+    ("transitGatewayId", "tgw"),
+    ("vpcPeeringConnectionId", "peering"),
+    ("networkInterfaceId", "eni"),
+    ("vpcEndpointId", "vpce"),
+)
+LOCAL = "local"
+
+
+class Hop(NamedTuple):
+    subnet: str
+    destination: str
+    route_table: str
+    # matched route CIDR, None when nothing matched (blackholed)
+    route: str | None
+    target_type: str | None
+    target_id: str | None
+    # AZ of the target for AZ-scoped targets (NAT gateways, ENIs)
+    target_zone_id: str | None
+    nacl_action: str
+
+    @property
+    def reachable(self) -> bool:
+        return self.route is not None and self.nacl_action == "allow"
+
+
+class _RouteTable:
+    """per family {prefix length: {network int: (cidr, target type, target id)}}"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.by_length: dict[int, dict[int, dict[int, tuple]]] = {4: {}, 6: {}}
+        # longest first, rebuilt on add
+        self.lengths: dict[int, list[int]] = {4: [], 6: []}
+
+    def add(self, cidr: str, target_type: str, target_id: str | None) -> None:
+        network = ipaddress.ip_network(cidr)
+        table = self.by_length[network.version]
+        table.setdefault(network.prefixlen, {})[int(network.network_address)] = (
+            str(network),
+            target_type,
+            target_id,
+        )
+        self.lengths[network.version] = sorted(table, reverse=True)
+
+    def match(self, address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> tuple | None:
+        bits = address.max_prefixlen
+        value = int(address)
+        table = self.by_length[address.version]
+        for length in self.lengths[address.version]:
+            mask = ((1 << length) - 1) << (bits - length) if length else 0
+            route = table[length].get(value & mask)
+            if route is not None:
+                return route
+        return None
+
+
+class RouteEvaluator:
+    """answers subnet -> destination lookups over one mocks run"""
+
+    def __init__(self, states: dict[str, tuple[str, dict]]):
+        by_type: dict[str, list[tuple[str, dict]]] = {}
+        for urn, (resource_id, state) in states.items():
+            type_ = urn.split("::")[2].rsplit("$", 1)[-1]
+            by_type.setdefault(type_, []).append((resource_id, state))
+
+        def of(type_: str) -> list[tuple[str, dict]]:
+            return by_type.get(type_, [])
+
+        # local routes for every VPC block
+        local = []
+        main_route_table = {}
+        for vpc_id, vpc in of("aws:ec2/vpc:Vpc"):
+            local.append((vpc_id, [vpc["cidrBlock"], vpc.get("ipv6CidrBlock")]))
+            main_route_table[vpc_id] = vpc.get("defaultRouteTableId")
+
+        self.subnets = {}
+        self.subnet_ids_by_name = {}
+        for subnet_id, subnet in of("aws:ec2/subnet:Subnet"):
+            self.subnets[subnet_id] = subnet
+            self.subnet_ids_by_name[subnet["name"]] = subnet_id
+
+        nat_zone_ids = {
+            nat_id: self.subnets.get(nat["subnetId"], {}).get("availabilityZoneId")
+            for nat_id, nat in of("aws:ec2/natGateway:NatGateway")
+        }
+        eni_zone_ids = {
+            eni_id: self.subnets.get(eni.get("subnetId"), {}).get("availabilityZoneId")
+            for eni_id, eni in of("aws:ec2/networkInterface:NetworkInterface")
+        }
+        self.target_zone_ids = {**nat_zone_ids, **eni_zone_ids}
+
+        # route tables by id, DefaultRouteTable is keyed by the VPC's main table id
+        self.route_tables: dict[str, _RouteTable] = {}
+        vpc_of_table = {}
+        for table_id, table in of("aws:ec2/routeTable:RouteTable"):
+            self.route_tables[table_id] = _RouteTable(table["name"])
+            vpc_of_table[table_id] = table.get("vpcId")
+            for route in table.get("routes") or []:
+                self._add_route(table_id, route)
+        for _, table in of("aws:ec2/defaultRouteTable:DefaultRouteTable"):
+            table_id = table["defaultRouteTableId"]
+            self.route_tables[table_id] = _RouteTable(table["name"])
+            vpc_of_table[table_id] = next(
+                (vpc for vpc, main in main_route_table.items() if main == table_id), None
+            )
+            for route in table.get("routes") or []:
+                self._add_route(table_id, route)
+        for _, route in of("aws:ec2/route:Route"):
+            self._add_route(route["routeTableId"], route)
+        for table_id, route_table in self.route_tables.items():
+            for vpc_id, cidrs in local:
+                if vpc_of_table.get(table_id) == vpc_id:
+                    for cidr in filter(None, cidrs):
+                        route_table.add(cidr, LOCAL, None)
+
+        # explicit associations, everything else uses its VPC's main table
+        self.associations = {
+            subnet_id: main_route_table.get(subnet.get("vpcId"))
+            for subnet_id, subnet in self.subnets.items()
+        }
+        for _, association in of("aws:ec2/routeTableAssociation:RouteTableAssociation"):
+            if association.get("subnetId"):
+                self.associations[association["subnetId"]] = association["routeTableId"]
+
+        # subnet -> egress rules sorted by rule number
+        self.nacl_egress: dict[str, list[tuple[int, object, str]]] = {}
+        for nacl_type in (
+            "aws:ec2/defaultNetworkAcl:DefaultNetworkAcl",
+            "aws:ec2/networkAcl:NetworkAcl",
+        ):
+            for _, nacl in of(nacl_type):
+                rules = sorted(
+                    (
+                        (
+                            int(rule["ruleNo"]),
+                            ipaddress.ip_network(rule.get("cidrBlock") or rule["ipv6CidrBlock"]),
+                            rule["action"],
+                        )
+                        for rule in nacl.get("egress") or []
+                    ),
+                    key=lambda rule: rule[0],
+                )
+                for subnet_id in nacl.get("subnetIds") or []:
+                    self.nacl_egress[subnet_id] = rules
+
+    def _add_route(self, table_id: str, route: dict) -> None:
+        cidr = route.get("destinationCidrBlock") or route.get("destinationIpv6CidrBlock")
+        if not cidr or table_id not in self.route_tables:
+            # prefix list routes (gateway endpoints) have no CIDR offline
+            return
+        target_type, target_id = next(
+            ((kind, route[key]) for key, kind in TARGET_KEYS if route.get(key)),
+            ("blackhole", None),
+        )
+        self.route_tables[table_id].add(cidr, target_type, target_id)
+
+    def subnet_id(self, subnet: str) -> str:
+        """id from a subnet id or resource name"""
+        if subnet in self.subnets:
+            return subnet
+        if subnet in self.subnet_ids_by_name:
+            return self.subnet_ids_by_name[subnet]
+        raise ValueError(f"unknown subnet: {subnet}")
+
+    def lookup(self, subnet: str, destination: str) -> Hop:
+        subnet_id = self.subnet_id(subnet)
+        address = ipaddress.ip_address(destination.split("/")[0])
+        table_id = self.associations.get(subnet_id)
+        route_table = self.route_tables.get(table_id)
+        route = route_table.match(address) if route_table else None
+        cidr, target_type, target_id = route or (None, None, None)
+        return Hop(
+            subnet=self.subnets[subnet_id]["name"],
+            destination=destination,
+            route_table=route_table.name if route_table else str(table_id),
+            route=cidr,
+            target_type=target_type,
+            target_id=target_id,
+            target_zone_id=self.target_zone_ids.get(target_id),
+            nacl_action=self._nacl_action(subnet_id, address),
+        )
+
+    def _nacl_action(self, subnet_id: str, address) -> str:
+        # no NACL association in the graph means the AWS default, allow all
+        rules = self.nacl_egress.get(subnet_id)
+        if rules is None:
+            return "allow"
+        for _, network, action in rules:
+            if network.version == address.version and address in network:
+                return action
+        # the implicit `*` rule
+        return "deny"
+
+
+def evaluator(
+    az_count: int, nat_mode: str = "single", private_subnet_mode: str = "dual_stack"
+) -> RouteEvaluator:
+    monitor = run_program(
+        lambda: blueprint(
+            az_count,
+            ipv4_newbits=ipv4_newbits_for(az_count),
+            nat_mode=nat_mode,
+            private_subnet_mode=private_subnet_mode,
+        )
+    )
+    return RouteEvaluator(monitor.states)
+
+
+def check_layout(
+    az_count: int, nat_mode: str, private_subnet_mode: str = "dual_stack"
+) -> list[str]:
+    """failed expectations for one Vpc layout, empty when routing is right"""
+    routes = evaluator(az_count, nat_mode, private_subnet_mode)
+    failures = []
+
+    def expect(subnet: str, destination: str, target_type: str, zone_id: str | None = None):
+        hop = routes.lookup(subnet, destination)
+        if hop.target_type != target_type or not hop.reachable:
+            failures.append(f"{subnet} -> {destination}: {hop}")
+        elif zone_id is not None and hop.target_zone_id != zone_id:
+            failures.append(f"{subnet} -> {destination}: via {hop.target_zone_id}, want {zone_id}")
+
+    for subnet in routes.subnets.values():
+        name = subnet["name"]
+        zone_id = subnet["availabilityZoneId"]
+        # local beats every default route
+        if subnet.get("cidrBlock"):
+            expect(name, subnet["cidrBlock"].split("/")[0], LOCAL)
+        expect(name, subnet["ipv6CidrBlock"].split("/")[0], LOCAL)
+        if "-public-" in name:
+            expect(name, "1.1.1.1", "igw")
+            expect(name, "2606:4700:4700::1111", "igw")
+        else:
+            nat_zone_id = zone_id if nat_mode == "per_az" else AZ_ZONE_IDS[0]
+            if private_subnet_mode == "ipv6_only":
+                # IPv4 only goes out through NAT64, no IPv4 default route
+                hop = routes.lookup(name, "1.1.1.1")
+                if hop.route is not None:
+                    failures.append(f"{name} -> 1.1.1.1: want no route, got {hop}")
+            else:
+                expect(name, "1.1.1.1", "nat", nat_zone_id)
+            expect(name, "64:ff9b::808:808", "nat", nat_zone_id)
+            expect(name, "2606:4700:4700::1111", "egress_only_igw")
+    return failures
+
+
+def queries_per_second(az_count: int = 3, seconds: float = 0.5) -> float:
+    routes = evaluator(az_count)
+    subnets = list(routes.subnets)
+    destinations = ["1.1.1.1", "64:ff9b::808:808", "2606:4700:4700::1111", "10.0.1.1"]
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for subnet in subnets:
+            for destination in destinations:
+                routes.lookup(subnet, destination)
+                done += 1
+    return done / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--azs", type=int, nargs="+", default=[2, 3, 6])
+    parser.add_argument("--nat-mode", choices=NAT_MODES)
+    parser.add_argument("--private-subnet-mode", choices=PRIVATE_SUBNET_MODES)
+    parser.add_argument("--lookup", nargs=2, metavar=("SUBNET", "DESTINATION"))
+    args = parser.parse_args()
+
+    if args.lookup:
+        routes = evaluator(
+            args.azs[0], args.nat_mode or "single", args.private_subnet_mode or "dual_stack"
+        )
+        print(routes.lookup(*args.lookup))
+        return
+
+    failed = False
+    for az_count in args.azs:
+        for nat_mode in [args.nat_mode] if args.nat_mode else NAT_MODES:
+            for private_subnet_mode in (
+                [args.private_subnet_mode] if args.private_subnet_mode else PRIVATE_SUBNET_MODES
+            ):
+                failures = check_layout(az_count, nat_mode, private_subnet_mode)
+                print(
+                    f"{'ok' if not failures else 'FAILED':<7}{az_count} AZs nat_mode={nat_mode}"
+                    f" private_subnet_mode={private_subnet_mode}"
+                )
+                for failure in failures:
+                    print(f"  {failure}")
+                failed = failed or bool(failures)
+    print(f"{queries_per_second():,.0f} lookups/s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Time to first resource registration under mocks with slow invokes
+- blocking: sync get_caller_identity / get_availability_zones before any
+  resource is declared - how __main__.py used to start
+- output: `_output` invokes passed straight into Vpc / Cluster - how
+  __main__.py starts now
+
+    python -m tools.startup --latency 0.5
+"""
+
+import argparse
+import time
+
+from tools.mocks import AZ_ZONE_IDS, CLUSTER_NAME, VPC_CIDR, AwsMocks, run_program
+
+AZ_FILTERS = [
+    {"name": "opt-in-status", "values": ["opt-in-not-required"]},
+    {"name": "zone-id", "values": AZ_ZONE_IDS[:2]},
+]
+
+
+class SlowInvokeMocks(AwsMocks):
+    """every invoke takes `latency` seconds like a real AWS round trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def call(self, args):
+        time.sleep(self.latency)
+        return super().call(args)
+
+
+def _components(az_zone_ids, account_id, available_zone_ids=None):
+    from eks import Cluster
+    from vpc import Vpc
+
+    vpc = Vpc(
+        name=CLUSTER_NAME,
+        az_zone_ids=az_zone_ids,
+        available_zone_ids=available_zone_ids,
+        cluster_name=CLUSTER_NAME,
+        vpc_cidr_block=VPC_CIDR,
+    )
+    Cluster(
+        name=CLUSTER_NAME,
+        account_id=account_id,
+        cluster_version="1.32",
+        admin_role_name="AWSReservedSSO_AdministratorAccess_mock",
+        private_subnet_ids=[subnet.id for subnet in vpc.private_subnets],
+        private_subnet_zone_ids=az_zone_ids,
+        vpc_id=vpc.vpc.id,
+    )
+
+
+def blocking_program():
+    import pulumi_aws as aws
+
+    identity = aws.get_caller_identity()
+    azs = aws.get_availability_zones(filters=AZ_FILTERS)
+    _components(azs.zone_ids, identity.account_id)
+
+
+def output_program():
+    import pulumi_aws as aws
+
+    identity = aws.get_caller_identity_output()
+    azs = aws.get_availability_zones_output(filters=AZ_FILTERS)
+    _components(AZ_ZONE_IDS[:2], identity.account_id, azs.zone_ids)
+
+
+def measure(program, latency: float) -> dict:
+    start = time.perf_counter()
+    monitor = run_program(program, mocks=SlowInvokeMocks(latency))
+    end = time.perf_counter()
+    custom = [r.registered_at for r in monitor.registrations if r.custom]
+    return {
+        "first_registration_s": round(min(custom) - start, 3),
+        "total_s": round(end - start, 3),
+        "resources": len(monitor.registrations),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per invoke")
+    args = parser.parse_args()
+
+    # import cost is the same for both modes so keep it out of the numbers
+    import eks  # noqa: F401
+    import vpc  # noqa: F401
+
+    print(f"{'mode':<10}{'first registration s':>22}{'total s':>10}{'resources':>11}")
+    for mode, program in (("blocking", blocking_program), ("output", output_program)):
+        result = measure(program, args.latency)
+        print(
+            f"{mode:<10}{result['first_registration_s']:>22}"
+            f"{result['total_s']:>10}{result['resources']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
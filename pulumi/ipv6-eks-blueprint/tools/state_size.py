@@ -0,0 +1,86 @@
+"""
+Serialized state size of Vpc + Cluster under pulumi mocks
+- component outputs are what register_outputs puts in the checkpoint on
+  top of every child resource's own state, rewritten on every checkpoint save
+- resource state is the mocked inputs + computed outputs per custom resource,
+  a floor for the real thing since providers return more fields
+- bytes are protobuf Struct sizes, the checkpoint JSON is bigger but
+  scales the same way
+
+    python -m tools.state_size                                  # .bench/state_size.json
+    python -m tools.state_size --output .bench/state_main.json  # save a baseline
+    python -m tools.state_size --baseline .bench/state_main.json
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from tools.bench import ipv4_newbits_for
+from tools.mocks import blueprint, run_program
+
+AZ_COUNTS = (2, 3, 6)
+METRICS = ("vpc_outputs_b", "cluster_outputs_b", "component_outputs_b", "resource_state_b")
+DEFAULT_OUTPUT = Path(".bench") / "state_size.json"
+
+
+def measure(az_count: int) -> dict:
+    monitor = run_program(
+        lambda: blueprint(az_count, ipv4_newbits=ipv4_newbits_for(az_count))
+    )
+    types = {r.urn: r.type for r in monitor.registrations}
+
+    def outputs_of(type_: str) -> int:
+        return sum(
+            size for urn, size in monitor.output_sizes.items() if types.get(urn) == type_
+        )
+
+    return {
+        "az_count": az_count,
+        "resources": len(monitor.state_sizes),
+        "vpc_outputs_b": outputs_of("eph:eks:Vpc"),
+        "cluster_outputs_b": outputs_of("eph:eks:Cluster"),
+        "component_outputs_b": sum(
+            size for urn, size in monitor.output_sizes.items() if urn in types
+        ),
+        "resource_state_b": sum(monitor.state_sizes.values()),
+    }
+
+
+def print_results(results: list[dict], baseline: list[dict] | None) -> None:
+    previous = {run["az_count"]: run for run in baseline or []}
+    print(f"{'azs':>4}{'resources':>11}" + "".join(f"{metric:>26}" for metric in METRICS))
+    for run in results:
+        row = f"{run['az_count']:>4}{run['resources']:>11}"
+        for metric in METRICS:
+            cell = f"{run[metric]}"
+            before = previous.get(run["az_count"], {}).get(metric)
+            if before:
+                cell += f" ({(run[metric] - before) / before:+.0%})"
+            row += f"{cell:>26}"
+        print(row)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--azs", type=int, nargs="+", default=list(AZ_COUNTS))
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, help="earlier --output to diff")
+    args = parser.parse_args()
+
+    results = [measure(az_count) for az_count in args.azs]
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else None
+    print_results(results, baseline)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results},
+            indent=2,
+        )
+    )
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
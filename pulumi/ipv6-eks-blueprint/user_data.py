@@ -0,0 +1,228 @@
+"""
+Node user data for managed node group launch templates
+- Bottlerocket reads TOML settings, not a bootstrap script
+- EKS merges in cluster-name / api-server / cluster-certificate for
+  BOTTLEROCKET_* ami types so only node tuning goes in here
+- /dev/xvdb is Bottlerocket's data volume (container images, pod storage),
+  restoring it from a snapshot with the images already pulled skips the
+  cold pulls on node boot
+- AL2023 takes a nodeadm NodeConfig in a MIME part, EKS appends its own
+  cluster details part after it
+
+Run `python user_data.py` to print the default settings
+"""
+
+import base64
+import json
+import re
+from dataclasses import dataclass, field, replace
+
+# root volume on every AMI family, data volume is Bottlerocket only
+OS_DEVICE_NAME = "/dev/xvda"
+DATA_DEVICE_NAME = "/dev/xvdb"
+
+_BARE_KEY = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _toml_key(key: str) -> str:
+    # node labels / sysctls have dots and slashes, those need quoting
+    return key if _BARE_KEY.match(key) else json.dumps(key)
+
+
+def _toml_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        # json string escapes are valid TOML basic strings
+        return json.dumps(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_toml_value(v) for v in value) + "]"
+    raise ValueError(f"can't write {type(value).__name__} as TOML: {value!r}")
+
+
+def to_toml(settings: dict, table: str = "") -> str:
+    """
+    nested dicts -> TOML tables, plain values first so they land in their table
+    - only what Bottlerocket settings need: str / int / float / bool / lists
+    """
+    lines = []
+    tables = []
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            tables.append((key, value))
+        elif value is not None:
+            lines.append(f"{_toml_key(key)} = {_toml_value(value)}")
+    out = ""
+    if lines:
+        out += (f"[{table}]\n" if table else "") + "\n".join(lines) + "\n"
+    for key, value in tables:
+        child = f"{table}.{_toml_key(key)}" if table else _toml_key(key)
+        rendered = to_toml(value, child)
+        if rendered:
+            out += ("\n" if out else "") + rendered
+    return out
+
+
+@dataclass(frozen=True)
+class BottlerocketSettings:
+    """
+    Typed subset of Bottlerocket `settings.*`
+    - None leaves the Bottlerocket / EKS default in place
+    - registry_qps / registry_burst: raise so a fresh node pulls every
+      daemonset image at once instead of being throttled by kubelet
+    - control_container is the SSM agent host container, admin is the shell
+    """
+
+    max_pods: int | None = None
+    kube_api_qps: int | None = None
+    kube_api_burst: int | None = None
+    registry_qps: int | None = 20
+    registry_burst: int | None = 40
+    image_gc_high_threshold_percent: int | None = None
+    image_gc_low_threshold_percent: int | None = None
+    node_labels: dict = field(default_factory=dict)
+    # key -> "value:Effect", e.g. {"dedicated": "gpu:NoSchedule"}
+    node_taints: dict = field(default_factory=dict)
+    sysctl: dict = field(default_factory=dict)
+    control_container: bool = True
+    admin_container: bool = False
+    # kubelet tuning, usually filled from a performance.PerformanceProfile
+    kube_reserved: dict = field(default_factory=dict)
+    cpu_manager_policy: str | None = None
+    topology_manager_policy: str | None = None
+
+    def __post_init__(self):
+        for name in ("max_pods", "kube_api_qps", "kube_api_burst", "registry_qps", "registry_burst"):
+            value = getattr(self, name)
+            if value is not None and value < 0:
+                raise ValueError(f"{name} can't be negative, got: {value}")
+        high = self.image_gc_high_threshold_percent
+        low = self.image_gc_low_threshold_percent
+        if high is not None and low is not None and not 0 <= low < high <= 100:
+            raise ValueError(
+                f"need 0 <= image_gc_low < image_gc_high <= 100, got {low} / {high}"
+            )
+        for key, taint in self.node_taints.items():
+            if ":" not in taint:
+                raise ValueError(f"node taint {key} must be `value:Effect`, got: {taint}")
+
+    def settings(self) -> dict:
+        return {
+            "settings": {
+                "kubernetes": {
+                    "max-pods": self.max_pods,
+                    "kube-api-qps": self.kube_api_qps,
+                    "kube-api-burst": self.kube_api_burst,
+                    "registry-qps": self.registry_qps,
+                    "registry-burst": self.registry_burst,
+                    "image-gc-high-threshold-percent": self.image_gc_high_threshold_percent,
+                    "image-gc-low-threshold-percent": self.image_gc_low_threshold_percent,
+                    "node-labels": dict(self.node_labels) or None,
+                    "node-taints": {k: [v] for k, v in self.node_taints.items()} or None,
+                    "kube-reserved": dict(self.kube_reserved) or None,
+                    "cpu-manager-policy": self.cpu_manager_policy,
+                    "topology-manager-policy": self.topology_manager_policy,
+                },
+                "kernel": {"sysctl": {k: str(v) for k, v in self.sysctl.items()} or None},
+                "host-containers": {
+                    "control": {"enabled": self.control_container},
+                    "admin": {"enabled": self.admin_container},
+                },
+            }
+        }
+
+    def with_kubelet_config(self, kubelet_config: dict) -> "BottlerocketSettings":
+        """KubeletConfiguration fields for whatever isn't set here already"""
+        return replace(
+            self,
+            max_pods=self.max_pods if self.max_pods is not None else kubelet_config.get("maxPods"),
+            kube_reserved=self.kube_reserved or kubelet_config.get("kubeReserved", {}),
+            cpu_manager_policy=self.cpu_manager_policy or kubelet_config.get("cpuManagerPolicy"),
+            topology_manager_policy=(
+                self.topology_manager_policy or kubelet_config.get("topologyManagerPolicy")
+            ),
+        )
+
+    def toml(self) -> str:
+        return to_toml(_prune(self.settings()))
+
+    def user_data(self) -> str:
+        """base64 TOML for aws.ec2.LaunchTemplate user_data"""
+        return base64.b64encode(self.toml().encode()).decode()
+
+
+def _prune(settings: dict) -> dict:
+    """drop None values and the tables left empty by them"""
+    pruned = {}
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            value = _prune(value)
+            if value:
+                pruned[key] = value
+        elif value is not None:
+            pruned[key] = value
+    return pruned
+
+
+def nodeadm_user_data(kubelet_config: dict) -> str:
+    """base64 MIME multipart with an AL2023 nodeadm NodeConfig for the kubelet"""
+    node_config = {
+        "apiVersion": "node.eks.aws/v1alpha1",
+        "kind": "NodeConfig",
+        "spec": {"kubelet": {"config": kubelet_config}},
+    }
+    boundary = "//"
+    mime = "\n".join(
+        [
+            "MIME-Version: 1.0",
+            f'Content-Type: multipart/mixed; boundary="{boundary}"',
+            "",
+            f"--{boundary}",
+            "Content-Type: application/node.eks.aws",
+            "",
+            # NodeConfig is YAML, JSON is valid YAML
+            json.dumps(node_config, indent=2),
+            "",
+            f"--{boundary}--",
+            "",
+        ]
+    )
+    return base64.b64encode(mime.encode()).decode()
+
+
+def root_volume_mapping(size_gib: int, iops: int = 3000, throughput: int = 125) -> dict:
+    """launch template block device for the AL2 / AL2023 root volume"""
+    return {
+        "device_name": OS_DEVICE_NAME,
+        "ebs": {
+            "delete_on_termination": "true",
+            "encrypted": "true",
+            "iops": iops,
+            "throughput": throughput,
+            "volume_size": size_gib,
+            "volume_type": "gp3",
+        },
+    }
+
+
+def data_volume_mapping(
+    snapshot_id: str | None, size_gib: int, iops: int = 3000, throughput: int = 125
+) -> dict:
+    """launch template block device for Bottlerocket's data volume"""
+    ebs = {
+        "delete_on_termination": "true",
+        "encrypted": "true",
+        "iops": iops,
+        "throughput": throughput,
+        "volume_size": size_gib,
+        "volume_type": "gp3",
+    }
+    if snapshot_id:
+        ebs["snapshot_id"] = snapshot_id
+    return {"device_name": DATA_DEVICE_NAME, "ebs": ebs}
+
+
+if __name__ == "__main__":
+    print(BottlerocketSettings(node_labels={"node.kubernetes.io/lifecycle": "normal"}).toml())
@@ -3,10 +3,10 @@ Copied over from `cloud-eks-ipv6-auto` which is unfinished
 - copy this file back over there once working with a basic eks cluster
 """
 
-import ipaddress
-
 import pulumi
 import pulumi_aws as aws
+from cidr import cidr_subnet_bulk
+from subnet_sizing import plan_ipv4
 
 """
 HELPERS
@@ -16,21 +16,73 @@ HELPERS
 NAT64_DNS64_RESERVED_PREFIX = "64:ff9b::/96"
 
 
-# cidr_subnet function like terraform-aws-module
-def cidr_subnet(prefix, newbits, netnum) -> str:
-    """similar to terraform local with cidr_subnet()"""
-    network = ipaddress.ip_network(prefix)
-    new_prefix_len = network.prefixlen + newbits
-    new_subnet_size = 2 ** (32 - new_prefix_len)
-    start_ip = network.network_address + (netnum * new_subnet_size)
-    return f"{start_ip}/{new_prefix_len}"
-
-
-# Get IPv6 based on index like terraform-aws-module
-def get_ipv6_subnet(base: str, index: int, newbits: int = 8) -> str:
-    network = ipaddress.IPv6Network(base)
-    new_prefix_len = network.prefixlen + newbits
-    return str(list(network.subnets(new_prefix=new_prefix_len))[index])
+def require_zone_id(zone_id: str, available: list) -> str:
+    if zone_id not in available:
+        raise ValueError(
+            f"zone id {zone_id} is not available, found: {', '.join(available)}"
+        )
+    return zone_id
+
+
+# single: one shared NAT gateway, per_az: NAT gateway + private route table per AZ
+NAT_MODES = ("single", "per_az")
+
+# dual_stack: private subnets get an IPv4 block too
+# ipv6_only: ipv6_native private subnets, IPv4 only reachable through NAT64
+PRIVATE_SUBNET_MODES = ("dual_stack", "ipv6_only")
+
+
+# AWS APIs nodes / pods hit most: image pulls, IRSA, EC2 / CloudWatch calls
+# - "s3" is a gateway endpoint on the private route tables, the rest are
+#   dual-stack interface endpoints in the private subnets
+DEFAULT_ENDPOINTS = ("s3", "ecr.api", "ecr.dkr", "sts", "ec2", "logs", "monitoring")
+
+
+# Subnet tiers in allocation order
+# - append new tiers at the end so existing public / private CIDRs don't move
+SUBNET_TIERS = ("public", "private")
+
+
+def build_address_plan(
+    vpc_cidr_block: str,
+    ipv6_cidr_block: str | None,
+    az_zone_ids: list,
+    tiers: tuple = SUBNET_TIERS,
+    ipv4_newbits: int = 3,
+    ipv6_newbits: int = 8,
+    ipv6_only_tiers: tuple = (),
+    ipv4_blocks: dict | None = None,
+) -> dict:
+    """
+    Subnet CIDRs per tier / AZ: {tier: {zone_id: {cidr_block, ipv6_cidr_block}}}
+    - each VPC block is parsed once for the whole plan
+    - netnum is tier index * AZ count + AZ index for both families
+    - ipv4_blocks ({tier: [CIDR per AZ]} from subnet_sizing.plan_ipv4)
+      replaces the IPv4 netnum split
+    - ipv6_cidr_block is None until the VPC's amazon provided block is known
+    - ipv6_only_tiers get cidr_block None, their IPv4 netnums stay reserved
+      so switching modes never moves the other tiers
+    """
+    netnums = range(len(tiers) * len(az_zone_ids))
+    if ipv4_blocks is None:
+        ipv4 = cidr_subnet_bulk(vpc_cidr_block, [(ipv4_newbits, n) for n in netnums])
+    else:
+        ipv4 = [ipv4_blocks[tier][az_idx] for tier in tiers for az_idx in range(len(az_zone_ids))]
+    ipv6 = (
+        cidr_subnet_bulk(ipv6_cidr_block, [(ipv6_newbits, n) for n in netnums])
+        if ipv6_cidr_block
+        else [None] * len(netnums)
+    )
+    plan = {}
+    for tier_idx, tier in enumerate(tiers):
+        plan[tier] = {}
+        for az_idx, zone_id in enumerate(az_zone_ids):
+            netnum = tier_idx * len(az_zone_ids) + az_idx
+            plan[tier][zone_id] = {
+                "cidr_block": None if tier in ipv6_only_tiers else ipv4[netnum],
+                "ipv6_cidr_block": ipv6[netnum],
+            }
+    return plan
 
 
 class Vpc(pulumi.ComponentResource):
@@ -42,8 +94,35 @@ class Vpc(pulumi.ComponentResource):
         cluster_name: str,
         az_zone_ids: list,
         vpc_cidr_block: str,
+        available_zone_ids: pulumi.Input[list] | None = None,
+        ipv4_newbits: int = 3,
+        ipv4_tier_weights: dict | None = None,
+        ipv4_az_slots: int | None = None,
+        nat_mode: str = "single",
+        endpoints: list | None = None,
+        private_subnet_mode: str = "dual_stack",
         opts: pulumi.ResourceOptions = None,
     ):
+        if nat_mode not in NAT_MODES:
+            raise ValueError(
+                f"nat_mode must be one of {', '.join(NAT_MODES)}, got: {nat_mode}"
+            )
+        if private_subnet_mode not in PRIVATE_SUBNET_MODES:
+            raise ValueError(
+                f"private_subnet_mode must be one of {', '.join(PRIVATE_SUBNET_MODES)},"
+                f" got: {private_subnet_mode}"
+            )
+        ipv6_only = private_subnet_mode == "ipv6_only"
+        ipv6_only_tiers = ("private",) if ipv6_only else ()
+        # weighted IPv4 sizing, checked before anything is registered
+        ipv4_blocks = None
+        if ipv4_tier_weights:
+            missing = [tier for tier in SUBNET_TIERS if tier not in ipv4_tier_weights]
+            if missing:
+                raise ValueError(f"ipv4_tier_weights is missing tiers: {', '.join(missing)}")
+            ipv4_blocks = plan_ipv4(
+                vpc_cidr_block, len(az_zone_ids), ipv4_tier_weights, ipv4_az_slots
+            ).blocks
         super().__init__(t="eph:eks:Vpc", name=name, props=None, opts=opts)
 
         """ VPC Setup """
@@ -64,33 +143,56 @@ class Vpc(pulumi.ComponentResource):
         self.public_subnets = []
         self.private_subnets = []
 
-        # NOTE: still doing /19's even on two AZs
-        # 3 for /19
-        private_subnet_cidrs = [
-            cidr_subnet(vpc_cidr_block, 3, k + len(az_zone_ids))
-            for k in range(len(az_zone_ids))
-        ]
-        public_subnet_cidrs = [
-            cidr_subnet(vpc_cidr_block, 3, k) for k in range(len(az_zone_ids))
-        ]
-
-        # Calculate the IPv6 subnet allocations (will be Output objects)
-        ipv6_subnet_allocations = []
-        for i in range(len(az_zone_ids) * 2):  # Both public and private subnets
-            ipv6_subnet = self.vpc.ipv6_cidr_block.apply(
-                lambda v6base, idx=i: get_ipv6_subnet(v6base, idx)
+        # NOTE: without ipv4_tier_weights still doing /19's even on two AZs
+        # - ipv4_newbits=3 fits 4 AZs, raise it for more
+        # - ipv4_tier_weights sizes blocks to the AZ count, see subnet_sizing.py
+        # IPv4 half of the plan is known up front so previews still show CIDRs
+        ipv4_plan = build_address_plan(
+            vpc_cidr_block,
+            None,
+            az_zone_ids,
+            ipv4_newbits=ipv4_newbits,
+            ipv6_only_tiers=ipv6_only_tiers,
+            ipv4_blocks=ipv4_blocks,
+        )
+
+        # One apply computes every tier / AZ once the IPv6 block is allocated
+        # - subnets only project their own entry out of it
+        self.address_plan = self.vpc.ipv6_cidr_block.apply(
+            lambda v6base: build_address_plan(
+                vpc_cidr_block,
+                v6base,
+                az_zone_ids,
+                ipv4_newbits=ipv4_newbits,
+                ipv6_only_tiers=ipv6_only_tiers,
+                ipv4_blocks=ipv4_blocks,
             )
-            ipv6_subnet_allocations.append(ipv6_subnet)
+        )
 
-        for idx, zone_id in enumerate(az_zone_ids):
+        def ipv6_cidr(tier: str, zone_id: str) -> pulumi.Output:
+            return self.address_plan.apply(
+                lambda plan: plan[tier][zone_id]["ipv6_cidr_block"]
+            )
+
+        # az_zone_ids comes from config so subnet names / CIDRs are known up front
+        # - available_zone_ids (e.g. an `_output` AZ lookup) only gates subnets
+        #   so the VPC, gateways and route tables don't wait on the lookup
+        def availability_zone_id(zone_id: str) -> pulumi.Input[str]:
+            if available_zone_ids is None:
+                return zone_id
+            return pulumi.Output.from_input(available_zone_ids).apply(
+                lambda available: require_zone_id(zone_id, available)
+            )
+
+        for zone_id in az_zone_ids:
             # NOT launching karpenter instances in public subnets
             public_subnet = aws.ec2.Subnet(
                 resource_name=f"{name}-public-{zone_id}",
                 assign_ipv6_address_on_creation=True,
-                availability_zone_id=zone_id,
+                availability_zone_id=availability_zone_id(zone_id),
                 enable_dns64=True,
-                cidr_block=public_subnet_cidrs[idx],
-                ipv6_cidr_block=ipv6_subnet_allocations[idx],
+                cidr_block=ipv4_plan["public"][zone_id]["cidr_block"],
+                ipv6_cidr_block=ipv6_cidr("public", zone_id),
                 map_public_ip_on_launch=False,
                 enable_resource_name_dns_a_record_on_launch=False,
                 enable_resource_name_dns_aaaa_record_on_launch=True,
@@ -105,13 +207,17 @@ class Vpc(pulumi.ComponentResource):
             self.public_subnets.append(public_subnet)
 
             # Only launching karpenter instances in private subnets
+            # - ipv6_only: ipv6_native, no IPv4 block so IPv4 space never caps
+            #   nodes / ENIs, needs resource-name hostnames and Nitro instances
             private_subnet = aws.ec2.Subnet(
                 resource_name=f"{name}-private-{zone_id}",
                 assign_ipv6_address_on_creation=True,
-                availability_zone_id=zone_id,
+                availability_zone_id=availability_zone_id(zone_id),
                 enable_dns64=True,
-                cidr_block=private_subnet_cidrs[idx],
-                ipv6_cidr_block=ipv6_subnet_allocations[idx + len(az_zone_ids)],
+                cidr_block=ipv4_plan["private"][zone_id]["cidr_block"],
+                ipv6_cidr_block=ipv6_cidr("private", zone_id),
+                ipv6_native=True if ipv6_only else None,
+                private_dns_hostname_type_on_launch="resource-name" if ipv6_only else None,
                 map_public_ip_on_launch=False,
                 enable_resource_name_dns_a_record_on_launch=False,
                 enable_resource_name_dns_aaaa_record_on_launch=True,
@@ -176,33 +282,46 @@ class Vpc(pulumi.ComponentResource):
 
         """
         PRIVATE ROUTING
-        NOTE(evan): just using 1 EIP / nat gw to save $$.
-        - should be 2-3 for actual high availability
-        Note(evan): just 1 private route table since 1 Nat gw
-        - ideally would be route table per SUBNET with a nat for each
-        - would require for loop, etc to support multiple NAT gateways
+        nat_mode="single": 1 EIP / nat gw in the first AZ to save $$
+        - every AZ's IPv4 / NAT64 traffic crosses into that AZ
+        nat_mode="per_az": EIP / nat gw / private route table per AZ
+        - IPv4 / NAT64 stays in the AZ, no single NAT failure domain
+        - first AZ keeps the single mode nat names so switching modes
+          only adds resources for the other AZs
         """
 
-        self.nat_eip = aws.ec2.Eip(
-            resource_name=f"{self.public_subnets[0]._name}-nat-eip",
-            domain="vpc",
-            network_border_group="us-east-1",
-            public_ipv4_pool="amazon",
-            tags={"Name": f"{self.public_subnets[0]._name}-nat-eip"},
-            opts=pulumi.ResourceOptions(
-                parent=self, depends_on=[self.igw], delete_before_replace=True
-            ),
+        nat_subnets = (
+            self.public_subnets if nat_mode == "per_az" else self.public_subnets[:1]
         )
+        self.nat_eips = []
+        self.nat_gws = []
+        for subnet in nat_subnets:
+            nat_eip = aws.ec2.Eip(
+                resource_name=f"{subnet._name}-nat-eip",
+                domain="vpc",
+                network_border_group="us-east-1",
+                public_ipv4_pool="amazon",
+                tags={"Name": f"{subnet._name}-nat-eip"},
+                opts=pulumi.ResourceOptions(
+                    parent=self, depends_on=[self.igw], delete_before_replace=True
+                ),
+            )
+            self.nat_eips.append(nat_eip)
+
+            self.nat_gws.append(
+                aws.ec2.NatGateway(
+                    resource_name=f"{subnet._name}-nat-gw",
+                    allocation_id=nat_eip.id,
+                    subnet_id=subnet.id,
+                    tags={"Name": f"{subnet._name}-nat-gw"},
+                    opts=pulumi.ResourceOptions(
+                        parent=self, depends_on=[self.igw], delete_before_replace=True
+                    ),
+                )
+            )
 
-        self.nat_gw = aws.ec2.NatGateway(
-            resource_name=f"{self.public_subnets[0]._name}-nat-gw",
-            allocation_id=self.nat_eip.id,
-            subnet_id=self.public_subnets[0].id,
-            tags={"Name": f"{self.public_subnets[0]._name}-nat-gw"},
-            opts=pulumi.ResourceOptions(
-                parent=self, depends_on=[self.igw], delete_before_replace=True
-            ),
-        )
+        self.nat_eip = self.nat_eips[0]
+        self.nat_gw = self.nat_gws[0]
 
         self.egress_only_igw = aws.ec2.EgressOnlyInternetGateway(
             resource_name=f"{name}-egress-only-igw",
@@ -211,46 +330,142 @@ class Vpc(pulumi.ComponentResource):
             opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
         )
 
-        self.private_route_table = aws.ec2.RouteTable(
-            resource_name=f"{name}-private",
-            vpc_id=self.vpc.id,
-            tags={"Name": f"{name}-private"},
-            opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
-        )
+        # (route table name, nat gw, private subnets routed through it)
+        if nat_mode == "per_az":
+            private_routing = [
+                (f"{name}-private-{zone_id}", nat_gw, [subnet])
+                for zone_id, nat_gw, subnet in zip(
+                    az_zone_ids, self.nat_gws, self.private_subnets
+                )
+            ]
+        else:
+            private_routing = [(f"{name}-private", self.nat_gw, self.private_subnets)]
+
+        self.private_route_tables = []
+        for route_table_name, nat_gw, subnets in private_routing:
+            route_table = aws.ec2.RouteTable(
+                resource_name=route_table_name,
+                vpc_id=self.vpc.id,
+                tags={"Name": route_table_name},
+                opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
+            )
+            self.private_route_tables.append(route_table)
+
+            # nothing in an ipv6_only subnet has an IPv4 address to route
+            if not ipv6_only:
+                aws.ec2.Route(
+                    resource_name=f"{route_table_name}-nat-gw",
+                    destination_cidr_block="0.0.0.0/0",
+                    nat_gateway_id=nat_gw.id,
+                    route_table_id=route_table.id,
+                    opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
+                )
 
-        aws.ec2.Route(
-            resource_name=f"{name}-private-nat-gw",
-            destination_cidr_block="0.0.0.0/0",
-            nat_gateway_id=self.nat_gw.id,
-            route_table_id=self.private_route_table.id,
-            opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
-        )
+            aws.ec2.Route(
+                resource_name=f"{route_table_name}-ipv6-egress",
+                destination_ipv6_cidr_block="::/0",
+                egress_only_gateway_id=self.egress_only_igw.id,
+                route_table_id=route_table.id,
+                opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
+            )
 
-        aws.ec2.Route(
-            resource_name=f"{name}-private-ipv6-egress",
-            destination_ipv6_cidr_block="::/0",
-            egress_only_gateway_id=self.egress_only_igw.id,
-            route_table_id=self.private_route_table.id,
-            opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
-        )
+            aws.ec2.Route(
+                resource_name=f"{route_table_name}-dns64-nat-gw",
+                destination_ipv6_cidr_block=NAT64_DNS64_RESERVED_PREFIX,
+                nat_gateway_id=nat_gw.id,
+                route_table_id=route_table.id,
+                opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
+            )
 
-        aws.ec2.Route(
-            resource_name=f"{name}-private-dns64-nat-gw",
-            destination_ipv6_cidr_block=NAT64_DNS64_RESERVED_PREFIX,
-            nat_gateway_id=self.nat_gw.id,
-            route_table_id=self.private_route_table.id,
-            opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
-        )
+            # Attach RouteTable to each subnet
+            for subnet in subnets:
+                aws.ec2.RouteTableAssociation(
+                    resource_name=subnet._name.replace("subnet", "rta"),
+                    route_table_id=route_table.id,
+                    subnet_id=subnet.id,
+                    opts=pulumi.ResourceOptions(
+                        parent=self, delete_before_replace=True
+                    ),
+                )
 
-        # Attach RouteTable to each subnet
-        for subnet in self.private_subnets:
-            aws.ec2.RouteTableAssociation(
-                resource_name=subnet._name.replace("subnet", "rta"),
-                route_table_id=self.private_route_table.id,
-                subnet_id=subnet.id,
-                opts=pulumi.ResourceOptions(parent=self, delete_before_replace=True),
+        self.private_route_table = self.private_route_tables[0]
+
+        """
+        VPC ENDPOINTS
+        keeps AWS API / ECR / S3 traffic off the NAT gateway(s)
+        - endpoints=None creates nothing, see DEFAULT_ENDPOINTS for a start
+        - S3 gateway endpoint is free, interface endpoints bill per AZ-hour
+        - private DNS so SDKs need no endpoint config
+        - dualstack needs service support, drop services that reject it
+        - ipv6_only private subnets need IPv6 endpoints, same service caveat
+        """
+
+        self.vpc_endpoints = {}
+        interface_services = [s for s in endpoints or [] if s != "s3"]
+        region = aws.get_region_output().name if endpoints else None
+
+        if endpoints and "s3" in endpoints:
+            self.vpc_endpoints["s3"] = aws.ec2.VpcEndpoint(
+                resource_name=f"{name}-vpce-s3",
+                route_table_ids=[rt.id for rt in self.private_route_tables],
+                service_name=pulumi.Output.concat("com.amazonaws.", region, ".s3"),
+                vpc_endpoint_type="Gateway",
+                vpc_id=self.vpc.id,
+                tags={"Name": f"{name}-vpce-s3"},
+                opts=pulumi.ResourceOptions(parent=self),
             )
 
+        if interface_services:
+            self.vpc_endpoints_sg = aws.ec2.SecurityGroup(
+                resource_name=f"{name}-vpce-sg",
+                name_prefix=f"{name}-vpce-",
+                description="VPC interface endpoints",
+                vpc_id=self.vpc.id,
+                tags={"Name": f"{name}-vpce-sg"},
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+
+            aws.vpc.SecurityGroupIngressRule(
+                resource_name=f"{name}-vpce-sgr-https-ipv4-ingress",
+                description="HTTPS to endpoints from the VPC",
+                cidr_ipv4=self.vpc.cidr_block,
+                from_port=443,
+                ip_protocol="tcp",
+                security_group_id=self.vpc_endpoints_sg.id,
+                to_port=443,
+                tags={"Name": f"{name}-vpce-sgr-https-ipv4-ingress"},
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+
+            aws.vpc.SecurityGroupIngressRule(
+                resource_name=f"{name}-vpce-sgr-https-ipv6-ingress",
+                description="HTTPS to endpoints from the VPC",
+                cidr_ipv6=self.vpc.ipv6_cidr_block,
+                from_port=443,
+                ip_protocol="tcp",
+                security_group_id=self.vpc_endpoints_sg.id,
+                to_port=443,
+                tags={"Name": f"{name}-vpce-sgr-https-ipv6-ingress"},
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+
+            for service in interface_services:
+                self.vpc_endpoints[service] = aws.ec2.VpcEndpoint(
+                    resource_name=f"{name}-vpce-{service.replace('.', '-')}",
+                    dns_options={"dns_record_ip_type": "ipv6" if ipv6_only else "dualstack"},
+                    ip_address_type="ipv6" if ipv6_only else "dualstack",
+                    private_dns_enabled=True,
+                    security_group_ids=[self.vpc_endpoints_sg.id],
+                    service_name=pulumi.Output.concat(
+                        "com.amazonaws.", region, f".{service}"
+                    ),
+                    subnet_ids=[subnet.id for subnet in self.private_subnets],
+                    vpc_endpoint_type="Interface",
+                    vpc_id=self.vpc.id,
+                    tags={"Name": f"{name}-vpce-{service.replace('.', '-')}"},
+                    opts=pulumi.ResourceOptions(parent=self),
+                )
+
         """
         Manage default resources
         SECURITY BEST PRACTICES: adopted for management as cannot be deleted
@@ -331,16 +546,39 @@ class Vpc(pulumi.ComponentResource):
         considering the component itself to have been created.
         - explicitly setting objects as outputs
         """
+        # ids / CIDRs / per-AZ maps only - whole resources here would copy
+        # their state into this component's checkpoint entry on every save
+        nat_zone_ids = az_zone_ids if nat_mode == "per_az" else az_zone_ids[:1]
+        private_route_table_ids = (
+            [route_table.id for route_table in self.private_route_tables]
+            if nat_mode == "per_az"
+            else [self.private_route_table.id] * len(az_zone_ids)
+        )
         self.register_outputs(
             {
-                "egress_only_gw": self.egress_only_igw,
-                "igw": self.igw,
-                "nat_eip": self.nat_eip,
-                "nat_gw": self.nat_gw,
-                "public_route_table": self.public_route_table,
-                "public_subnets": self.public_subnets,
-                "private_route_table": self.private_route_table,
-                "private_subnets": self.private_subnets,
-                "vpc": self.vpc,
+                "address_plan": self.address_plan,
+                "egress_only_igw_id": self.egress_only_igw.id,
+                "igw_id": self.igw.id,
+                "nat_gateway_ids": dict(
+                    zip(nat_zone_ids, [nat_gw.id for nat_gw in self.nat_gws])
+                ),
+                "nat_public_ips": dict(
+                    zip(nat_zone_ids, [nat_eip.public_ip for nat_eip in self.nat_eips])
+                ),
+                "private_route_table_ids": dict(zip(az_zone_ids, private_route_table_ids)),
+                "private_subnet_ids": dict(
+                    zip(az_zone_ids, [subnet.id for subnet in self.private_subnets])
+                ),
+                "public_route_table_id": self.public_route_table.id,
+                "public_subnet_ids": dict(
+                    zip(az_zone_ids, [subnet.id for subnet in self.public_subnets])
+                ),
+                "vpc_cidr_block": self.vpc.cidr_block,
+                "vpc_endpoint_ids": {
+                    service: endpoint.id
+                    for service, endpoint in self.vpc_endpoints.items()
+                },
+                "vpc_id": self.vpc.id,
+                "vpc_ipv6_cidr_block": self.vpc.ipv6_cidr_block,
             }
         )
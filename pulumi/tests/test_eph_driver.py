@@ -0,0 +1,22 @@
+"""eph_driver.py checks that run before any stack is touched"""
+
+import eph_driver
+import pytest
+
+
+@pytest.mark.parametrize(
+    "overrides, template",
+    [
+        ({"eph": {}, "eph-1": {}}, "eph"),
+        (eph_driver.generated_overrides({}, 2), "eph-2"),
+    ],
+)
+def test_driver_refuses_to_overwrite_the_template(tmp_path, monkeypatch, overrides, template):
+    def no_work(*args, **kwargs):
+        raise AssertionError("nothing may run before the stack names are checked")
+
+    monkeypatch.setattr(eph_driver, "template_config", no_work)
+    monkeypatch.setattr(eph_driver.auto, "LocalWorkspace", no_work)
+    monkeypatch.setattr(eph_driver, "run_stack", no_work)
+    with pytest.raises(ValueError, match=f"stack {template} is the --template"):
+        eph_driver.run_all(tmp_path, "destroy", overrides, template=template)
@@ -0,0 +1,149 @@
+"""eph_timeline.py replaying the recorded fixtures in tests/fixtures"""
+
+import json
+from pathlib import Path
+
+import pytest
+from pulumi.automation import EngineEvent
+
+from eph_timeline import DeployTimeline, urn_label
+
+FIXTURES = Path(__file__).parent / "fixtures"
+# DeployTimeline's own JSONL, a failed up: node group failed, addon unfinished
+RECORDED = FIXTURES / "eph-1-up.jsonl"
+# raw `pulumi up --event-log`, whole second timestamps, route create failed
+EVENT_LOG = FIXTURES / "eph-2-event-log.jsonl"
+
+
+def by_label(timeline: DeployTimeline) -> dict:
+    """`<type> <name>` -> span, components share names with their resources"""
+    return {urn_label(span.urn): span for span in timeline.spans()}
+
+
+def test_replay_recorded():
+    spans = by_label(DeployTimeline.replay(RECORDED))
+    # the stack itself is left out
+    assert len(spans) == 10
+    assert not any(label.startswith("pulumi:pulumi:Stack") for label in spans)
+    vpc = spans["aws:ec2/vpc:Vpc eks-ipv6-bp-us-east-1-vpc"]
+    assert (vpc.start, vpc.end, vpc.seconds) == (1001.0, 1004.0, 3.0)
+    assert vpc.type == "aws:ec2/vpc:Vpc"
+    assert urn_label(vpc.parent) == "eph:eks:Vpc eks-ipv6-bp-us-east-1"
+    assert not vpc.failed and vpc.custom
+
+
+def test_replay_event_log():
+    spans = by_label(DeployTimeline.replay(EVENT_LOG))
+    assert set(spans) == {
+        "eph:eks:Vpc eks-ipv6-bp-us-east-1",
+        "aws:ec2/vpc:Vpc eks-ipv6-bp-us-east-1-vpc",
+        "aws:ec2/securityGroup:SecurityGroup eks-ipv6-bp-us-east-1-endpoints",
+        "aws:ec2/route:Route eks-ipv6-bp-us-east-1-private-nat64",
+    }
+    vpc = spans["aws:ec2/vpc:Vpc eks-ipv6-bp-us-east-1-vpc"]
+    assert (vpc.start, vpc.end) == (101.0, 104.0)
+    endpoints_sg = spans["aws:ec2/securityGroup:SecurityGroup eks-ipv6-bp-us-east-1-endpoints"]
+    assert endpoints_sg.op == "same"
+    assert not spans["eph:eks:Vpc eks-ipv6-bp-us-east-1"].custom
+    route = spans["aws:ec2/route:Route eks-ipv6-bp-us-east-1-private-nat64"]
+    assert route.failed and route.end == 106.0
+
+
+def test_live_recording_replays_the_same(tmp_path):
+    record_path = tmp_path / "timelines" / "eph-2-up.jsonl"
+    live = DeployTimeline(record_path=record_path)
+    for line in EVENT_LOG.read_text().splitlines():
+        data = json.loads(line)
+        live.on_event(EngineEvent.from_json(data), at=float(data["timestamp"]))
+    assert DeployTimeline.replay(record_path).spans() == live.spans()
+
+
+def test_missing_end_events():
+    spans = by_label(DeployTimeline.replay(RECORDED))
+    # resOpFailedEvent ends the span as failed
+    node_group = spans["aws:eks/nodeGroup:NodeGroup initial-node-group"]
+    assert node_group.failed and (node_group.start, node_group.end) == (1050.0, 1058.0)
+    # no end at all: failed, runs until the last event
+    addon = spans["aws:eks/addon:Addon eks-ipv6-bp-us-east-1-coredns"]
+    assert addon.failed and addon.end == 1058.0
+    cluster_component = spans["eph:eks:Cluster eks-ipv6-bp-us-east-1"]
+    assert cluster_component.failed and cluster_component.end == 1058.0
+    # a finished component isn't
+    assert not spans["eph:eks:Vpc eks-ipv6-bp-us-east-1"].failed
+
+
+def test_empty_timeline():
+    timeline = DeployTimeline()
+    assert timeline.spans() == []
+    assert timeline.idle_gaps() == []
+    assert timeline.chrome_trace() == {"traceEvents": []}
+
+
+def test_slowest_skips_components():
+    slowest = DeployTimeline.replay(RECORDED).slowest(3)
+    assert [span.name for span in slowest] == [
+        "eks-ipv6-bp-us-east-1-nat",
+        "eks-ipv6-bp-us-east-1",
+        "initial-node-group",
+    ]
+    assert all(span.custom for span in slowest)
+
+
+@pytest.mark.parametrize("path", [RECORDED, EVENT_LOG])
+def test_chrome_trace_rows_never_overlap(path):
+    trace = DeployTimeline.replay(path).chrome_trace()
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    rows: dict[tuple[int, int], list[tuple[int, int]]] = {}
+    for event in spans:
+        rows.setdefault((event["pid"], event["tid"]), []).append(
+            (event["ts"], event["ts"] + event["dur"])
+        )
+    for (_, tid), intervals in rows.items():
+        if tid == 0:
+            # the component's own span
+            assert len(intervals) == 1
+            continue
+        intervals.sort()
+        for (_, end), (start, _) in zip(intervals, intervals[1:]):
+            assert end <= start
+    # one named process per component
+    names = {
+        event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"
+    }
+    assert "eph:eks:Vpc eks-ipv6-bp-us-east-1" in names
+
+
+def test_chrome_trace_packs_rows():
+    trace = DeployTimeline.replay(RECORDED).chrome_trace()
+    tids = {
+        event["name"]: event["tid"] for event in trace["traceEvents"] if event["ph"] == "X"
+    }
+    # both public subnets start together, so they can't share a row
+    assert tids["eks-ipv6-bp-us-east-1-public-use1-az1"] != tids[
+        "eks-ipv6-bp-us-east-1-public-use1-az2"
+    ]
+    # the private subnet starts after az1 ended and reuses its row
+    assert tids["eks-ipv6-bp-us-east-1-private-use1-az1"] == tids[
+        "eks-ipv6-bp-us-east-1-public-use1-az1"
+    ]
+    assert tids["eks-ipv6-bp-us-east-1-vpc"] == 1
+
+
+def test_idle_gaps():
+    timeline = DeployTimeline.replay(RECORDED)
+    # nat gateway done at 1030, cluster starts at 1035
+    assert timeline.idle_gaps(min_gap=1) == [(1030.0, 1035.0)]
+    assert timeline.idle_gaps(min_gap=0.4) == [(1007.0, 1007.5), (1030.0, 1035.0)]
+    assert timeline.idle_gaps(min_gap=10) == []
+
+
+def test_idle_gaps_skip_unchanged_and_back_to_back():
+    # the `same` security group sits between vpc (ends 104) and route (starts 104)
+    assert DeployTimeline.replay(EVENT_LOG).idle_gaps(min_gap=0) == []
+
+
+def test_summary():
+    summary = DeployTimeline.replay(RECORDED).summary(top=2, min_gap=1)
+    assert summary.startswith("10 resources over 57.5s")
+    assert "idle gaps >= 1s: 1" in summary
+    assert "5.0s idle from 29.5s to 34.5s" in summary
@@ -0,0 +1,93 @@
+"""ipam.py registry and eph_driver's lease / release around stack actions"""
+
+import ipaddress
+import random
+import sqlite3
+
+import eph_driver
+import pytest
+from ipam import DEFAULT_POOL, IpamRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    with IpamRegistry(tmp_path / "ipam.sqlite") as registry:
+        yield registry
+
+
+def test_lease_is_stable_per_name(registry):
+    first = registry.lease("p/eph-1")
+    second = registry.lease("p/eph-2")
+    assert first == "10.0.0.0/16"
+    assert second == "10.1.0.0/16"
+    assert registry.lease("p/eph-1") == first
+    assert registry.get("p/eph-1") == first
+    assert registry.get("p/eph-3") is None
+
+
+def test_leases_never_overlap(registry):
+    rng = random.Random(0)
+    for n in range(300):
+        registry.lease(f"p/eph-{n}", prefixlen=rng.choice((16, 18, 20, 24)))
+    for n in rng.sample(range(300), 100):
+        registry.release(f"p/eph-{n}")
+    for n in range(300, 400):
+        registry.lease(f"p/eph-{n}", prefixlen=rng.choice((16, 20, 24)))
+    networks = sorted(ipaddress.ip_network(cidr) for cidr in registry.leases().values())
+    assert all(network.subnet_of(ipaddress.ip_network(DEFAULT_POOL)) for network in networks)
+    assert all(a.broadcast_address < b.network_address for a, b in zip(networks, networks[1:]))
+
+
+def test_release_merges_back_to_the_pool(registry):
+    names = [f"p/eph-{n}" for n in range(64)]
+    for name in names:
+        registry.lease(name, prefixlen=20)
+    random.Random(1).shuffle(names)
+    for name in names:
+        assert registry.release(name) is not None
+    assert registry.release("p/eph-0") is None
+    assert registry.free_blocks() == [DEFAULT_POOL]
+
+
+def test_pinned_lease_and_holder(registry):
+    assert registry.lease("p/adopted", cidr="10.0.0.0/16") == "10.0.0.0/16"
+    assert registry.lease_holding("10.0.3.4") == "p/adopted"
+    assert registry.lease_holding("10.1.0.1") is None
+    # the next free block skips the pinned one
+    assert registry.lease("p/eph-1") == "10.1.0.0/16"
+    with pytest.raises(ValueError, match="overlaps the lease of p/adopted"):
+        registry.lease("p/clash", cidr="10.0.128.0/24")
+    with pytest.raises(ValueError, match="outside pool"):
+        registry.lease("p/outside", cidr="192.168.0.0/16")
+    with pytest.raises(ValueError, match="already leases"):
+        registry.lease("p/adopted", prefixlen=20)
+
+
+def test_pool_runs_out(registry):
+    registry.lease("p/whole", prefixlen=8)
+    with pytest.raises(ValueError, match="no free /16 left"):
+        registry.lease("p/eph-1")
+
+
+def test_context_manager_closes(tmp_path):
+    with IpamRegistry(tmp_path / "ipam.sqlite") as registry:
+        registry.lease("p/eph-1")
+    with pytest.raises(sqlite3.ProgrammingError):
+        registry.leases()
+
+
+def test_driver_leases_once_and_never_on_destroy(tmp_path):
+    ipam_config = {"ipam_path": str(tmp_path / "ipam.sqlite")}
+    assert eph_driver.lease_vpc_cidr("p/eph-1", "destroy", ipam_config) == (None, False)
+    cidr, leased_now = eph_driver.lease_vpc_cidr("p/eph-1", "up", ipam_config)
+    assert (cidr, leased_now) == ("10.0.0.0/16", True)
+    assert eph_driver.lease_vpc_cidr("p/eph-1", "preview", ipam_config) == (cidr, False)
+    assert eph_driver.lease_vpc_cidr("p/eph-1", "destroy", ipam_config) == (cidr, False)
+    assert eph_driver.release_vpc_cidr("p/eph-1", ipam_config) == cidr
+    assert eph_driver.release_vpc_cidr("p/eph-1", ipam_config) is None
+
+
+def test_generated_stacks_lease_their_cidrs():
+    overrides = eph_driver.generated_overrides({"project_name": "bp"}, 300)
+    assert len(overrides) == 300
+    assert overrides["eph-300"] == {"vpc_cidr": "ipam", "project_name": "bp-300"}